@@ -0,0 +1,222 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Microbenchmark of the line extraction of DocumentLineIndex.
+
+Content Understanding results are synthesized from the resumes in the bundled
+`resumes/` corpus: every text value is wrapped into short lines and laid out in
+two columns per page, which gives dense pages with many words per line span.
+
+DocumentLineIndex (columnar pages, word-to-line containment for a whole page at once)
+is compared with the previous extract_lines, which scanned every word of the page
+for every line. The index is built from the raw result through ColumnarDocument.from_dict,
+like the evaluate step does, and timed both as built (line confidences and contents for
+every line, which is what evaluate_confidence needs) and with every line materialized.
+
+Usage (from src/ContentProcessor/src):
+    python ../benchmarks/line_index_benchmark.py [--resumes ../../../resumes] [--repeat 5]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from libs.azure_helper.model.content_understanding import DocumentContent  # noqa: E402
+from libs.azure_helper.model.content_understanding_layout import (  # noqa: E402
+    ColumnarDocument,
+)
+from libs.pipeline.handlers.logics.evaluate_handler.content_understanding_confidence_evaluator import (  # noqa: E402
+    DIDocumentLine,
+    DocumentLineIndex,
+    evaluate_confidence,
+    normalize_polygon,
+)
+from libs.utils.utils import flatten_dict  # noqa: E402
+
+WORDS_PER_LINE = 6
+LINES_PER_COLUMN = 60
+COLUMNS = 2
+
+
+def legacy_extract_lines(analyze_result: DocumentContent, multiple_score_resolver=min):
+    """extract_lines before DocumentLineIndex - every line scans all words of its page."""
+    di_lines = list()
+    for page_number, page in enumerate(analyze_result.pages):
+        for line_number, line in enumerate(page.lines):
+            span_offset_start = line.span.offset
+            span_offset_end = span_offset_start + line.span.length
+            contained_words = [
+                word
+                for word in page.words
+                if word.span.offset >= span_offset_start
+                and word.span.offset + word.span.length <= span_offset_end
+            ]
+            di_line = DIDocumentLine(**line.model_dump())
+            di_line.contained_words = contained_words
+            di_line.page_number = page_number
+            di_line.line_number = line_number
+            di_line.confidence = multiple_score_resolver(
+                [word.confidence for word in contained_words]
+            )
+            di_line.normalized_polygon = normalize_polygon(page, line.polygon)
+            di_lines.append(di_line)
+    return di_lines
+
+
+def _wrap(text: str) -> list[str]:
+    words = text.split()
+    return [
+        " ".join(words[index : index + WORDS_PER_LINE])
+        for index in range(0, len(words), WORDS_PER_LINE)
+    ]
+
+
+def synthesize_document(resume: dict) -> dict:
+    """Lay out the text values of a resume as a two column Content Understanding result."""
+    lines = [
+        wrapped
+        for value in flatten_dict(resume).values()
+        if isinstance(value, str) and value.strip()
+        for wrapped in _wrap(value)
+    ]
+
+    lines_per_page = LINES_PER_COLUMN * COLUMNS
+    pages = []
+    offset = 0
+    for page_index in range(0, max(len(lines), 1), lines_per_page):
+        page_lines, page_words = [], []
+        page_start = offset
+        for line_number, content in enumerate(
+            lines[page_index : page_index + lines_per_page]
+        ):
+            column, row = divmod(line_number, LINES_PER_COLUMN)
+            x, y = 0.5 + column * 4.0, 0.5 + row * 0.17
+            page_lines.append(
+                {
+                    "content": content,
+                    "source": f"D({len(pages) + 1},{x},{y},{x + 3.5},{y},{x + 3.5},{y + 0.15},{x},{y + 0.15})",
+                    "span": {"offset": offset, "length": len(content)},
+                }
+            )
+            word_offset = offset
+            for word_number, word in enumerate(content.split(" ")):
+                word_x = x + word_number * 0.55
+                page_words.append(
+                    {
+                        "content": word,
+                        "span": {"offset": word_offset, "length": len(word)},
+                        "confidence": 0.9 + (len(word) % 10) / 100,
+                        "source": f"D({len(pages) + 1},{word_x},{y},{word_x + 0.5},{y},{word_x + 0.5},{y + 0.15},{word_x},{y + 0.15})",
+                    }
+                )
+                word_offset += len(word) + 1
+            offset += len(content) + 1
+
+        pages.append(
+            {
+                "pageNumber": len(pages) + 1,
+                "angle": 0,
+                "width": 8.5,
+                "height": 11,
+                "spans": [{"offset": page_start, "length": offset - page_start}],
+                "words": page_words,
+                "lines": page_lines,
+            }
+        )
+
+    return {
+        "markdown": "\n".join(lines),
+        "kind": "document",
+        "startPageNumber": 1,
+        "endPageNumber": len(pages),
+        "unit": "inch",
+        "pages": pages,
+    }
+
+
+def _best_time(function, repeat: int) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--resumes",
+        default=os.path.join(os.path.dirname(__file__), "..", "..", "..", "resumes"),
+        help="Directory with the resume JSON files.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(args.resumes, "*.json"))):
+        with open(path, "r", encoding="utf-8") as file:
+            resume = json.load(file)
+        content = synthesize_document(resume)
+        corpus.append((resume, content, DocumentContent(**content)))
+
+    if not corpus:
+        sys.exit(f"No resumes found in {args.resumes}")
+
+    pages = sum(len(document.pages) for _, _, document in corpus)
+    words = sum(len(page.words) for *_, document in corpus for page in document.pages)
+    lines = sum(len(page.lines) for *_, document in corpus for page in document.pages)
+    print(
+        f"{len(corpus)} resumes, {pages} pages, {lines} lines, {words} words "
+        f"({words / pages:.0f} words per page)"
+    )
+
+    for _, content, document in corpus:
+        legacy = [
+            line.model_dump(warnings=False) for line in legacy_extract_lines(document)
+        ]
+        for line_index in (
+            DocumentLineIndex(document),
+            DocumentLineIndex(ColumnarDocument.from_dict(content)),
+        ):
+            current = [line.model_dump(warnings=False) for line in line_index.lines]
+            assert legacy == current, (
+                "DocumentLineIndex lines differ from the legacy implementation"
+            )
+
+    legacy_time = _best_time(
+        lambda: [legacy_extract_lines(document) for *_, document in corpus],
+        args.repeat,
+    )
+    build_time = _best_time(
+        lambda: [
+            DocumentLineIndex(ColumnarDocument.from_dict(content))
+            for _, content, _ in corpus
+        ],
+        args.repeat,
+    )
+    materialize_time = _best_time(
+        lambda: [
+            DocumentLineIndex(ColumnarDocument.from_dict(content)).lines
+            for _, content, _ in corpus
+        ],
+        args.repeat,
+    )
+    evaluate_time = _best_time(
+        lambda: [
+            evaluate_confidence(resume, ColumnarDocument.from_dict(content))
+            for resume, content, _ in corpus
+        ],
+        args.repeat,
+    )
+
+    print(f"extract_lines (linear word scan)  : {legacy_time * 1000:8.1f} ms")
+    print(f"DocumentLineIndex (built)         : {build_time * 1000:8.1f} ms")
+    print(f"speedup (built)                   : {legacy_time / build_time:8.1f}x")
+    print(f"DocumentLineIndex (all lines)     : {materialize_time * 1000:8.1f} ms")
+    print(f"evaluate_confidence (corpus)      : {evaluate_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,38 @@ class AppConfiguration(ModelBaseSettings):
         app_cosmos_database (str): The name of the Cosmos DB database.
         app_cosmos_container_process (str): The name of the Cosmos DB container for process data.
         app_cosmos_container_schema (str): The name of the Cosmos DB container for schema data.
+        app_cosmos_container_process_status (str): The name of the Cosmos DB container for the lightweight process status documents.
+        app_schema_cache_ttl_seconds (int): Seconds a cached schema is served before it is revalidated.
+        app_map_response_cache_store (str): Store for cached Map step responses - "none" (default, disabled), "local" or "blob".
+            The blob store is never pruned - set a lifecycle management policy on its container.
+        app_map_response_cache_bypass (bool): Flag to skip cached Map step responses and call the model again.
+        app_map_response_cache_dir (str): The directory of the local response cache.
+        app_map_response_cache_max_mb (int): The maximum size of the local response cache in MB.
+        app_map_response_cache_container (str): The Blob container of the blob response cache.
+        app_map_invocation_mode (str): How the Map step calls the model - "kernel" (Semantic Kernel), "direct" (Azure OpenAI client) or "batch" (Batch API).
+        app_map_batch_executor (str): The batch executor - "azure_openai" (Batch API) or "local" (stand-in calling the chat endpoint).
+        app_map_batch_deployment (str): The global batch deployment name. Defaults to app_azure_openai_model.
+        app_map_batch_container (str): The Blob container for pending requests and submitted batches.
+        app_map_batch_max_requests (int): The maximum number of requests in a batch; a full batch is submitted right away.
+        app_map_batch_max_wait_seconds (int): The longest time a request waits before a partial batch is submitted.
+        app_map_batch_poll_interval_seconds (int): The interval for submitting and polling batches.
+        app_map_markdown_compaction (bool): Flag to compact the markdown before it is sent to the model. Off by default;
+            compaction drops page breaks and figure tags and rewrites HTML tables, which changes the prompt the model sees.
+        app_map_prompt_token_budget (int): The maximum estimated prompt tokens of the Map step (0 = unlimited).
+        app_map_modality_policy (str): Images sent by the Map step - "images" (default, every page), "adaptive" (only the pages with low word confidence) or "text".
+        app_map_modality_low_confidence_threshold (float): Words below this confidence are counted as low confidence.
+        app_map_modality_min_mean_confidence (float): Pages with a lower mean word confidence are sent as images.
+        app_map_modality_max_low_confidence_ratio (float): Pages with a higher ratio of low confidence words are sent as images.
+        app_map_modality_min_words_per_page (int): Pages with fewer words are sent as images.
+        app_map_modality_max_selected_page_ratio (float): Above this ratio of selected pages, all pages are sent as images.
+        app_evaluate_fuzzy_match_enabled (bool): Flag to match values approximately with the document lines when no line matches or contains them.
+        app_evaluate_fuzzy_match_thresholds (dict[str, float]): The minimum similarity per field type, e.g. "text=0.85,date=0.85,number=1.0".
+        app_evaluate_worker_processes (int): The worker processes running the confidence evaluators concurrently (0 = sequentially in the handler process).
+        app_status_write_buffer_max_size (int): The number of processes with a pending status update that triggers a write.
+        app_status_write_buffer_flush_interval_seconds (float): The longest time a status update waits before it is written.
+        app_process_archive_retention_days (int): Finished processes imported more days ago are archived to blob storage. 0 (default) disables archival.
+        app_process_archive_interval_seconds (int): The interval for archiving processes.
+        app_process_archive_batch_size (int): The maximum number of processes archived per interval.
     """
 
     app_storage_queue_url: str
@@ -52,6 +84,40 @@ class AppConfiguration(ModelBaseSettings):
     app_cosmos_database: str
     app_cosmos_container_process: str
     app_cosmos_container_schema: str
+    app_cosmos_container_process_status: str = "ProcessStatus"
+    app_schema_cache_ttl_seconds: int = 300
+    app_map_response_cache_store: str = "none"
+    app_map_response_cache_bypass: bool = False
+    app_map_response_cache_dir: str = ".cache/map_responses"
+    app_map_response_cache_max_mb: int = 512
+    app_map_response_cache_container: str = "cps-cache"
+    app_map_invocation_mode: str = "kernel"
+    app_map_batch_executor: str = "azure_openai"
+    app_map_batch_deployment: str = ""
+    app_map_batch_container: str = "cps-batches"
+    app_map_batch_max_requests: int = 1000
+    app_map_batch_max_wait_seconds: int = 300
+    app_map_batch_poll_interval_seconds: int = 60
+    app_map_markdown_compaction: bool = False
+    app_map_prompt_token_budget: int = 0
+    app_map_modality_policy: str = "images"
+    app_map_modality_low_confidence_threshold: float = 0.8
+    app_map_modality_min_mean_confidence: float = 0.95
+    app_map_modality_max_low_confidence_ratio: float = 0.05
+    app_map_modality_min_words_per_page: int = 20
+    app_map_modality_max_selected_page_ratio: float = 0.5
+    app_evaluate_fuzzy_match_enabled: bool = True
+    app_evaluate_fuzzy_match_thresholds: Annotated[dict[str, float], NoDecode] = {
+        "text": 0.85,
+        "date": 0.85,
+        "number": 1.0,
+    }
+    app_evaluate_worker_processes: int = 2
+    app_status_write_buffer_max_size: int = 50
+    app_status_write_buffer_flush_interval_seconds: float = 2.0
+    app_process_archive_retention_days: int = 0
+    app_process_archive_interval_seconds: int = 3600
+    app_process_archive_batch_size: int = 100
 
     @field_validator("app_process_steps", mode="before")
     @classmethod
@@ -59,3 +125,13 @@ class AppConfiguration(ModelBaseSettings):
         if isinstance(v, str):
             return [x for x in v.split(",")]
         return v
+
+    @field_validator("app_evaluate_fuzzy_match_thresholds", mode="before")
+    @classmethod
+    def split_thresholds(cls, v: str) -> dict[str, float]:
+        if isinstance(v, str):
+            return {
+                key.strip(): float(value)
+                for key, value in (x.split("=") for x in v.split(",") if x.strip())
+            }
+        return v
@@ -1,12 +1,65 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import os
+import threading
 from typing import Any, Dict
 
 import certifi
 from pymongo import MongoClient
 from pymongo.database import Collection, Database
 
+# Clients per connection string, shared by every helper of the process
+_clients: Dict[str, MongoClient] = dict()
+# Collections already created and indexed, per connection string, database, collection and indexes
+_containers: Dict[tuple, Collection] = dict()
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def _reset_after_fork():
+    # A client must not be used across fork, so a handler process starts with its own registry
+    global _registry_pid
+    if _registry_pid != os.getpid():
+        _clients.clear()
+        _containers.clear()
+        _registry_pid = os.getpid()
+
+
+def get_mongo_client(connection_string: str) -> MongoClient:
+    """
+    Get the process-wide MongoClient of a connection string, connecting on first use.
+
+    A MongoClient holds its own connection pool, so sharing it saves the TLS handshake
+    and the topology discovery every time a helper is created.
+
+    Args:
+        connection_string (str): Connection String for MongoDB
+
+    Returns:
+        MongoClient: The shared client.
+    """
+    with _registry_lock:
+        _reset_after_fork()
+        client = _clients.get(connection_string)
+        if client is None:
+            # MongoClient need to get Certificate but in Container,
+            # it doesn't have native certificate so we need to add it othwerwise the connection will be fail
+            client = MongoClient(connection_string, tlsCAFile=certifi.where())
+            _clients[connection_string] = client
+        return client
+
+
+def clear_mongo_clients():
+    """
+    Close the shared clients and forget the prepared collections.
+    """
+    with _registry_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _containers.clear()
+
 
 class CosmosMongDBHelper:
     def __init__(
@@ -22,7 +75,7 @@ class CosmosMongDBHelper:
         self.db: Database = None
 
         self.client, self.db, self.container = self._prepare(
-            connection_string, db_name, container_name
+            connection_string, db_name, container_name, indexes
         )
 
     def _prepare(
@@ -44,15 +97,19 @@ class CosmosMongDBHelper:
         Returns:
             tuple: MongoClient, Database, Collection
         """
-        # MongoClient need to get Certificate but in Container,
-        # it doesn't have native certificate so we need to add it othwerwise the connection will be fail
-        mongoClient = MongoClient(connection_string, tlsCAFile=certifi.where())
+        mongoClient = get_mongo_client(connection_string)
         database = mongoClient[db_name]
-        container = self._create_container(database, container_name)
-        # Add Indexes
-        if indexes:
-            self._create_indexes(container, indexes)
-        # self._create_indexes(container, ["ClassName", "Id"])
+
+        # The collection and its indexes are only checked the first time they are used
+        key = (connection_string, db_name, container_name, tuple(indexes or ()))
+        container = _containers.get(key)
+        if container is None:
+            container = self._create_container(database, container_name)
+            # Add Indexes
+            if indexes:
+                self._create_indexes(container, indexes)
+            with _registry_lock:
+                _containers[key] = container
 
         return mongoClient, database, container
 
@@ -71,17 +128,54 @@ class CosmosMongDBHelper:
         result = self.container.insert_one(document)
         return result
 
-    def find_document(self, query: Dict[str, Any], sort_fields=None):
+    def find_document(self, query: Dict[str, Any], sort_fields=None, limit: int = 0):
+        cursor = self.container.find(query)
         if sort_fields:
-            items = list(self.container.find(query).sort(sort_fields))
-        else:
-            items = list(self.container.find(query))
+            cursor = cursor.sort(sort_fields)
+        if limit:
+            cursor = cursor.limit(limit)
+        items = list(cursor)
         return items
 
     def update_document(self, filter: Dict[str, Any], update: Dict[str, Any]):
         result = self.container.update_one(filter, {"$set": update})
         return result
 
+    def upsert_document(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        insert_only: Dict[str, Any] = None,
+    ):
+        """
+        Update the matching document, or insert it, in a single round-trip.
+
+        Args:
+            filter (dict): Query matching the document.
+            update (dict): Fields set on the existing or the new document ($set).
+            insert_only (dict, optional): Fields only set when the document is inserted ($setOnInsert).
+                Fields also in update are skipped.
+
+        Returns:
+            UpdateResult: The result of the update.
+        """
+        operations = {"$set": update}
+        if insert_only:
+            insert_only = {
+                key: value for key, value in insert_only.items() if key not in update
+            }
+            if insert_only:
+                operations["$setOnInsert"] = insert_only
+        return self.container.update_one(filter, operations, upsert=True)
+
+    def replace_document(self, filter: Dict[str, Any], document: Dict[str, Any]):
+        result = self.container.replace_one(filter, document)
+        return result
+
+    def bulk_write(self, operations: list, ordered: bool = False):
+        result = self.container.bulk_write(operations, ordered=ordered)
+        return result
+
     def delete_document(self, item_id: str):
         result = self.container.delete_one({"Id": item_id})
         return result
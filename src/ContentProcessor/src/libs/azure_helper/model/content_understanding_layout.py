@@ -0,0 +1,329 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import numpy as np
+
+from libs.azure_helper.model.content_understanding import DocumentContent, Page
+
+# Coordinates of a polygon row: x, y of the four corners, clockwise from the top-left corner
+POLYGON_SIZE = 8
+
+
+def parse_source_polygon(source: str) -> list[float]:
+    """
+    Parse the polygon of a Content Understanding source ("D(page,x1,y1,...,x4,y4)"),
+    the same way the Word and Line models do.
+    """
+    if source.startswith("D(") and source.endswith(")"):
+        parts = source[2:-1].split(",")
+        # skip the first item (the page number) and parse the rest
+        if len(parts) > 1:
+            return [float(x.strip()) for x in parts[1:]]
+    return []
+
+
+def _parse_polygons(sources: list[str]) -> np.ndarray:
+    """
+    Parse the sources into an N x POLYGON_SIZE array; missing coordinates are NaN.
+    """
+    polygons = np.full((len(sources), POLYGON_SIZE), np.nan, dtype=np.float64)
+    for index, source in enumerate(sources):
+        coordinates = parse_source_polygon(source)[:POLYGON_SIZE]
+        polygons[index, : len(coordinates)] = coordinates
+    return polygons
+
+
+def round_coordinates(values: np.ndarray, digits: int = 3) -> np.ndarray:
+    """
+    Round an array like Python's round(value, digits), for every element at once.
+
+    NumPy rounds value * 10**digits, which can differ from Python's correctly rounded result
+    when the scaled value is (almost) exactly half-way; those few elements are rounded by Python.
+    """
+    rounded = np.round(values, digits)
+    scaled = values * 10**digits
+    half_way = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if half_way.any():
+        rounded[half_way] = [
+            round(value, digits) for value in values[half_way].tolist()
+        ]
+    return rounded
+
+
+def normalize_polygons(
+    polygons: np.ndarray, width: float, height: float, digits: int = 3
+) -> np.ndarray:
+    """
+    Normalize an N x POLYGON_SIZE polygon array to the page dimensions in one operation.
+
+    Args:
+        polygons: The polygons (x, y pairs) on the page.
+        width: The page width.
+        height: The page height.
+        digits: The decimal digits of the normalized coordinates.
+
+    Returns:
+        np.ndarray: The normalized polygons; missing coordinates stay NaN.
+    """
+    scale = np.tile(np.array([width, height], dtype=np.float64), POLYGON_SIZE // 2)
+    return round_coordinates(polygons / scale, digits)
+
+
+def to_polygon_points(polygon: np.ndarray) -> list[dict[str, float]]:
+    """
+    Convert a polygon row to the list of {"x", "y"} points used in the evaluation results.
+    """
+    coordinates = polygon[~np.isnan(polygon)].tolist()
+    return [
+        {"x": coordinates[index], "y": coordinates[index + 1]}
+        for index in range(0, len(coordinates) - 1, 2)
+    ]
+
+
+class ColumnarPage:
+    """
+    A struct-of-arrays representation of a Content Understanding page.
+
+    Words and lines are held as NumPy columns instead of one pydantic object per item,
+    so a page costs a few arrays regardless of its word count. Contents and sources are
+    kept as the strings of the parsed JSON and only read when an item is materialized.
+
+    Attributes:
+        page_number (int): The page number.
+        width (float): The page width.
+        height (float): The page height.
+        word_offsets (np.ndarray): The span offset of each word (int64).
+        word_lengths (np.ndarray): The span length of each word (int64).
+        word_confidences (np.ndarray): The confidence of each word (float64).
+        word_polygons (np.ndarray): The polygon of each word (N x 8, float64).
+        word_contents (list[str]): The content of each word.
+        word_sources (list[str]): The source of each word.
+        line_offsets (np.ndarray): The span offset of each line (int64).
+        line_lengths (np.ndarray): The span length of each line (int64).
+        line_polygons (np.ndarray): The polygon of each line (N x 8, float64).
+        line_contents (list[str]): The content of each line.
+        line_sources (list[str]): The source of each line.
+    """
+
+    __slots__ = (
+        "page_number",
+        "width",
+        "height",
+        "word_offsets",
+        "word_lengths",
+        "word_confidences",
+        "word_polygons",
+        "word_contents",
+        "word_sources",
+        "line_offsets",
+        "line_lengths",
+        "line_polygons",
+        "line_contents",
+        "line_sources",
+        "_normalized_line_polygons",
+    )
+
+    def __init__(self, page_number: int, width: float, height: float):
+        self.page_number = page_number
+        self.width = width
+        self.height = height
+        self._normalized_line_polygons = None
+
+    @classmethod
+    def from_dict(cls, page: dict) -> "ColumnarPage":
+        """
+        Build the columns from a page of the Extract step output as parsed JSON, without validating it.
+
+        Args:
+            page: The page as parsed JSON.
+
+        Returns:
+            ColumnarPage: The columnar page.
+        """
+        columnar_page = cls(page["pageNumber"], page["width"], page["height"])
+        words = page.get("words") or []
+        lines = page.get("lines") or []
+
+        columnar_page.word_offsets = np.fromiter(
+            (word["span"]["offset"] for word in words), dtype=np.int64, count=len(words)
+        )
+        columnar_page.word_lengths = np.fromiter(
+            (word["span"]["length"] for word in words), dtype=np.int64, count=len(words)
+        )
+        columnar_page.word_confidences = np.fromiter(
+            (word["confidence"] for word in words), dtype=np.float64, count=len(words)
+        )
+        columnar_page.word_contents = [word["content"] for word in words]
+        columnar_page.word_sources = [word.get("source", "") for word in words]
+        columnar_page.word_polygons = _parse_polygons(columnar_page.word_sources)
+
+        columnar_page.line_offsets = np.fromiter(
+            (line["span"]["offset"] for line in lines), dtype=np.int64, count=len(lines)
+        )
+        columnar_page.line_lengths = np.fromiter(
+            (line["span"]["length"] for line in lines), dtype=np.int64, count=len(lines)
+        )
+        columnar_page.line_contents = [line["content"] for line in lines]
+        columnar_page.line_sources = [line.get("source", "") for line in lines]
+        columnar_page.line_polygons = _parse_polygons(columnar_page.line_sources)
+        return columnar_page
+
+    @classmethod
+    def from_page(cls, page: Page) -> "ColumnarPage":
+        """
+        Build the columns from a validated page.
+
+        Args:
+            page: The page.
+
+        Returns:
+            ColumnarPage: The columnar page.
+        """
+        return cls.from_dict(
+            {
+                "pageNumber": page.pageNumber,
+                "width": page.width,
+                "height": page.height,
+                "words": [
+                    {
+                        "content": word.content,
+                        "span": {
+                            "offset": word.span.offset,
+                            "length": word.span.length,
+                        },
+                        "confidence": word.confidence,
+                        "source": word.source,
+                    }
+                    for word in page.words
+                ],
+                "lines": [
+                    {
+                        "content": line.content,
+                        "span": {
+                            "offset": line.span.offset,
+                            "length": line.span.length,
+                        },
+                        "source": line.source,
+                    }
+                    for line in page.lines or []
+                ],
+            }
+        )
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_contents)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_contents)
+
+    def get_normalized_line_polygons(self) -> np.ndarray:
+        """
+        Get the line polygons normalized to the page dimensions, computed once per page.
+
+        Returns:
+            np.ndarray: The normalized polygon of each line (N x 8).
+        """
+        if self._normalized_line_polygons is None:
+            self._normalized_line_polygons = normalize_polygons(
+                self.line_polygons, self.width, self.height
+            )
+        return self._normalized_line_polygons
+
+    def get_normalized_line_polygon(self, line_number: int) -> list[dict[str, float]]:
+        """
+        Get the normalized polygon of a line as a list of {"x", "y"} points (see normalize_polygon).
+
+        Args:
+            line_number: The index of the line within the page.
+
+        Returns:
+            list: The normalized polygon points.
+        """
+        return to_polygon_points(self.get_normalized_line_polygons()[line_number])
+
+    def get_line_words(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the words fully contained within each line's span.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The line index and the word index of every
+                (line, contained word) pair, ordered by line, then by the page's word order.
+        """
+        order = np.argsort(self.word_offsets, kind="stable")
+        sorted_offsets = self.word_offsets[order]
+        line_ends = self.line_offsets + self.line_lengths
+
+        # Only words starting inside a line's span can be contained in it
+        low = np.searchsorted(sorted_offsets, self.line_offsets, side="left")
+        high = np.searchsorted(sorted_offsets, line_ends, side="right")
+        counts = high - low
+
+        line_indexes = np.repeat(np.arange(self.line_count), counts)
+        # Position of every candidate word in the sorted order
+        pair_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        sorted_positions = (
+            np.arange(len(line_indexes)) - pair_starts + np.repeat(low, counts)
+        )
+        word_indexes = order[sorted_positions]
+
+        contained = (
+            self.word_offsets[word_indexes] + self.word_lengths[word_indexes]
+            <= line_ends[line_indexes]
+        )
+        line_indexes = line_indexes[contained]
+        word_indexes = word_indexes[contained]
+
+        # Keep the page's word order within each line
+        pair_order = np.lexsort((word_indexes, line_indexes))
+        return line_indexes[pair_order], word_indexes[pair_order]
+
+    def get_line_confidences(self) -> np.ndarray:
+        """
+        Get the lowest confidence of the words contained within each line.
+
+        Returns:
+            np.ndarray: The confidence of each line; 0 for lines without contained words.
+        """
+        line_indexes, word_indexes = self.get_line_words()
+        confidences = np.full(self.line_count, np.inf, dtype=np.float64)
+        np.minimum.at(confidences, line_indexes, self.word_confidences[word_indexes])
+        confidences[np.isinf(confidences)] = 0.0
+        return confidences
+
+
+class ColumnarDocument:
+    """
+    A struct-of-arrays representation of a Content Understanding document (see ColumnarPage).
+
+    Attributes:
+        markdown (str): The markdown of the document.
+        pages (list[ColumnarPage]): The pages of the document.
+    """
+
+    __slots__ = ("markdown", "pages")
+
+    def __init__(self, markdown: str, pages: list[ColumnarPage]):
+        self.markdown = markdown
+        self.pages = pages
+
+    @classmethod
+    def from_dict(cls, content: dict) -> "ColumnarDocument":
+        """
+        Build the document from a content of the Extract step output as parsed JSON,
+        e.g. json.loads(output)["result"]["contents"][0], without validating it.
+        """
+        return cls(
+            content.get("markdown") or "",
+            [ColumnarPage.from_dict(page) for page in content.get("pages") or []],
+        )
+
+    @classmethod
+    def from_document_content(cls, document: DocumentContent) -> "ColumnarDocument":
+        """
+        Build the document from a validated document content.
+        """
+        return cls(
+            document.markdown, [ColumnarPage.from_page(page) for page in document.pages]
+        )
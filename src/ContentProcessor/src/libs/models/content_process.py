@@ -13,6 +13,25 @@ from libs.pipeline.handlers.logics.evaluate_handler.comparison import (
 )
 
 
+# Fields of the lightweight status document, read by the status polls and the processed list
+PROCESS_STATUS_FIELDS = [
+    "process_id",
+    "processed_file_name",
+    "processed_file_mime_type",
+    "processed_time",
+    "imported_time",
+    "last_modified_time",
+    "last_modified_by",
+    "status",
+    "entity_score",
+    "min_extracted_entity_score",
+    "schema_score",
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+]
+
+
 class Step_Outputs(BaseModel):
     step_name: str
     processed_time: Optional[str] = None
@@ -38,6 +57,7 @@ class ContentProcess(BaseModel):
     confidence: Optional[dict] = None
     target_schema: Optional[Schema] = None
     prompt_tokens: int = 0
+    cached_tokens: int = 0
     completion_tokens: int = 0
 
     process_output: list[Step_Outputs] = []
@@ -52,9 +72,8 @@ class ContentProcess(BaseModel):
         collection_name: str,
     ):
         """
-        Update the status of the process in Cosmos DB.
+        Update the status of the process in the status collection of Cosmos DB.
         """
-        # Check if the process_id is already in the database
         mongo_helper = CosmosMongDBHelper(
             connection_string=connection_string,
             db_name=database_name,
@@ -62,32 +81,42 @@ class ContentProcess(BaseModel):
             indexes=["process_id"],
         )
 
-        # Check if the process_id already exists in the database
-        existing_process = mongo_helper.find_document({"process_id": self.process_id})
-        if existing_process:
-            # Update the existing document
-            mongo_helper.update_document(
-                {"process_id": self.process_id},
-                {
-                    "status": self.status,
-                    "processed_file_name": self.processed_file_name,
-                    "processed_file_mime_type": self.processed_file_mime_type,
-                    "last_modified_time": self.last_modified_time,
-                    "imported_time": self.imported_time,
-                    "last_modified_by": self.last_modified_by,
-                },
-            )
-        else:
-            # Insert a new document
-            mongo_helper.insert_document(self.model_dump())
+        # Update the status, or insert the status document if it does not exist yet
+        mongo_helper.upsert_document(
+            {"process_id": self.process_id},
+            self.get_status_fields(),
+            insert_only=self.get_status_document(),
+        )
+
+    def get_status_fields(self) -> dict:
+        """
+        Get the fields written by a status update of the process.
+        """
+        return {
+            "status": self.status,
+            "processed_file_name": self.processed_file_name,
+            "processed_file_mime_type": self.processed_file_mime_type,
+            "last_modified_time": self.last_modified_time,
+            "imported_time": self.imported_time,
+            "last_modified_by": self.last_modified_by,
+        }
+
+    def get_status_document(self) -> dict:
+        """
+        Get the lightweight status document of the process (see PROCESS_STATUS_FIELDS).
+        """
+        return self.model_dump(include=set(PROCESS_STATUS_FIELDS))
 
     def update_status_to_cosmos(
-        self, connection_string: str, database_name: str, collection_name: str
+        self,
+        connection_string: str,
+        database_name: str,
+        collection_name: str,
+        status_collection_name: Optional[str] = None,
     ):
         """
-        Update the status of the process in Cosmos DB.
+        Update the whole process in Cosmos DB, and its status document in the status collection.
         """
-        # Check if the process_id is already in the database
         mongo_helper = CosmosMongDBHelper(
             connection_string=connection_string,
             db_name=database_name,
@@ -95,16 +124,18 @@ class ContentProcess(BaseModel):
             indexes=["process_id"],
         )
 
-        # Check if the process_id already exists in the database
-        existing_process = mongo_helper.find_document({"process_id": self.process_id})
-        if existing_process:
-            # Update the existing document
-            mongo_helper.update_document(
-                {"process_id": self.process_id}, self.model_dump()
+        # Replace the fields of the process, or insert it if it does not exist yet
+        mongo_helper.upsert_document({"process_id": self.process_id}, self.model_dump())
+
+        if status_collection_name:
+            CosmosMongDBHelper(
+                connection_string=connection_string,
+                db_name=database_name,
+                container_name=status_collection_name,
+                indexes=["process_id"],
+            ).upsert_document(
+                {"process_id": self.process_id}, self.get_status_document()
             )
-        else:
-            # Insert a new document
-            mongo_helper.insert_document(self.model_dump())
 
     class Config:
         arbitrary_types_allowed = True
@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import datetime
+import gzip
+
+from bson import json_util
+
+from libs.azure_helper.comsos_mongo import CosmosMongDBHelper
+from libs.azure_helper.storage_blob import StorageBlobHelper
+from libs.models.content_process import PROCESS_STATUS_FIELDS
+
+# Blob of an archived process document, in the folder of the process
+ARCHIVE_BLOB_NAME = "content_process.json.gz"
+# Processes in these statuses are not written by the pipeline anymore
+ARCHIVABLE_STATUSES = ["Completed", "Error"]
+# The stub keeps the status fields (and the schema), so status reads and reports work without the blob
+ARCHIVE_STUB_FIELDS = PROCESS_STATUS_FIELDS
+
+
+def build_archive_stub(
+    document: dict, container_name: str, archived_time: datetime.datetime
+) -> dict:
+    """
+    Build the stub replacing an archived process document.
+
+    Args:
+        document: The process document.
+        container_name: The blob container (path) of the archive.
+        archived_time: When the process was archived.
+
+    Returns:
+        dict: The stub, with the archive location in "archive".
+    """
+    stub = {
+        field: document[field] for field in ARCHIVE_STUB_FIELDS if field in document
+    }
+    # The schema is small and required whole to read the stub as a ContentProcess
+    if document.get("target_schema"):
+        stub["target_schema"] = document["target_schema"]
+    stub["archive"] = {
+        "container_name": container_name,
+        "blob_name": ARCHIVE_BLOB_NAME,
+        "archived_time": archived_time,
+    }
+    return stub
+
+
+def archive_processes(
+    connection_string: str,
+    database_name: str,
+    collection_name: str,
+    account_url: str,
+    container_name: str,
+    retention_days: int,
+    batch_size: int = 100,
+) -> int:
+    """
+    Move the finished processes imported before the retention window to gzip compressed blobs.
+
+    Each process document is written to {container_name}/{process_id}/content_process.json.gz
+    (MongoDB extended JSON, so dates and ids are restored as they were) and replaced by a stub
+    pointing to the blob. A document modified while it was archived is left in place.
+
+    Args:
+        connection_string: The Cosmos DB connection string.
+        database_name: The Cosmos DB database name.
+        collection_name: The Cosmos DB collection name for processes.
+        account_url: The Azure Storage Blob account URL.
+        container_name: The blob container of the processes.
+        retention_days: Processes imported more than this many days ago are archived.
+        batch_size: The maximum number of processes archived by one call.
+
+    Returns:
+        int: The number of archived processes.
+    """
+    mongo_helper = CosmosMongDBHelper(
+        connection_string=connection_string,
+        db_name=database_name,
+        container_name=collection_name,
+        indexes=["process_id", "imported_time"],
+    )
+    blob_helper = StorageBlobHelper.get(
+        account_url=account_url, container_name=container_name
+    )
+
+    now = datetime.datetime.now(datetime.UTC)
+    documents = mongo_helper.find_document(
+        {
+            "status": {"$in": ARCHIVABLE_STATUSES},
+            "imported_time": {"$lt": now - datetime.timedelta(days=retention_days)},
+            "archive": {"$exists": False},
+        },
+        limit=batch_size,
+    )
+
+    archived_count = 0
+    for document in documents:
+        process_id = document["process_id"]
+        blob_helper.upload_blob(
+            process_id,
+            ARCHIVE_BLOB_NAME,
+            gzip.compress(json_util.dumps(document).encode("utf-8")),
+        )
+
+        result = mongo_helper.replace_document(
+            {
+                "_id": document["_id"],
+                "last_modified_time": document.get("last_modified_time"),
+            },
+            build_archive_stub(document, f"{container_name}/{process_id}", now),
+        )
+        archived_count += result.modified_count
+
+    return archived_count
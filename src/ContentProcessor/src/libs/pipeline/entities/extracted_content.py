@@ -0,0 +1,100 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class PageConfidenceStats(BaseModel):
+    page_number: int
+    word_count: int
+    mean_confidence: float
+    low_confidence_ratio: float
+
+
+def calculate_page_confidence_stats(
+    page_number: int, confidences: List[float], low_confidence_threshold: float
+) -> PageConfidenceStats:
+    """
+    Calculate the word confidence statistics of one page.
+
+    Args:
+        page_number: The page number.
+        confidences: The confidence of every word of the page.
+        low_confidence_threshold: Words below this confidence are counted as low confidence.
+
+    Returns:
+        PageConfidenceStats: The statistics of the page.
+    """
+    word_count = len(confidences)
+    return PageConfidenceStats(
+        page_number=page_number,
+        word_count=word_count,
+        mean_confidence=(
+            round(sum(confidences) / word_count, 3) if word_count else 0.0
+        ),
+        low_confidence_ratio=(
+            round(
+                sum(
+                    1
+                    for confidence in confidences
+                    if confidence < low_confidence_threshold
+                )
+                / word_count,
+                3,
+            )
+            if word_count
+            else 0.0
+        ),
+    )
+
+
+class ExtractedContentDigest(BaseModel):
+    """
+    The parts of the Extract step output used by the Map step.
+
+    It is saved as its own artifact by the Extract step, so the Map step reads the
+    markdown and the page statistics without loading every word, line and paragraph.
+
+    Attributes:
+        markdown: The markdown of the document.
+        low_confidence_threshold: The threshold the page statistics were calculated with.
+        page_stats: The word confidence statistics of every page.
+    """
+
+    markdown: str = ""
+    low_confidence_threshold: float
+    page_stats: List[PageConfidenceStats] = Field(default_factory=list)
+
+
+def build_extracted_content_digest(
+    analyzed_result: dict, low_confidence_threshold: float
+) -> ExtractedContentDigest:
+    """
+    Build the digest from the Extract step output as plain JSON data.
+
+    Only the markdown and the word confidences are read; the rest of the tree is not validated.
+
+    Args:
+        analyzed_result: The Content Understanding result (AnalyzedResult) as parsed JSON.
+        low_confidence_threshold: Words below this confidence are counted as low confidence.
+
+    Returns:
+        ExtractedContentDigest: The digest of the first content.
+    """
+    contents = (analyzed_result.get("result") or {}).get("contents") or [{}]
+    content = contents[0]
+
+    return ExtractedContentDigest(
+        markdown=content.get("markdown") or "",
+        low_confidence_threshold=low_confidence_threshold,
+        page_stats=[
+            calculate_page_confidence_stats(
+                page["pageNumber"],
+                [word["confidence"] for word in page.get("words") or []],
+                low_confidence_threshold,
+            )
+            for page in content.get("pages") or []
+        ],
+    )
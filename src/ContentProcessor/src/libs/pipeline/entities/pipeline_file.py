@@ -15,6 +15,7 @@ class ArtifactType(str, Enum):
     Undefined = "undefined"
     ConvertedContent = "converted_content"
     ExtractedContent = "extracted_content"
+    ExtractedContentDigest = "extracted_content_digest"
     SchemaMappedData = "schema_mapped_data"
     ScoreMergedData = "score_merged_data"
     SourceContent = "source_content"
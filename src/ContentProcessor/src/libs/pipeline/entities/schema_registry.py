@@ -0,0 +1,173 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+import time
+from typing import Any, Optional
+
+from openai.lib._parsing._completions import type_to_response_format_param
+from pydantic import BaseModel, ConfigDict
+
+from libs.pipeline.entities.schema import Schema
+from libs.utils.remote_module_loader import (
+    get_blob_etag,
+    load_schema_with_etag_from_blob,
+)
+
+
+class SchemaRegistryEntry(BaseModel):
+    """
+    A schema resolved by the SchemaRegistry.
+
+    Attributes:
+        schema_info: The schema document stored in Cosmos DB.
+        schema_class: The schema class loaded from the blob.
+        response_format: The JSON schema derived from schema_class, ready to be used as response_format.
+        etag: The etag of the blob the schema class was loaded from.
+        version: The version of the schema, derived from Updated_On and the blob etag.
+        validated_at: Monotonic time when the entry was last validated against its sources.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    schema_info: Schema
+    schema_class: Any
+    response_format: dict
+    etag: Optional[str]
+    version: str
+    validated_at: float
+
+
+class SchemaRegistry:
+    """
+    Process-wide cache of schema classes loaded from blob storage.
+
+    Entries are keyed by schema_id and versioned by the schema document's Updated_On
+    and the etag of the schema blob. Within the TTL an entry is served from memory;
+    once it expires, the schema document and the blob etag are checked and the class
+    is only downloaded and executed again when either of them changed.
+    """
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, SchemaRegistryEntry] = {}
+        self._lock = threading.Lock()
+
+    def get_schema(
+        self,
+        schema_id: str,
+        connection_string: str,
+        database_name: str,
+        collection_name: str,
+        account_url: str,
+        container_name: str,
+    ) -> SchemaRegistryEntry:
+        """
+        Get the schema for the given schema_id, loading or revalidating it when required.
+
+        Args:
+            schema_id: The Id of the schema.
+            connection_string: The Cosmos DB connection string.
+            database_name: The Cosmos DB database name.
+            collection_name: The Cosmos DB collection name for schemas.
+            account_url: The Azure Storage Blob account URL.
+            container_name: The blob container (path) where the schema files are stored.
+
+        Returns:
+            SchemaRegistryEntry: The cached schema entry.
+        """
+        with self._lock:
+            entry = self._entries.get(schema_id)
+            if entry is not None and not self._is_expired(entry):
+                return entry
+
+            schema_info = Schema.get_schema(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name=collection_name,
+                schema_id=schema_id,
+            )
+
+            if entry is not None and self._is_unchanged(
+                entry, schema_info, account_url, container_name
+            ):
+                entry.validated_at = time.monotonic()
+                return entry
+
+            entry = self._load_entry(schema_info, account_url, container_name)
+            self._entries[schema_id] = entry
+            return entry
+
+    def invalidate(self, schema_id: Optional[str] = None):
+        """
+        Drop one cached schema, or all of them when schema_id is not provided.
+        """
+        with self._lock:
+            if schema_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(schema_id, None)
+
+    def _is_expired(self, entry: SchemaRegistryEntry) -> bool:
+        return time.monotonic() - entry.validated_at >= self.ttl_seconds
+
+    def _is_unchanged(
+        self,
+        entry: SchemaRegistryEntry,
+        schema_info: Schema,
+        account_url: str,
+        container_name: str,
+    ) -> bool:
+        if (
+            entry.schema_info.FileName != schema_info.FileName
+            or entry.schema_info.ClassName != schema_info.ClassName
+            or entry.schema_info.Updated_On != schema_info.Updated_On
+        ):
+            return False
+
+        return entry.etag == get_blob_etag(
+            account_url=account_url,
+            container_name=container_name,
+            blob_name=schema_info.FileName,
+        )
+
+    def _load_entry(
+        self, schema_info: Schema, account_url: str, container_name: str
+    ) -> SchemaRegistryEntry:
+        schema_class, etag = load_schema_with_etag_from_blob(
+            account_url=account_url,
+            container_name=container_name,
+            blob_name=schema_info.FileName,
+            module_name=schema_info.ClassName,
+        )
+
+        updated_on = (
+            schema_info.Updated_On.isoformat() if schema_info.Updated_On else ""
+        )
+
+        return SchemaRegistryEntry(
+            schema_info=schema_info,
+            schema_class=schema_class,
+            response_format=type_to_response_format_param(schema_class),
+            etag=etag,
+            version=f"{updated_on}|{etag}",
+            validated_at=time.monotonic(),
+        )
+
+
+_schema_registry: Optional[SchemaRegistry] = None
+
+
+def get_schema_registry(ttl_seconds: int = 300) -> SchemaRegistry:
+    """
+    Get the process-wide SchemaRegistry, creating it on first use.
+
+    The registry uses the ttl_seconds of the latest call, so a changed configuration
+    applies to the cached entries too.
+    """
+    global _schema_registry
+    if _schema_registry is None:
+        _schema_registry = SchemaRegistry(ttl_seconds=ttl_seconds)
+    elif _schema_registry.ttl_seconds != ttl_seconds:
+        _schema_registry.ttl_seconds = ttl_seconds
+    return _schema_registry
@@ -6,7 +6,6 @@ import json
 from openai.types.chat.parsed_chat_completion import ParsedChatCompletion
 
 from libs.application.application_context import AppContext
-from libs.azure_helper.model.content_understanding import AnalyzedResult
 from libs.pipeline.entities.pipeline_file import ArtifactType, PipelineLogEntry
 from libs.pipeline.entities.pipeline_message_context import MessageContext
 from libs.pipeline.entities.pipeline_step_result import StepResult
@@ -16,13 +15,14 @@ from libs.pipeline.handlers.logics.evaluate_handler.comparison import (
 from libs.pipeline.handlers.logics.evaluate_handler.confidence import (
     merge_confidence_values,
 )
-from libs.pipeline.handlers.logics.evaluate_handler.content_understanding_confidence_evaluator import (
-    evaluate_confidence as content_understanding_confidence,
+from libs.pipeline.handlers.logics.evaluate_handler.evaluation_pool import (
+    evaluate_confidences,
+    get_evaluation_executor,
 )
-from libs.pipeline.handlers.logics.evaluate_handler.model import DataExtractionResult
-from libs.pipeline.handlers.logics.evaluate_handler.openai_confidence_evaluator import (
-    evaluate_confidence as gpt_confidence,
+from libs.pipeline.handlers.logics.evaluate_handler.fuzzy_matching import (
+    FuzzyMatchPolicy,
 )
+from libs.pipeline.handlers.logics.evaluate_handler.model import DataExtractionResult
 from libs.pipeline.queue_handler_base import HandlerBase
 
 
@@ -39,11 +39,6 @@ class EvaluateHandler(HandlerBase):
             artifact_type=ArtifactType.ExtractedContent,
         )
 
-        # Deserialize the result to AnalyzedResult (Content Understanding)
-        content_understanding_result = AnalyzedResult(
-            **json.loads(output_file_json_string_from_extract)
-        )
-
         # Get the result from Map step handler - OpenAI
         output_file_json_string_from_map = self.download_output_file_to_json_string(
             processed_by="map",
@@ -61,15 +56,22 @@ class EvaluateHandler(HandlerBase):
         # Convert the parsed message to a dictionary
         gpt_evaluate_confidence_dict = parsed_message_from_gpt
 
-        # Evaluate Confidence Score - Content Understanding
-        content_understanding_confidence_score = content_understanding_confidence(
+        # Evaluate Confidence Score - Content Understanding and GPT, concurrently on the worker pool.
+        # The Content Understanding result is deserialized by its evaluator.
+        (
+            content_understanding_confidence_score,
+            gpt_confidence_score,
+        ) = await evaluate_confidences(
             gpt_evaluate_confidence_dict,
-            content_understanding_result.result.contents[0],
-        )
-
-        # Evaluate Confidence Score - GPT
-        gpt_confidence_score = gpt_confidence(
-            gpt_evaluate_confidence_dict, gpt_result.choices[0]
+            output_file_json_string_from_extract,
+            gpt_result.choices[0],
+            FuzzyMatchPolicy(
+                enabled=self.application_context.configuration.app_evaluate_fuzzy_match_enabled,
+                thresholds=self.application_context.configuration.app_evaluate_fuzzy_match_thresholds,
+            ),
+            executor=get_evaluation_executor(
+                self.application_context.configuration.app_evaluate_worker_processes
+            ),
         )
 
         # Merge the confidence scores - Content Understanding and GPT results.
@@ -84,12 +86,19 @@ class EvaluateHandler(HandlerBase):
             threads_hold=0.8,  # TODO: Get this from config
         )
 
+        # Prompt tokens served from the prompt cache - not reported by every API version
+        prompt_tokens_details = gpt_result.usage.prompt_tokens_details
+        cached_tokens = (
+            prompt_tokens_details.cached_tokens or 0 if prompt_tokens_details else 0
+        )
+
         # Put all results in a single object
         all_results = DataExtractionResult(
             extracted_result=gpt_evaluate_confidence_dict,
             confidence=merged_confidence_score,
             comparison_result=result_data,
             prompt_tokens=gpt_result.usage.prompt_tokens,
+            cached_tokens=cached_tokens,
             completion_tokens=gpt_result.usage.completion_tokens,
             execution_time=0,
         )
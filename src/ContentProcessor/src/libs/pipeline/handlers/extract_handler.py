@@ -4,6 +4,9 @@
 from libs.application.application_context import AppContext
 from libs.azure_helper.content_understanding import AzureContentUnderstandingHelper
 from libs.azure_helper.model.content_understanding import AnalyzedResult
+from libs.pipeline.entities.extracted_content import (
+    build_extracted_content_digest,
+)
 from libs.pipeline.entities.pipeline_file import PipelineLogEntry
 from libs.pipeline.entities.pipeline_message_context import MessageContext
 from libs.pipeline.entities.pipeline_step_result import StepResult
@@ -59,6 +62,29 @@ class ExtractHandler(HandlerBase):
             text=result.model_dump_json(),
         )
 
+        # Save the markdown and the page statistics used by the Map step as their own file,
+        # so the Map step does not load the whole result
+        digest_file = context.data_pipeline.add_file(
+            file_name="content_understanding_digest.json",
+            artifact_type=ArtifactType.ExtractedContentDigest,
+        )
+        digest_file.log_entries.append(
+            PipelineLogEntry(
+                **{
+                    "source": self.handler_name,
+                    "message": "Content Understanding Extraction Digest has been added",
+                }
+            )
+        )
+        digest_file.upload_json_text(
+            account_url=self.application_context.configuration.app_storage_blob_url,
+            container_name=self.application_context.configuration.app_cps_processes,
+            text=build_extracted_content_digest(
+                response,
+                self.application_context.configuration.app_map_modality_low_confidence_threshold,
+            ).model_dump_json(),
+        )
+
         return StepResult(
             process_id=context.data_pipeline.pipeline_status.process_id,
             step_name=self.handler_name,
@@ -3,7 +3,7 @@ from typing import Any, List, Optional
 import pandas as pd
 from pydantic import BaseModel
 
-from libs.utils.utils import flatten_dict
+from libs.utils.utils import flatten_dict, iter_flattened_items
 
 
 class ExtractionComparisonItem(BaseModel):
@@ -45,19 +45,23 @@ def get_extraction_comparison_data(
 
     # expected_flat = flatten_dict(expected)
     extracted_flat = flatten_dict(actual)
-    confidence_flat = flatten_dict(confidence)
+    # Only the field confidences are kept from the (much larger) confidence tree
+    confidence_flat = {
+        key: value
+        for key, value in iter_flattened_items(confidence)
+        if isinstance(key, str) and key.endswith("_confidence")
+    }
     # accuracy_flat = flatten_dict(accuracy)
 
-    all_keys = sorted(set(extracted_flat.keys()))
-
     items = []
-    for key in all_keys:
+    for key in sorted(extracted_flat):
+        field_confidence = confidence_flat.get(f"{key}_confidence", 0.0)
         items.append(
             ExtractionComparisonItem(
                 Field=key,
-                Extracted=extracted_flat.get(key),
-                Confidence=f"{confidence_flat.get(f'{key}_confidence', 0.0) * 100:.2f}%",
-                IsAboveThreshold=f"{True if confidence_flat.get(f'{key}_confidence', 0.0) > threads_hold else False}",
+                Extracted=extracted_flat[key],
+                Confidence=f"{field_confidence * 100:.2f}%",
+                IsAboveThreshold=field_confidence > threads_hold,
             )
         )
 
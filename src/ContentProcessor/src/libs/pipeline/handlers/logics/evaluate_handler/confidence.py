@@ -59,11 +59,47 @@ def find_keys_with_min_confidence(data, min_confidence, key="confidence"):
     return keys_with_min_confidence
 
 
+class _ConfidenceStatistics:
+    """
+    Collects the statistics of the merged confidence values while the merged tree is built.
+
+    Paths use the format of find_keys_with_min_confidence, and are only built for the
+    fields with the minimum or a zero confidence.
+    """
+
+    def __init__(self):
+        self.scores = []
+        self.min_confidence = None
+        self.min_confidence_paths = []
+        self.zero_confidence_paths = []
+
+    def add(self, confidence: float, path: list[str]):
+        if confidence is None:
+            return
+        if confidence == 0:
+            self.zero_confidence_paths.append(_join_path(path))
+            return
+
+        self.scores.append(confidence)
+        if self.min_confidence is None or confidence < self.min_confidence:
+            self.min_confidence = confidence
+            self.min_confidence_paths = [_join_path(path)]
+        elif confidence == self.min_confidence:
+            self.min_confidence_paths.append(_join_path(path))
+
+
+def _join_path(path: list[str]) -> str:
+    return "".join(path)
+
+
 def merge_confidence_values(confidence_a: dict, confidence_b: dict):
     """
     Merges to evaluations of confidence for the same set of fields as one.
     This is achieved by summing the confidence values and averaging the scores.
 
+    The merged tree and its statistics (count, overall and minimum confidence, and the fields
+    with the minimum or a zero confidence) are produced in a single traversal.
+
     Args:
         confidence_a: The first confidence evaluation.
         confidence_b: The second confidence evaluation.
@@ -72,8 +108,12 @@ def merge_confidence_values(confidence_a: dict, confidence_b: dict):
         dict: The merged confidence evaluation.
     """
 
+    CONFIDENT_SCORE_ROUNDING = 3
+
+    statistics = _ConfidenceStatistics()
+
     def merge_field_confidence_value(
-        field_a: any, field_b: any, score_resolver: callable = min
+        field_a: any, field_b: any, path: list[str], score_resolver: callable = min
     ) -> dict:
         """
         Merges two field confidence values.
@@ -82,24 +122,31 @@ def merge_confidence_values(confidence_a: dict, confidence_b: dict):
         Args:
             field_a: The first field confidence value.
             field_b: The second field confidence value.
+            path: The path segments of the field.
 
         Returns:
             dict: The merged field confidence value.
         """
 
-        CONFIDENT_SCORE_ROUNDING = 3
-
         if isinstance(field_a, dict) and "confidence" not in field_a:
-            return {
-                key: merge_field_confidence_value(field_a[key], field_b[key])
-                for key in field_a
-                if not key.startswith("_")
-            }
+            merged = {}
+            for key in field_a:
+                if not key.startswith("_"):
+                    path.append(f".{key}" if any(path) else key)
+                    merged[key] = merge_field_confidence_value(
+                        field_a[key], field_b[key], path
+                    )
+                    path.pop()
+            return merged
         elif isinstance(field_a, list):
-            return [
-                merge_field_confidence_value(field_a[i], field_b[i])
-                for i in range(len(field_a))
-            ]
+            merged = []
+            for i in range(len(field_a)):
+                path.append(f"[{i}]")
+                merged.append(
+                    merge_field_confidence_value(field_a[i], field_b[i], path)
+                )
+                path.pop()
+            return merged
         else:
             valid_confidences = [
                 conf
@@ -107,25 +154,25 @@ def merge_confidence_values(confidence_a: dict, confidence_b: dict):
                 if conf not in (None, 0)
             ]
 
-            merged_confidence = (
-                score_resolver(valid_confidences) if valid_confidences else 0.0
+            merged_confidence = round(
+                score_resolver(valid_confidences) if valid_confidences else 0.0,
+                CONFIDENT_SCORE_ROUNDING,
             )
-            return {
-                "confidence": round(merged_confidence, CONFIDENT_SCORE_ROUNDING),
+            statistics.add(merged_confidence, path)
+
+            merged_field = {
+                "confidence": merged_confidence,
                 "value": field_a["value"] if "value" in field_a else None,
             }
+            # Keep how and where the value was matched with the document lines
+            if "match_mode" in field_a:
+                merged_field["match_mode"] = field_a["match_mode"]
+            if "line_references" in field_a:
+                merged_field["line_references"] = field_a["line_references"]
+            return merged_field
 
-            # return {
-            #     "confidence": score_resolver(valid_confidences)
-            #     if valid_confidences
-            #     else 0.0,
-            #     #"value": field_a["value"] if "field" in field_a else None,
-            #     "value": field_a["value"] if "value" in field_a else None
-            #     #"normalized_polygons": field_a["normalized_polygons"]
-            # }
-
-    merged_confidence = merge_field_confidence_value(confidence_a, confidence_b)
-    confidence_scores = get_confidence_values(merged_confidence)
+    merged_confidence = merge_field_confidence_value(confidence_a, confidence_b, [])
+    confidence_scores = statistics.scores
 
     if confidence_scores and len(confidence_scores) > 0:
         merged_confidence["total_evaluated_fields_count"] = len(confidence_scores)
@@ -133,27 +180,15 @@ def merge_confidence_values(confidence_a: dict, confidence_b: dict):
             sum(confidence_scores) / merged_confidence["total_evaluated_fields_count"],
             3,
         )
-        merged_confidence["min_extracted_field_confidence"] = min(confidence_scores)
-        # find all the keys which has min_extracted_field_confidence value
+        merged_confidence["min_extracted_field_confidence"] = statistics.min_confidence
+        # all the keys which has min_extracted_field_confidence value
         merged_confidence["min_extracted_field_confidence_field"] = (
-            find_keys_with_min_confidence(
-                merged_confidence, merged_confidence["min_extracted_field_confidence"]
-            )
-        )
-        merged_confidence["zero_confidence_fields"] = find_keys_with_min_confidence(
-            merged_confidence, 0
+            statistics.min_confidence_paths
         )
+        merged_confidence["zero_confidence_fields"] = statistics.zero_confidence_paths
         merged_confidence["zero_confidence_fields_count"] = len(
             merged_confidence["zero_confidence_fields"]
         )
-        # merged_confidence["overall_hit_rate"] = round(
-        #     (
-        #         merged_confidence["total_evaluated_fields_count"]
-        #         - merged_confidence["missed_fields_count"]
-        #     )
-        #     / merged_confidence["total_evaluated_fields_count"],
-        #     3,
-        # )
     else:
         merged_confidence["overall"] = 0.0
         merged_confidence["total_evaluated_fields_count"] = 0
@@ -1,18 +1,37 @@
-import copy
+from collections import Counter
 from typing import Iterable, Optional
 
+import numpy as np
 from pydantic import Field
 
 from libs.azure_helper.model.content_understanding import (
     DocumentContent,
     Line,
     Page,
+    Span,
     Word,
 )
+from libs.azure_helper.model.content_understanding_layout import ColumnarDocument
 from libs.pipeline.handlers.logics.evaluate_handler.confidence import (
     get_confidence_values,
 )
-from libs.utils.utils import value_contains, value_match
+from libs.pipeline.handlers.logics.evaluate_handler.fuzzy_matching import (
+    FuzzyMatchPolicy,
+    bounded_substring_distance,
+    get_date_variants,
+    get_field_type,
+    get_fuzzy_pattern,
+    get_min_shared_qgrams,
+    get_qgrams,
+    normalize_fuzzy_text,
+)
+from libs.utils.utils import normalize_text, value_contains, value_match
+
+# Length of the n-grams indexed for value_contains lookups
+CONTAINS_NGRAM_SIZE = 3
+
+# Punctuation around a word ignored by find_word_indexes - e.g. "R," in "Skills: R, Python"
+WORD_PUNCTUATION = ",;:.!?()[]{}\"'"
 
 
 class DIDocumentLine(Line):
@@ -23,12 +42,14 @@ class DIDocumentLine(Line):
         normalized_polygon (Optional[list[dict[str, int]]]): The normalized polygon coordinates of the document line.
         confidence (float): The confidence score of the document line.
         page_number (int): The page number where the document line is located.
+        line_number (int): The index of the document line within its page.
         contained_words (list[DocumentWord]): The list of words contained in the document line.
     """
 
     normalized_polygon: Optional[list[dict[str, int]]] = Field(default=None)
     confidence: Optional[float] = Field(default=None)
     page_number: Optional[int] = Field(default=None)
+    line_number: Optional[int] = Field(default=None)
     contained_words: Optional[list[Word]] = Field(default=None)
 
     def to_dict(self):
@@ -43,6 +64,7 @@ class DIDocumentLine(Line):
         as_dict["normalized_polygon"] = self.normalized_polygon
         as_dict["confidence"] = self.confidence
         as_dict["page_number"] = self.page_number
+        as_dict["line_number"] = self.line_number
         as_dict["contained_words"] = self.contained_words
 
         return as_dict
@@ -118,34 +140,358 @@ def extract_lines(
         list: The list of DIDocumentLine instances extracted from the analysis result.
     """
 
-    di_lines = list()
-    for page_number, page in enumerate(analyze_result.pages):
-        for line in page.lines:
-            line_copy = copy.copy(line)
-            contained_words = list()
-            # for span in line_copy.spans:
-            # Find words in the page that are fully contained within the span
-            span = line_copy.span
-            span_offset_start = span.offset
-            span_offset_end = span_offset_start + span.length
-            words_contained = [
-                word
-                for word in page.words
-                if word.span.offset >= span_offset_start
-                and word.span.offset + word.span.length <= span_offset_end
-            ]
-            contained_words.extend(words_contained)
+    return DocumentLineIndex(analyze_result, multiple_score_resolver).lines
+
+
+class DocumentLineIndex:
+    """
+    A class representing the lines of a Content Understanding Service result, indexed once per document.
+
+    The index is built on the columnar layout of the document (see ColumnarDocument): the line
+    confidences are computed for whole pages at once, and a line is only materialized as a
+    DIDocumentLine (with its contained words and normalized polygon) when it is requested.
+
+    Substring lookups (value_contains) use the lines' normalized text and an inverted index of
+    its n-grams: only the lines containing every n-gram of the value are compared.
+    Approximate lookups (find_similar) use a q-gram index of the lines' letters and digits:
+    only the lines sharing enough q-grams with the value are compared by edit distance.
+
+    Attributes:
+        document (ColumnarDocument): The columnar layout of the document.
+        contents (list[str]): The content of each line, in document order.
+        confidences (list[float]): The confidence of each line.
+        references (list[dict[str, int]]): The reference of each line, as {"page": page index, "line": line index within the page}.
+        indexes_by_content (dict[str, list[int]]): The line indexes keyed by their lower case content, for exact matches.
+        normalized_contents (list[str]): The normalized content of each line (see normalize_text).
+    """
+
+    def __init__(
+        self,
+        analyze_result: DocumentContent | ColumnarDocument,
+        multiple_score_resolver: callable = min,
+    ):
+        """
+        Initializes a new instance of the DocumentLineIndex class.
+
+        Args:
+            analyze_result: The Content Understanding Service result to index, validated or columnar.
+            multiple_score_resolver: The function to resolve multiple confidence scores of contained words.
+        """
+
+        if not isinstance(analyze_result, ColumnarDocument):
+            analyze_result = ColumnarDocument.from_document_content(analyze_result)
+        self.document = analyze_result
+
+        self.contents: list[str] = list()
+        self.confidences: list[float] = list()
+        self.references: list[dict[str, int]] = list()
+        # The (line, word) pairs of each page, to materialize the lines' contained words
+        self._page_line_words: list[tuple[np.ndarray, np.ndarray]] = list()
+        for page_number, page in enumerate(self.document.pages):
+            line_indexes, word_indexes = page.get_line_words()
+            self._page_line_words.append((line_indexes, word_indexes))
+
+            if multiple_score_resolver is min:
+                # Lowest contained word confidence of every line of the page at once
+                confidences = page.get_line_confidences().tolist()
+            else:
+                boundaries = np.searchsorted(
+                    line_indexes, np.arange(page.line_count + 1), side="left"
+                )
+                word_confidences = page.word_confidences[word_indexes].tolist()
+                confidences = [
+                    multiple_score_resolver(
+                        word_confidences[boundaries[line] : boundaries[line + 1]]
+                    )
+                    for line in range(page.line_count)
+                ]
+
+            self.contents.extend(page.line_contents)
+            self.confidences.extend(confidences)
+            self.references.extend(
+                {"page": page_number, "line": line_number}
+                for line_number in range(page.line_count)
+            )
+
+        self.indexes_by_content: dict[str, list[int]] = dict()
+        for index, content in enumerate(self.contents):
+            self.indexes_by_content.setdefault(content.lower(), []).append(index)
+
+        self.normalized_contents = [
+            normalize_text(content) for content in self.contents
+        ]
+        # Materialized on request
+        self._lines: dict[int, DIDocumentLine] = dict()
+        # Built on the first substring lookup
+        self._ngram_postings: Optional[dict[str, set[int]]] = None
+        # Built on the first approximate lookup
+        self._fuzzy_contents: Optional[list[str]] = None
+        self._qgram_postings: Optional[dict[str, set[int]]] = None
+        self._max_fuzzy_length = 0
+
+    @property
+    def lines(self) -> list[DIDocumentLine]:
+        """
+        The enriched lines of the document, in document order. Every line is materialized.
+        """
 
-            contained_words_conf_scores = [word.confidence for word in contained_words]
+        return [self.get_line(index) for index in range(len(self.contents))]
 
-            di_line = DIDocumentLine(**line_copy.model_dump())
+    def get_line(self, index: int) -> DIDocumentLine:
+        """
+        Materialize an indexed line with its confidence, contained words and normalized polygon.
+
+        Args:
+            index: The index of the line in document order.
+
+        Returns:
+            DIDocumentLine: The enriched line.
+        """
+
+        if index not in self._lines:
+            reference = self.references[index]
+            page = self.document.pages[reference["page"]]
+            line_number = reference["line"]
+
+            line_indexes, word_indexes = self._page_line_words[reference["page"]]
+            low, high = np.searchsorted(line_indexes, [line_number, line_number + 1])
+            contained_words = [
+                Word(
+                    content=page.word_contents[word],
+                    span=Span(
+                        offset=int(page.word_offsets[word]),
+                        length=int(page.word_lengths[word]),
+                    ),
+                    confidence=float(page.word_confidences[word]),
+                    source=page.word_sources[word],
+                )
+                for word in word_indexes[low:high].tolist()
+            ]
+
+            di_line = DIDocumentLine(
+                content=page.line_contents[line_number],
+                source=page.line_sources[line_number],
+                span=Span(
+                    offset=int(page.line_offsets[line_number]),
+                    length=int(page.line_lengths[line_number]),
+                ),
+            )
             di_line.contained_words = contained_words
-            di_line.page_number = page_number
-            di_line.confidence = multiple_score_resolver(contained_words_conf_scores)
-            di_line.normalized_polygon = normalize_polygon(page, line_copy.polygon)
+            di_line.page_number = reference["page"]
+            di_line.line_number = line_number
+            di_line.confidence = self.confidences[index]
+            # Normalized for the whole page once, on its first materialized line
+            di_line.normalized_polygon = page.get_normalized_line_polygon(line_number)
+            self._lines[index] = di_line
+        return self._lines[index]
+
+    def find(
+        self, value: str, value_matcher: callable = value_match
+    ) -> list[DIDocumentLine]:
+        """
+        Find the indexed lines that match a given value, in document order.
+
+        Args:
+            value: The value to match.
+            value_matcher: The function to use for matching values.
+
+        Returns:
+            list: The list of DIDocumentLine instances that match the given value.
+        """
+
+        return [
+            self.get_line(index) for index in self.find_indexes(value, value_matcher)
+        ]
+
+    def find_indexes(
+        self, value: str, value_matcher: callable = value_match
+    ) -> list[int]:
+        """
+        Find the indexes of the lines that match a given value, in document order, without materializing them.
+
+        Args:
+            value: The value to match.
+            value_matcher: The function to use for matching values.
 
-            di_lines.append(di_line)
-    return di_lines
+        Returns:
+            list: The indexes of the matching lines.
+        """
+
+        if value_matcher is value_match:
+            # Case-insensitive string equality - served by the content lookup
+            return list(self.indexes_by_content.get(value.lower(), []))
+
+        if value_matcher is value_contains:
+            # Case and space insensitive substring - served by the n-gram index
+            return self._find_containing(value)
+
+        return [
+            index
+            for index, content in enumerate(self.contents)
+            if value_matcher(value, content)
+        ]
+
+    def find_word_indexes(self, value: str) -> list[int]:
+        """
+        Find the indexes of the lines containing a value as a whole word, in document order.
+
+        Args:
+            value: The value to match, case-insensitive.
+
+        Returns:
+            list: The indexes of the matching lines.
+        """
+
+        word = value.strip().lower()
+        return [
+            index
+            for index, content in enumerate(self.contents)
+            if any(
+                token.strip(WORD_PUNCTUATION) == word
+                for token in content.lower().split()
+            )
+        ]
+
+    def find_similar(
+        self, value: str, threshold: float, variants: Optional[list[str]] = None
+    ) -> list[tuple[DIDocumentLine, float]]:
+        """
+        Find the indexed lines containing a value approximately, in document order.
+        See find_similar_indexes.
+
+        Returns:
+            list: The matching lines with their similarity.
+        """
+
+        return [
+            (self.get_line(index), similarity)
+            for index, similarity in self.find_similar_indexes(
+                value, threshold, variants
+            )
+        ]
+
+    def find_similar_indexes(
+        self, value: str, threshold: float, variants: Optional[list[str]] = None
+    ) -> list[tuple[int, float]]:
+        """
+        Find the indexed lines containing a value approximately, in document order.
+
+        The value and the lines are compared on their letters and digits only (see get_fuzzy_pattern).
+        The similarity is 1 - edit distance / value length, for the closest substring of the line.
+        Values too short to be filtered by their q-grams at the threshold are not matched.
+
+        Args:
+            value: The value to match.
+            threshold: The minimum similarity (0 to 1).
+            variants: Alternative renderings of the value (e.g. date formats); the best similarity is kept.
+
+        Returns:
+            list: The indexes of the matching lines with their similarity.
+        """
+
+        fuzzy_contents, postings = self._get_qgram_postings()
+
+        similarities: dict[int, float] = dict()
+        for variant in variants or [value]:
+            pattern = get_fuzzy_pattern(variant)
+            if pattern is None:
+                continue
+
+            max_distance = int((1 - threshold) * len(pattern) + 1e-9)
+            # Lines shorter than this cannot contain the value within max_distance edits
+            min_length = len(pattern) - max_distance
+            if min_length > self._max_fuzzy_length:
+                continue
+
+            min_shared = get_min_shared_qgrams(len(pattern), max_distance)
+            if min_shared <= 0:
+                # Too short for the threshold - every line would be a candidate
+                continue
+
+            # Count the value's q-grams found in each line - lines below the bound cannot match
+            shared_counts: dict[int, int] = dict()
+            for qgram, occurrences in Counter(get_qgrams(pattern)).items():
+                for index in postings.get(qgram, ()):
+                    shared_counts[index] = shared_counts.get(index, 0) + occurrences
+            candidates = [
+                index for index, count in shared_counts.items() if count >= min_shared
+            ]
+
+            for index in candidates:
+                if len(fuzzy_contents[index]) < min_length:
+                    continue
+                distance = bounded_substring_distance(
+                    pattern, fuzzy_contents[index], max_distance
+                )
+                if distance is not None:
+                    similarity = 1 - distance / len(pattern)
+                    similarities[index] = max(similarities.get(index, 0.0), similarity)
+
+        return [
+            (index, round(similarities[index], 3)) for index in sorted(similarities)
+        ]
+
+    def _get_qgram_postings(self) -> tuple[list[str], dict[str, set[int]]]:
+        if self._qgram_postings is None:
+            self._fuzzy_contents = [
+                normalize_fuzzy_text(content) for content in self.contents
+            ]
+            self._max_fuzzy_length = max(map(len, self._fuzzy_contents), default=0)
+            self._qgram_postings = dict()
+            for index, content in enumerate(self._fuzzy_contents):
+                for qgram in get_qgrams(content):
+                    self._qgram_postings.setdefault(qgram, set()).add(index)
+        return self._fuzzy_contents, self._qgram_postings
+
+    def _find_containing(self, value: str) -> list[int]:
+        """
+        Find the indexes of the lines whose normalized content contains the normalized value.
+        """
+
+        normalized_value = normalize_text(value)
+        if len(normalized_value) < CONTAINS_NGRAM_SIZE:
+            # Too short to be indexed - compare with every normalized line
+            return [
+                index
+                for index, content in enumerate(self.normalized_contents)
+                if normalized_value in content
+            ]
+
+        postings = self._get_ngram_postings()
+        candidates = None
+        # Intersect the smallest posting lists first
+        for ngram in sorted(
+            set(_get_ngrams(normalized_value)),
+            key=lambda ngram: len(postings.get(ngram, ())),
+        ):
+            lines = postings.get(ngram)
+            if not lines:
+                return []
+            candidates = set(lines) if candidates is None else candidates & lines
+            if not candidates:
+                return []
+
+        # Every n-gram matched - confirm the substring and keep the document order
+        return [
+            index
+            for index in sorted(candidates)
+            if normalized_value in self.normalized_contents[index]
+        ]
+
+    def _get_ngram_postings(self) -> dict[str, set[int]]:
+        if self._ngram_postings is None:
+            self._ngram_postings = dict()
+            for index, content in enumerate(self.normalized_contents):
+                for ngram in _get_ngrams(content):
+                    self._ngram_postings.setdefault(ngram, set()).add(index)
+        return self._ngram_postings
+
+
+def _get_ngrams(text: str) -> Iterable[str]:
+    return (
+        text[index : index + CONTAINS_NGRAM_SIZE]
+        for index in range(len(text) - CONTAINS_NGRAM_SIZE + 1)
+    )
 
 
 def find_matching_lines(
@@ -153,6 +499,7 @@ def find_matching_lines(
     analyze_result: DocumentContent,
     value_matcher: callable = value_match,
     multiple_score_resolver: callable = min,
+    line_index: Optional[DocumentLineIndex] = None,
 ) -> list[DIDocumentLine]:
     """
     Find lines in the  Content Understanding Service result that match a given value.
@@ -162,6 +509,7 @@ def find_matching_lines(
         analyze_result: The  Content Understanding Service result to search for matching lines.
         value_matcher: The function to use for matching values.
         multiple_score_resolver: The function to resolve multiple confidence scores of contained words.
+        line_index: The line index of analyze_result. When not provided, the lines are extracted for this lookup only.
 
     Returns:
         list: The list of DIDocumentLine instances that match the given value.
@@ -173,11 +521,10 @@ def find_matching_lines(
     if not isinstance(value, str):
         value = str(value)
 
-    di_lines = extract_lines(analyze_result, multiple_score_resolver)
-
-    matching_lines = [line for line in di_lines if value_matcher(value, line.content)]
+    if line_index is None:
+        line_index = DocumentLineIndex(analyze_result, multiple_score_resolver)
 
-    return matching_lines
+    return line_index.find(value, value_matcher)
 
 
 def get_field_confidence_score(
@@ -204,18 +551,34 @@ def get_field_confidence_score(
     return multiple_score_resolver(scores)
 
 
-def evaluate_confidence(extract_result: dict, analyze_result: DocumentContent):
+def evaluate_confidence(
+    extract_result: dict,
+    analyze_result: DocumentContent | ColumnarDocument,
+    fuzzy_match_policy: Optional[FuzzyMatchPolicy] = None,
+):
     """
     Evaluate the confidence of extracted fields based on the  Content Understanding Service result.
 
+    Each value is matched against the document lines exactly first, then as a substring, and
+    finally approximately (fuzzy_match_policy); the match mode is recorded with the confidence.
+    The matching lines are recorded as line references (see DocumentLineIndex.references), which
+    DocumentLineIndex.get_line, or the API when the process is read, turns back into the lines.
+
     Args:
         extract_result: The extracted fields to evaluate.
-        analyze_result: The  Content Understanding Service result to evaluate against.
+        analyze_result: The  Content Understanding Service result to evaluate against, validated or columnar.
+        fuzzy_match_policy: The approximate matching settings. Defaults to FuzzyMatchPolicy().
 
     Returns:
         dict: The confidence evaluation of the extracted fields.
     """
 
+    if fuzzy_match_policy is None:
+        fuzzy_match_policy = FuzzyMatchPolicy()
+
+    # Extract the lines once and reuse them for every field
+    line_index = DocumentLineIndex(analyze_result)
+
     def evaluate_field_value_confidence(
         value: any,
     ) -> dict[str, any]:
@@ -239,28 +602,60 @@ def evaluate_confidence(extract_result: dict, analyze_result: DocumentContent):
             return [evaluate_field_value_confidence(item) for item in value]
         else:
             # Find lines that match the value exactly or contain the value
-            matching_lines = find_matching_lines(
-                value, analyze_result, value_matcher=value_match
+            match_mode = "exact"
+            matching_indexes = (
+                line_index.find_indexes(str(value), value_match) if value else []
             )
-            if not matching_lines:
-                matching_lines = find_matching_lines(
-                    value, analyze_result, value_matcher=value_contains
+            if not matching_indexes and value:
+                match_mode = "contains"
+                if len(normalize_text(str(value))) < CONTAINS_NGRAM_SIZE:
+                    # A letter or two is found inside almost any line - only whole words count
+                    matching_indexes = line_index.find_word_indexes(str(value))
+                else:
+                    matching_indexes = line_index.find_indexes(
+                        str(value), value_contains
+                    )
+            scores = [line_index.confidences[index] for index in matching_indexes]
+
+            # Find lines that contain the value approximately - e.g. reformatted dates or punctuation differences
+            field_type = get_field_type(value)
+            threshold = fuzzy_match_policy.get_threshold(field_type)
+            if not matching_indexes and value and threshold is not None:
+                match_mode = "fuzzy"
+                similar_lines = line_index.find_similar_indexes(
+                    str(value),
+                    threshold,
+                    variants=(
+                        get_date_variants(str(value)) if field_type == "date" else None
+                    ),
                 )
+                matching_indexes = [index for index, _ in similar_lines]
+                # The line confidence is weighted by the similarity of the match
+                scores = [
+                    line_index.confidences[index] * similarity
+                    for index, similarity in similar_lines
+                ]
+
+            if not matching_indexes:
+                match_mode = "none"
 
             # Calculate the confidence score based on the matching lines
             field_confidence_score = get_field_confidence_score(
-                scores=[match.confidence for match in matching_lines],
+                scores=scores,
                 default_score=0.0,
                 multiple_score_resolver=min,
             )
 
-            normalized_polygons = [line.normalized_polygon for line in matching_lines]
+            # Reference the matching lines instead of embedding them - see DocumentLineIndex.get_line
+            line_references = [
+                dict(line_index.references[index]) for index in matching_indexes
+            ]
 
             return {
                 "confidence": field_confidence_score,
-                "matching_lines": matching_lines,
-                "normalized_polygons": normalized_polygons,
+                "line_references": line_references,
                 "value": value,
+                "match_mode": match_mode,
             }
 
     confidence = dict()
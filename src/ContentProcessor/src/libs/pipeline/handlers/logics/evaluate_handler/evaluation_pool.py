@@ -0,0 +1,133 @@
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional
+
+from openai.types.chat.chat_completion import Choice
+
+from libs.azure_helper.model.content_understanding_layout import ColumnarDocument
+from libs.pipeline.handlers.logics.evaluate_handler.content_understanding_confidence_evaluator import (
+    evaluate_confidence as content_understanding_confidence,
+)
+from libs.pipeline.handlers.logics.evaluate_handler.fuzzy_matching import (
+    FuzzyMatchPolicy,
+)
+from libs.pipeline.handlers.logics.evaluate_handler.openai_confidence_evaluator import (
+    evaluate_confidence as gpt_confidence,
+)
+
+# Worker pools per size, kept for the life of the handler process
+_executors: dict[int, ProcessPoolExecutor] = dict()
+
+
+def get_evaluation_executor(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Get the worker process pool running the confidence evaluators.
+
+    The pool is created on first use and reused for every message handled by the process.
+    Workers are spawned, so they do not inherit the handler's threads or open connections.
+
+    Args:
+        max_workers: The number of worker processes. 0 or less evaluates in the calling process.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The worker pool, or None to evaluate in the calling process.
+    """
+
+    if max_workers <= 0:
+        return None
+
+    executor = _executors.get(max_workers)
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        _executors[max_workers] = executor
+    return executor
+
+
+def _discard_executor(executor: Executor):
+    for max_workers, pooled_executor in list(_executors.items()):
+        if pooled_executor is executor:
+            del _executors[max_workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def evaluate_content_understanding_confidence(
+    extract_result: dict,
+    analyzed_result_json: str,
+    fuzzy_match_policy: FuzzyMatchPolicy,
+) -> dict:
+    """
+    Evaluate the confidence of the extracted fields against the Extract step output.
+
+    The Extract step output is read here into its columnar layout, straight from the JSON,
+    so a worker process does the parsing too.
+
+    Args:
+        extract_result: The extracted fields to evaluate.
+        analyzed_result_json: The Extract step output (AnalyzedResult) as a JSON string.
+        fuzzy_match_policy: The approximate matching settings.
+
+    Returns:
+        dict: The confidence evaluation of the extracted fields.
+    """
+
+    analyzed_result = json.loads(analyzed_result_json)
+    return content_understanding_confidence(
+        extract_result,
+        ColumnarDocument.from_dict(analyzed_result["result"]["contents"][0]),
+        fuzzy_match_policy,
+    )
+
+
+async def evaluate_confidences(
+    extract_result: dict,
+    analyzed_result_json: str,
+    choice: Choice,
+    fuzzy_match_policy: FuzzyMatchPolicy,
+    executor: Optional[Executor] = None,
+) -> tuple[dict, dict]:
+    """
+    Evaluate the confidence of the extracted fields with Content Understanding and with the GPT logprobs.
+
+    The evaluators are independent, so with an executor they run concurrently and the
+    wall time approaches the slower of the two. Each evaluator receives its inputs once.
+
+    Args:
+        extract_result: The extracted fields to evaluate.
+        analyzed_result_json: The Extract step output (AnalyzedResult) as a JSON string.
+        choice: The choice of the Map step response.
+        fuzzy_match_policy: The approximate matching settings.
+        executor: The worker pool (see get_evaluation_executor). None evaluates sequentially in the calling process.
+
+    Returns:
+        tuple[dict, dict]: The Content Understanding and the GPT confidence evaluations.
+    """
+
+    content_understanding_call = partial(
+        evaluate_content_understanding_confidence,
+        extract_result,
+        analyzed_result_json,
+        fuzzy_match_policy,
+    )
+    gpt_call = partial(gpt_confidence, extract_result, choice)
+
+    if executor is None:
+        return content_understanding_call(), gpt_call()
+
+    loop = asyncio.get_running_loop()
+    try:
+        content_understanding_score, gpt_score = await asyncio.gather(
+            loop.run_in_executor(executor, content_understanding_call),
+            loop.run_in_executor(executor, gpt_call),
+        )
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory) - replace the pool next time and evaluate here
+        _discard_executor(executor)
+        return content_understanding_call(), gpt_call()
+
+    return content_understanding_score, gpt_score
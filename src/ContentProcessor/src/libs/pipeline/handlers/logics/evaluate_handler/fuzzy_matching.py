@@ -0,0 +1,224 @@
+import re
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+# Length of the q-grams used to filter candidate lines
+FUZZY_QGRAM_SIZE = 2
+
+# Shortest normalized value matched approximately - shorter ones (e.g. "C#" -> "c") match almost any line
+FUZZY_MIN_PATTERN_LENGTH = max(4, FUZZY_QGRAM_SIZE + 1)
+
+# Lowest share of a value's non-whitespace characters kept by normalize_fuzzy_text for it to be matched approximately
+FUZZY_MIN_KEPT_RATIO = 0.6
+
+_ISO_DATE_PATTERN = re.compile(r"^(\d{4})-(\d{2})(?:-(\d{2}))?$")
+_NUMBER_PATTERN = re.compile(r"^[+-]?[\d,]*\.?\d+$")
+
+_MONTH_NAMES = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+
+class FuzzyMatchPolicy(BaseModel):
+    """
+    A class representing the settings of the approximate value-to-line matching.
+
+    Attributes:
+        enabled (bool): Flag to match values approximately when no line matches or contains them.
+        thresholds (dict[str, float]): The minimum similarity per field type ("text", "date", "number").
+            Field types without a threshold are never matched approximately.
+    """
+
+    enabled: bool = True
+    thresholds: dict[str, float] = Field(
+        default_factory=lambda: {"text": 0.85, "date": 0.85, "number": 1.0}
+    )
+
+    def get_threshold(self, field_type: str) -> Optional[float]:
+        """
+        Get the similarity threshold of a field type, or None if the field type is not matched approximately.
+        """
+
+        if not self.enabled:
+            return None
+        return self.thresholds.get(field_type)
+
+
+def get_field_type(value: any) -> str:
+    """
+    Infer the type of an extracted field value.
+
+    Args:
+        value: The extracted field value.
+
+    Returns:
+        str: "boolean", "number", "date" (ISO 8601 date or year-month) or "text".
+    """
+
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+
+    value = str(value).strip()
+    if _ISO_DATE_PATTERN.match(value):
+        return "date"
+    if _NUMBER_PATTERN.match(value):
+        return "number"
+    return "text"
+
+
+def normalize_fuzzy_text(value: str) -> str:
+    """
+    Normalize a string for approximate matching: lower case letters and digits only,
+    so whitespace and punctuation differences are ignored.
+
+    Args:
+        value: The string to normalize.
+
+    Returns:
+        str: The normalized string.
+    """
+
+    return "".join(character for character in value.lower() if character.isalnum())
+
+
+def get_fuzzy_pattern(value: str) -> Optional[str]:
+    """
+    Normalize a value for approximate matching (see normalize_fuzzy_text), if it can be matched approximately.
+
+    Values which are too short once normalized, or which lose too many characters to normalization
+    (e.g. "C++"), are only matched exactly or as a substring.
+
+    Args:
+        value: The value to normalize.
+
+    Returns:
+        Optional[str]: The normalized value, or None if it must not be matched approximately.
+    """
+
+    pattern = normalize_fuzzy_text(value)
+    if len(pattern) < FUZZY_MIN_PATTERN_LENGTH:
+        return None
+
+    significant_length = sum(1 for character in value if not character.isspace())
+    if len(pattern) < FUZZY_MIN_KEPT_RATIO * significant_length:
+        return None
+
+    return pattern
+
+
+def get_date_variants(value: str) -> list[str]:
+    """
+    Get the common renderings of an ISO 8601 date (YYYY-MM-DD or YYYY-MM) as they may appear in a document.
+
+    Args:
+        value: The ISO 8601 date.
+
+    Returns:
+        list: The date renderings, starting with the value itself.
+    """
+
+    match = _ISO_DATE_PATTERN.match(value.strip())
+    if not match:
+        return [value]
+
+    year, month, day = match.groups()
+    if not 1 <= int(month) <= 12:
+        return [value]
+
+    month_name = _MONTH_NAMES[int(month) - 1]
+    month_short = month_name[:3]
+    short_month = str(int(month))
+
+    if day is None:
+        return [
+            value,
+            f"{month}/{year}",
+            f"{short_month}/{year}",
+            f"{month_name} {year}",
+            f"{month_short} {year}",
+        ]
+
+    short_day = str(int(day))
+    return [
+        value,
+        f"{month}/{day}/{year}",
+        f"{short_month}/{short_day}/{year}",
+        f"{day}.{month}.{year}",
+        f"{month_name} {short_day}, {year}",
+        f"{month_short} {short_day}, {year}",
+        f"{short_day} {month_name} {year}",
+        f"{short_day} {month_short} {year}",
+    ]
+
+
+def get_qgrams(text: str, size: int = FUZZY_QGRAM_SIZE) -> list[str]:
+    """
+    Get the q-grams of a string, in order and with repetitions.
+    """
+
+    return [text[index : index + size] for index in range(len(text) - size + 1)]
+
+
+def get_min_shared_qgrams(
+    pattern_length: int, max_distance: int, size: int = FUZZY_QGRAM_SIZE
+) -> int:
+    """
+    Get the minimum number of the pattern's q-grams found in any text containing the pattern
+    within max_distance edits (q-gram lemma). Lines below it cannot match and are skipped.
+    """
+
+    return pattern_length - size + 1 - max_distance * size
+
+
+def bounded_substring_distance(
+    pattern: str, text: str, max_distance: int
+) -> Optional[int]:
+    """
+    Get the smallest edit distance between the pattern and any substring of the text,
+    if it is at most max_distance.
+
+    Args:
+        pattern: The pattern to find.
+        text: The text to search.
+        max_distance: The maximum edit distance.
+
+    Returns:
+        Optional[int]: The edit distance, or None if it exceeds max_distance.
+    """
+
+    if max_distance == 0:
+        return 0 if pattern in text else None
+
+    # Column of the edit distance matrix, where the match may start at any position of the text
+    column = list(range(len(pattern) + 1))
+    best = column[-1]
+    for character in text:
+        previous_diagonal = 0
+        column[0] = 0
+        for index, pattern_character in enumerate(pattern, start=1):
+            diagonal = column[index]
+            column[index] = min(
+                column[index] + 1,
+                column[index - 1] + 1,
+                previous_diagonal + (pattern_character != character),
+            )
+            previous_diagonal = diagonal
+        best = min(best, column[-1])
+        if best == 0:
+            break
+
+    return best if best <= max_distance else None
@@ -20,6 +20,7 @@ class DataExtractionResult(BaseModel):
         confidence: The confidence of the extracted data.
         accuracy: The accuracy of the extracted data.
         prompt_tokens: The number of tokens in the prompt.
+        cached_tokens: The number of prompt tokens served from the provider's prompt cache.
         completion_tokens: The number of tokens in the completion.
         execution_time: The execution time of the data extraction.
     """
@@ -29,6 +30,7 @@ class DataExtractionResult(BaseModel):
     # self.accuracy = accuracy
     comparison_result: ExtractionComparisonData
     prompt_tokens: int
+    cached_tokens: int = 0
     completion_tokens: int
     execution_time: int
 
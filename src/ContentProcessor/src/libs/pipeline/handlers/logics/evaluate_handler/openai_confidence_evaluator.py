@@ -1,15 +1,75 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import math
+from functools import lru_cache
 
+import numpy as np
 import tiktoken
 from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_token_logprob import ChatCompletionTokenLogprob
 
 from libs.pipeline.handlers.logics.evaluate_handler.confidence import (
     get_confidence_values,
 )
 
+# Tokens with a lower logprob are ignored for the confidence calculation
+MIN_LIKELY_LOGPROB = -9999.0
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Get the tiktoken encoding of a model, loaded once per process.
+    """
+    return tiktoken.encoding_for_model(model)
+
+
+def get_token_offsets(
+    logprobs: list[ChatCompletionTokenLogprob], model: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the character offsets of the tokens in the generated text.
+
+    The offsets are derived from the UTF-8 bytes returned with each token: a byte position maps to
+    the number of characters starting before it. Tokens without bytes fall back to the length of the
+    token decoded by the model's encoding.
+
+    Args:
+        logprobs: The logprobs of the generated tokens.
+        model: The model used for the response.
+
+    Returns:
+        tuple: The start and end character offsets of every token.
+    """
+
+    if all(token_logprob.bytes is not None for token_logprob in logprobs):
+        token_bytes = [bytes(token_logprob.bytes) for token_logprob in logprobs]
+        byte_ends = np.cumsum([len(token) for token in token_bytes], dtype=np.int64)
+        text_bytes = np.frombuffer(b"".join(token_bytes), dtype=np.uint8)
+
+        # Number of characters starting before each byte position (continuation bytes are 10xxxxxx)
+        char_counts = np.zeros(len(text_bytes) + 1, dtype=np.int64)
+        np.cumsum((text_bytes & 0xC0) != 0x80, out=char_counts[1:])
+
+        ends = char_counts[byte_ends]
+    else:
+        encoding = get_encoding(model)
+        ends = np.cumsum(
+            [
+                len(
+                    encoding.decode(
+                        encoding.encode(token_logprob.token, disallowed_special=())
+                    )
+                )
+                for token_logprob in logprobs
+            ],
+            dtype=np.int64,
+        )
+
+    starts = np.zeros_like(ends)
+    starts[1:] = ends[:-1]
+    return starts, ends
+
 
 def evaluate_confidence(extract_result: dict, choice: Choice, model: str = "gpt-4o"):
     """
@@ -26,9 +86,6 @@ def evaluate_confidence(extract_result: dict, choice: Choice, model: str = "gpt-
 
     confidence = dict()
 
-    # Retrieves the specific encoding used for the OpenAI model that generated the response.
-    encoding = tiktoken.encoding_for_model(model)
-
     # To perform the confidence evaluation, we need the original text from the response, not just the object result.
     generated_text = choice.message.content
 
@@ -36,44 +93,44 @@ def evaluate_confidence(extract_result: dict, choice: Choice, model: str = "gpt-
         confidence["_overall"] = 0.0
         return confidence
 
-    logprobs = choice.logprobs.content
-
-    tokens = [token_logprob.token for token_logprob in logprobs]
-    token_logprobs = [token_logprob.logprob for token_logprob in logprobs]
-
-    # Encode the entire generated text to map tokens to character positions
-    token_offsets = []
-    current_pos = 0
-    for token in tokens:
-        token_bytes = encoding.encode(token, disallowed_special=())
-        token_str = encoding.decode(token_bytes)
-        token_length = len(token_str)
-        token_offsets.append((current_pos, current_pos + token_length))
-        current_pos += token_length
+    logprobs = choice.logprobs.content or []
+
+    # Map the tokens to character positions in the generated text
+    token_starts, token_ends = get_token_offsets(logprobs, model)
+
+    # Prefix sums of the likely logprobs and their count, so the mean over any token range is O(1)
+    token_logprobs = np.array(
+        [
+            np.nan if token_logprob.logprob is None else token_logprob.logprob
+            for token_logprob in logprobs
+        ],
+        dtype=np.float64,
+    )
+    likely = token_logprobs > MIN_LIKELY_LOGPROB
+    logprob_sums = np.concatenate(
+        ([0.0], np.cumsum(np.where(likely, token_logprobs, 0.0)))
+    )
+    likely_counts = np.concatenate(([0], np.cumsum(likely)))
 
     substr_offset = 0
 
-    def find_token_indices(substring: str, start_char: int):
+    def find_token_range(substring: str, start_char: int) -> tuple[int, int]:
         """
-        Find the indices of tokens that contain a given substring.
+        Find the range of tokens that overlap a given substring.
 
         Args:
             substring: The substring to search for.
             start_char: The starting character position of the substring.
 
         Returns:
-            list: The list of token indices that contain the substring.
+            tuple: The first and the last (exclusive) token index overlapping the substring.
         """
 
-        substring_length = len(substring)
-        end_char = start_char + substring_length
-        indices = []
-        for idx, (start, end) in enumerate(token_offsets):
-            if start >= end_char:
-                break
-            if end > start_char:
-                indices.append(idx)
-        return indices
+        end_char = start_char + len(substring)
+        # First token ending after the substring start, up to the first token starting at or after its end
+        first = int(np.searchsorted(token_ends, start_char, side="right"))
+        last = int(np.searchsorted(token_starts, end_char, side="left"))
+        return first, max(first, last)
 
     def evaluate_field_value_confidence(value: any):
         """
@@ -106,35 +163,19 @@ def evaluate_confidence(extract_result: dict, choice: Choice, model: str = "gpt-
             except ValueError:
                 return {"confidence": 0.0, "value": value}
 
-            # Find all the token indices that cover the value string
-            token_indices = find_token_indices(value_str, start_index)
-
-            if not token_indices:
-                return {"confidence": 0.0, "value": value}
-
-            # Get the logprobs for the tokens that cover the value string
-            value_logprobs = []
-            for idx in token_indices:
-                logprob = token_logprobs[idx]
-                if logprob is not None:
-                    value_logprobs.append(logprob)
-
-            if not value_logprobs:
-                return {"confidence": 0.0, "value": value}
-
-            # Ensure that only likely tokens are considered for confidence calculation
-            filtered_logprobs = [
-                logprob for logprob in value_logprobs if logprob > -9999.0
-            ]
+            # Find the tokens that cover the value string
+            first, last = find_token_range(value_str, start_index)
 
-            if not filtered_logprobs:
+            # Only likely tokens (with a logprob) are considered for confidence calculation
+            likely_count = likely_counts[last] - likely_counts[first]
+            if not likely_count:
                 return {"confidence": 0.0, "value": value}
 
             # Calculate the average log probability of the likely tokens
-            avg_logprob = sum(filtered_logprobs) / len(filtered_logprobs)
+            avg_logprob = (logprob_sums[last] - logprob_sums[first]) / likely_count
 
             # Convert the average log probability to a confidence score
-            confidence = math.exp(avg_logprob)
+            confidence = float(np.exp(avg_logprob))
 
             # Clamp the confidence score to the range [0.0, 1.0]
             confidence = min(max(confidence, 0.0), 1.0)
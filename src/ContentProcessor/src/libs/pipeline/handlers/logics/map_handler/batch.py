@@ -0,0 +1,303 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+from openai import AsyncAzureOpenAI
+from pydantic import BaseModel, Field
+
+from libs.azure_helper.storage_blob import StorageBlobHelper
+
+BATCH_ENDPOINT = "/chat/completions"
+
+# Batch statuses reported by the OpenAI Batch API which will not change anymore
+TERMINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def build_batch_request_line(
+    custom_id: str, deployment_name: str, messages: list[dict], request_settings: dict
+) -> dict:
+    """
+    Build one request line of an OpenAI Batch input file.
+
+    Args:
+        custom_id: The id used to match the response with the request (process_id).
+        deployment_name: The (global batch) deployment name.
+        messages: The chat messages.
+        request_settings: The chat completion request parameters.
+
+    Returns:
+        dict: The request line.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {"model": deployment_name, "messages": messages, **request_settings},
+    }
+
+
+class BatchResultError(Exception):
+    """
+    Raised when a finished batch has no response for one of its requests.
+    """
+
+
+class BatchResult(BaseModel):
+    """
+    The outcome of one request of a batch.
+
+    Attributes:
+        custom_id: The custom_id of the request.
+        response: The chat completion, when the request succeeded.
+        error: The error, when the request failed.
+    """
+
+    custom_id: str
+    response: Optional[dict] = None
+    error: Optional[dict] = None
+
+
+def parse_batch_output(jsonl_text: str) -> List[BatchResult]:
+    """
+    Parse an OpenAI Batch output (or error) file.
+
+    Args:
+        jsonl_text: The content of the output file.
+
+    Returns:
+        List[BatchResult]: The result of every request in the file.
+    """
+    results = []
+    for line in jsonl_text.splitlines():
+        if not line.strip():
+            continue
+        output = json.loads(line)
+        response = output.get("response") or {}
+        if output.get("error") is None and response.get("status_code") == 200:
+            results.append(
+                BatchResult(custom_id=output["custom_id"], response=response["body"])
+            )
+        else:
+            results.append(
+                BatchResult(
+                    custom_id=output["custom_id"],
+                    error=output.get("error") or response.get("body") or {},
+                )
+            )
+    return results
+
+
+class BatchExecutor(ABC):
+    """
+    Executes batches of chat completion requests in the OpenAI Batch file format.
+    """
+
+    @abstractmethod
+    async def submit(self, jsonl_text: str) -> str:
+        """
+        Submit a batch input file and return the batch id.
+        """
+
+    @abstractmethod
+    async def get_status(self, batch_id: str) -> str:
+        """
+        Get the status of a batch.
+        """
+
+    @abstractmethod
+    async def get_results(self, batch_id: str) -> List[BatchResult]:
+        """
+        Get the results of a batch in a terminal status.
+        """
+
+
+class AzureOpenAIBatchExecutor(BatchExecutor):
+    """
+    Executes batches with the Azure OpenAI Batch API (global batch deployments).
+    """
+
+    def __init__(self, client: AsyncAzureOpenAI, completion_window: str = "24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    async def submit(self, jsonl_text: str) -> str:
+        input_file = await self.client.files.create(
+            file=("map_batch.jsonl", jsonl_text.encode("utf-8")), purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def get_status(self, batch_id: str) -> str:
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status
+
+    async def get_results(self, batch_id: str) -> List[BatchResult]:
+        batch = await self.client.batches.retrieve(batch_id)
+
+        results = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                results.extend(parse_batch_output(content.text))
+        return results
+
+
+class LocalBatchExecutor(BatchExecutor):
+    """
+    Local stand-in for the Batch API.
+
+    Requests are answered one by one by the responder when the batch status is
+    checked, so the batch flow can be exercised offline (e.g. with a fake
+    responder) or against the regular chat completion endpoint.
+    Batches only live in memory.
+    """
+
+    def __init__(self, responder: Callable[[dict], Awaitable[dict]]):
+        self.responder = responder
+        self._batches: dict[str, list[dict]] = {}
+        self._results: dict[str, List[BatchResult]] = {}
+
+    async def submit(self, jsonl_text: str) -> str:
+        batch_id = f"local-batch-{len(self._batches) + 1}-{int(time.time())}"
+        self._batches[batch_id] = [
+            json.loads(line) for line in jsonl_text.splitlines() if line.strip()
+        ]
+        return batch_id
+
+    async def get_status(self, batch_id: str) -> str:
+        if batch_id not in self._batches:
+            return "expired"
+
+        if batch_id not in self._results:
+            results = []
+            for request in self._batches[batch_id]:
+                try:
+                    results.append(
+                        BatchResult(
+                            custom_id=request["custom_id"],
+                            response=await self.responder(request["body"]),
+                        )
+                    )
+                except Exception as e:
+                    results.append(
+                        BatchResult(
+                            custom_id=request["custom_id"], error={"message": str(e)}
+                        )
+                    )
+            self._results[batch_id] = results
+        return "completed"
+
+    async def get_results(self, batch_id: str) -> List[BatchResult]:
+        return self._results.get(batch_id, [])
+
+
+class BatchPendingRequest(BaseModel):
+    """
+    A Map request waiting to be submitted in a batch.
+
+    Attributes:
+        custom_id: The custom_id of the request (process_id).
+        request_line: The request line of the batch input file.
+        data_pipeline: The serialized DataPipeline of the process.
+        step_details: Details added to the map step result (e.g. modality).
+        created_at: Epoch seconds when the request was added.
+    """
+
+    custom_id: str
+    request_line: dict
+    data_pipeline: str
+    step_details: dict = Field(default_factory=dict)
+    created_at: float = Field(default_factory=time.time)
+
+
+class BatchManifestItem(BaseModel):
+    custom_id: str
+    data_pipeline: str
+    step_details: dict = Field(default_factory=dict)
+
+
+class BatchManifest(BaseModel):
+    """
+    A submitted batch and the processes waiting for its results.
+    """
+
+    batch_id: str
+    submitted_at: float = Field(default_factory=time.time)
+    items: List[BatchManifestItem] = Field(default_factory=list)
+
+
+class BatchStore:
+    """
+    Keeps pending requests and submitted batch manifests in Blob Storage,
+    so deferred Map requests survive handler restarts.
+    """
+
+    PENDING_PREFIX = "pending/"
+    SUBMITTED_PREFIX = "submitted/"
+
+    def __init__(self, account_url: str, container_name: str):
+        self.blob_helper = StorageBlobHelper(
+            account_url=account_url, container_name=container_name
+        )
+
+    def add_pending(self, request: BatchPendingRequest):
+        self.blob_helper.upload_text(
+            container_name=None,
+            blob_name=f"{self.PENDING_PREFIX}{request.custom_id}.json",
+            text=request.model_dump_json(),
+        )
+
+    def list_pending(self) -> List[BatchPendingRequest]:
+        return [
+            BatchPendingRequest(**json.loads(text))
+            for text in self._read_blobs(self.PENDING_PREFIX)
+        ]
+
+    def remove_pending(self, custom_ids: List[str]):
+        for custom_id in custom_ids:
+            self._delete_blob(f"{self.PENDING_PREFIX}{custom_id}.json")
+
+    def save_manifest(self, manifest: BatchManifest):
+        self.blob_helper.upload_text(
+            container_name=None,
+            blob_name=f"{self.SUBMITTED_PREFIX}{manifest.batch_id}.json",
+            text=manifest.model_dump_json(),
+        )
+
+    def list_manifests(self) -> List[BatchManifest]:
+        return [
+            BatchManifest(**json.loads(text))
+            for text in self._read_blobs(self.SUBMITTED_PREFIX)
+        ]
+
+    def remove_manifest(self, batch_id: str):
+        self._delete_blob(f"{self.SUBMITTED_PREFIX}{batch_id}.json")
+
+    def _read_blobs(self, prefix: str) -> List[str]:
+        container_client = self.blob_helper._get_container_client()
+        texts = []
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            try:
+                texts.append(
+                    container_client.get_blob_client(blob.name)
+                    .download_blob()
+                    .content_as_text()
+                )
+            except ResourceNotFoundError:
+                continue
+        return texts
+
+    def _delete_blob(self, blob_name: str):
+        try:
+            self.blob_helper.delete_blob(container_name=None, blob_name=blob_name)
+        except ResourceNotFoundError:
+            pass
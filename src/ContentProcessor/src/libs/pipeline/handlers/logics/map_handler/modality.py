@@ -0,0 +1,119 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from enum import Enum
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from libs.pipeline.entities.extracted_content import PageConfidenceStats
+
+
+class ModalityMode(str, Enum):
+    """
+    The content sent to the model by the Map step.
+    """
+
+    TextOnly = "text_only"
+    SelectedPages = "selected_pages"
+    AllPages = "all_pages"
+
+
+class ModalityPolicy(BaseModel):
+    """
+    Thresholds deciding when a page image has to be sent along with the markdown.
+
+    Attributes:
+        policy: "images" (default) to always send every page, "adaptive" to decide per page, "text" to never send images.
+        low_confidence_threshold: Words below this confidence are counted as low confidence.
+        min_mean_confidence: Pages with a lower mean word confidence need their image.
+        max_low_confidence_ratio: Pages with a higher ratio of low confidence words need their image.
+        min_words_per_page: Pages with fewer words (e.g. scanned or graphic pages) need their image.
+        max_selected_page_ratio: When more pages than this ratio need their image, every page is sent.
+    """
+
+    policy: str = "images"
+    low_confidence_threshold: float = 0.8
+    min_mean_confidence: float = 0.95
+    max_low_confidence_ratio: float = 0.05
+    min_words_per_page: int = 20
+    max_selected_page_ratio: float = 0.5
+
+
+class ModalityDecision(BaseModel):
+    """
+    The content selected for the model and why.
+
+    Attributes:
+        mode: The selected modality.
+        pages: The page numbers whose images are sent.
+        reason: Why the modality was selected.
+        page_stats: The word confidence statistics of every page.
+    """
+
+    mode: ModalityMode
+    pages: List[int] = Field(default_factory=list)
+    reason: str
+    page_stats: List[PageConfidenceStats] = Field(default_factory=list)
+
+
+def select_modality(
+    page_stats: List[PageConfidenceStats], policy: ModalityPolicy
+) -> ModalityDecision:
+    """
+    Decide whether to send text only, the images of selected pages or the images of all pages.
+
+    Args:
+        page_stats: The word confidence statistics of every page.
+        policy: The modality policy.
+
+    Returns:
+        ModalityDecision: The selected modality.
+    """
+    all_pages = [stats.page_number for stats in page_stats]
+
+    if policy.policy == "text":
+        return ModalityDecision(
+            mode=ModalityMode.TextOnly,
+            reason="Images are never sent by policy.",
+            page_stats=page_stats,
+        )
+    if policy.policy == "images" or not page_stats:
+        return ModalityDecision(
+            mode=ModalityMode.AllPages,
+            pages=all_pages,
+            reason=(
+                "Images are always sent by policy."
+                if page_stats
+                else "No page layout is available."
+            ),
+            page_stats=page_stats,
+        )
+
+    selected_pages = [
+        stats.page_number
+        for stats in page_stats
+        if stats.word_count < policy.min_words_per_page
+        or stats.mean_confidence < policy.min_mean_confidence
+        or stats.low_confidence_ratio > policy.max_low_confidence_ratio
+    ]
+
+    if not selected_pages:
+        return ModalityDecision(
+            mode=ModalityMode.TextOnly,
+            reason="All pages have high word confidence.",
+            page_stats=page_stats,
+        )
+    if len(selected_pages) > len(page_stats) * policy.max_selected_page_ratio:
+        return ModalityDecision(
+            mode=ModalityMode.AllPages,
+            pages=all_pages,
+            reason=f"{len(selected_pages)} of {len(page_stats)} pages have low word confidence.",
+            page_stats=page_stats,
+        )
+    return ModalityDecision(
+        mode=ModalityMode.SelectedPages,
+        pages=selected_pages,
+        reason=f"{len(selected_pages)} of {len(page_stats)} pages have low word confidence.",
+        page_stats=page_stats,
+    )
@@ -0,0 +1,221 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import base64
+import io
+import math
+import re
+from functools import lru_cache
+
+import tiktoken
+from PIL import Image
+from pydantic import BaseModel
+
+# Azure OpenAI image token accounting for detail=high
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+IMAGE_TILE_SIZE = 512
+IMAGE_MAX_SIDE = 2048
+IMAGE_SHORT_SIDE = 768
+
+_COMMENT_PATTERN = re.compile(r"<!--\s*(.*?)\s*-->", re.DOTALL)
+_HEADER_FOOTER_PATTERN = re.compile(r'^Page(?:Header|Footer)="(.*)"$', re.DOTALL)
+_FIGURE_TAG_PATTERN = re.compile(r"</?fig(?:ure|caption)[^>]*>")
+_IMAGE_REFERENCE_PATTERN = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_TABLE_PATTERN = re.compile(r"<table[^>]*>(.*?)</table>", re.DOTALL)
+_TABLE_ROW_PATTERN = re.compile(r"<tr[^>]*>(.*?)</tr>", re.DOTALL)
+_TABLE_CELL_PATTERN = re.compile(r"<t[hd][^>]*>(.*?)</t[hd]>", re.DOTALL)
+_INNER_SPACES_PATTERN = re.compile(r"(?<=\S)[ \t]{2,}")
+_BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+_ALPHANUMERIC_PATTERN = re.compile(r"\w")
+
+
+class PromptTokenCount(BaseModel):
+    text_tokens: int
+    image_tokens: int
+    total_tokens: int
+
+
+class PromptBudgetResult(BaseModel):
+    """
+    Token counts of the Map prompt before and after compaction and budget trimming.
+
+    Attributes:
+        before: The estimated tokens of the prompt built from the raw markdown.
+        after: The estimated tokens of the prompt sent to the model.
+        budget: The configured token budget (0 = unlimited).
+        trimmed_blocks: The number of markdown blocks removed to fit the budget.
+        over_budget: True if the prompt still exceeds the budget (e.g. images alone exceed it).
+    """
+
+    before: PromptTokenCount
+    after: PromptTokenCount
+    budget: int
+    trimmed_blocks: int = 0
+    over_budget: bool = False
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """
+    Get the tiktoken encoding for a model (or deployment) name, defaulting to o200k_base (GPT-4o).
+    """
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estimate the prompt tokens of an image sent with detail=high.
+
+    The image is scaled to fit within 2048 x 2048, then its shortest side is scaled
+    to 768; every 512 x 512 tile costs 170 tokens on top of 85 base tokens.
+    """
+    if width <= 0 or height <= 0:
+        return IMAGE_BASE_TOKENS
+
+    scale = min(1.0, IMAGE_MAX_SIDE / max(width, height))
+    width, height = width * scale, height * scale
+
+    scale = min(1.0, IMAGE_SHORT_SIDE / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+    return IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+
+
+def _get_image_size(data_url: str) -> tuple[int, int]:
+    _, _, data = data_url.partition(",")
+    # Only the image header is read to get the size
+    with Image.open(io.BytesIO(base64.b64decode(data))) as image:
+        return image.size
+
+
+def count_prompt_tokens(user_content: list[dict], encoding) -> PromptTokenCount:
+    """
+    Count the text tokens and estimate the image tokens of the user content.
+
+    Args:
+        user_content: The user content (text and image_url items).
+        encoding: The tiktoken encoding.
+
+    Returns:
+        PromptTokenCount: The token counts.
+    """
+    text_tokens = 0
+    image_tokens = 0
+    for content in user_content:
+        if content["type"] == "text":
+            text_tokens += len(encoding.encode(content["text"]))
+        elif content["type"] == "image_url":
+            image_tokens += estimate_image_tokens(
+                *_get_image_size(content["image_url"]["url"])
+            )
+
+    return PromptTokenCount(
+        text_tokens=text_tokens,
+        image_tokens=image_tokens,
+        total_tokens=text_tokens + image_tokens,
+    )
+
+
+def _compact_table(match: re.Match) -> str:
+    rows = []
+    for row in _TABLE_ROW_PATTERN.findall(match.group(1)):
+        cells = [cell.strip() for cell in _TABLE_CELL_PATTERN.findall(row)]
+        if any(cells):
+            rows.append(f"| {' | '.join(cells)} |")
+    return "\n" + "\n".join(rows) + "\n"
+
+
+def compact_markdown(markdown: str) -> str:
+    """
+    Compact Content Understanding markdown without losing content relevant for extraction.
+
+    - Page break and page number comments are removed.
+    - Page headers and footers are kept once, as text.
+    - Figure tags and image references are removed, keeping captions and alt text.
+    - HTML tables are rewritten as one pipe separated line per row.
+    - Runs of spaces inside lines, trailing spaces and blank lines are collapsed.
+
+    Args:
+        markdown: The markdown from the Extract step.
+
+    Returns:
+        str: The compacted markdown.
+    """
+    seen_headers_footers = set()
+
+    def _replace_comment(match: re.Match) -> str:
+        header_footer = _HEADER_FOOTER_PATTERN.match(match.group(1))
+        if header_footer is None:
+            return ""
+        text = header_footer.group(1).strip()
+        if text in seen_headers_footers:
+            return ""
+        seen_headers_footers.add(text)
+        return text
+
+    markdown = _COMMENT_PATTERN.sub(_replace_comment, markdown)
+    markdown = _FIGURE_TAG_PATTERN.sub("", markdown)
+    markdown = _IMAGE_REFERENCE_PATTERN.sub(lambda match: match.group(1), markdown)
+    markdown = _TABLE_PATTERN.sub(_compact_table, markdown)
+
+    lines = [
+        _INNER_SPACES_PATTERN.sub(" ", line.rstrip()) for line in markdown.split("\n")
+    ]
+    return _BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+
+
+def trim_markdown_to_budget(
+    markdown: str, available_tokens: int, encoding
+) -> tuple[str, int]:
+    """
+    Trim low-value regions of the markdown until it fits the available tokens.
+
+    Blocks (separated by blank lines) are removed in this order: repeated blocks,
+    blocks without any letter or digit, then blocks from the end of the document.
+
+    Args:
+        markdown: The (compacted) markdown.
+        available_tokens: The tokens available for the markdown.
+        encoding: The tiktoken encoding.
+
+    Returns:
+        tuple[str, int]: The trimmed markdown and the number of removed blocks.
+    """
+    blocks = markdown.split("\n\n")
+    block_tokens = [len(encoding.encode(block)) for block in blocks]
+    total_tokens = sum(block_tokens)
+    if total_tokens <= available_tokens:
+        return markdown, 0
+
+    seen_blocks = set()
+    repeated = []
+    without_content = []
+    for index, block in enumerate(blocks):
+        if block in seen_blocks:
+            repeated.append(index)
+        else:
+            seen_blocks.add(block)
+            if not _ALPHANUMERIC_PATTERN.search(block):
+                without_content.append(index)
+
+    removed = set()
+    candidates = repeated + without_content + list(range(len(blocks) - 1, -1, -1))
+    for index in candidates:
+        if total_tokens <= available_tokens:
+            break
+        if index in removed:
+            continue
+        removed.add(index)
+        total_tokens -= block_tokens[index]
+
+    return (
+        "\n\n".join(
+            block for index, block in enumerate(blocks) if index not in removed
+        ),
+        len(removed),
+    )
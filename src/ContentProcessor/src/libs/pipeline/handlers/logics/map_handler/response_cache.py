@@ -0,0 +1,188 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from libs.application.application_configuration import AppConfiguration
+from libs.azure_helper.storage_blob import StorageBlobHelper
+
+
+def build_response_cache_key(
+    prompt: str,
+    user_content: list[dict],
+    schema_version: str,
+    deployment_name: str,
+    execution_settings: dict,
+) -> str:
+    """
+    Build a deterministic key for a chat completion request.
+
+    The markdown and the image bytes (as data URLs) are part of user_content, so
+    identical documents mapped with the same schema version, deployment and
+    execution settings produce the same key.
+
+    Args:
+        prompt: The prompt template.
+        user_content: The user content (text and image_url items) sent to the model.
+        schema_version: The version of the schema used as response format.
+        deployment_name: The Azure OpenAI deployment name.
+        execution_settings: The execution settings of the request.
+
+    Returns:
+        str: The SHA-256 hex digest of the request.
+    """
+    digest = hashlib.sha256()
+    for part in (prompt, schema_version, deployment_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+
+    digest.update(
+        json.dumps(execution_settings, sort_keys=True, default=str).encode("utf-8")
+    )
+    digest.update(b"\0")
+
+    for content in user_content:
+        if content["type"] == "text":
+            digest.update(content["text"].encode("utf-8"))
+        elif content["type"] == "image_url":
+            digest.update(content["image_url"]["url"].encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    Store for chat completion responses keyed by build_response_cache_key.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, response: dict):
+        pass
+
+
+class LocalResponseCache(ResponseCache):
+    """
+    Response cache on the local file system.
+
+    Each response is stored as a JSON file. Reads refresh the file's modification
+    time, and once the directory grows over max_size_bytes the least recently used
+    files are removed.
+    """
+
+    def __init__(self, directory: str, max_size_bytes: int):
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._get_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                response = json.load(file)
+            os.utime(path)
+            return response
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def set(self, key: str, response: dict):
+        path = self._get_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(response, file)
+        os.replace(temp_path, path)
+
+        self._evict()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        # Remove the least recently used responses first
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+class BlobResponseCache(ResponseCache):
+    """
+    Response cache in Azure Blob Storage.
+
+    Responses are shared by every handler instance. Size based eviction is left to
+    the storage account lifecycle management policy of the container.
+    """
+
+    def __init__(self, account_url: str, container_name: str):
+        self.container_name = container_name
+        self.blob_helper = StorageBlobHelper(
+            account_url=account_url, container_name=container_name
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            return json.loads(
+                self.blob_helper.download_text(
+                    container_name=None, blob_name=f"{key}.json"
+                )
+            )
+        except ResourceNotFoundError:
+            return None
+
+    def set(self, key: str, response: dict):
+        self.blob_helper.upload_text(
+            container_name=None, blob_name=f"{key}.json", text=json.dumps(response)
+        )
+
+
+def create_response_cache(configuration: AppConfiguration) -> Optional[ResponseCache]:
+    """
+    Create the response cache configured by app_map_response_cache_store.
+
+    Args:
+        configuration: The application configuration.
+
+    Returns:
+        Optional[ResponseCache]: The response cache, or None when caching is disabled.
+    """
+    store = configuration.app_map_response_cache_store.lower()
+    if store == "local":
+        return LocalResponseCache(
+            directory=configuration.app_map_response_cache_dir,
+            max_size_bytes=configuration.app_map_response_cache_max_mb * 1024 * 1024,
+        )
+    elif store == "blob":
+        return BlobResponseCache(
+            account_url=configuration.app_storage_blob_url,
+            container_name=configuration.app_map_response_cache_container,
+        )
+    elif store in ("", "none"):
+        return None
+
+    raise ValueError(f"Unsupported response cache store: {store}")
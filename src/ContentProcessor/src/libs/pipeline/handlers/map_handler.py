@@ -2,10 +2,16 @@
 # Licensed under the MIT License.
 
 import base64
+import datetime
 import io
 import json
+import logging
+import time
+from typing import Optional
 
+from openai.types.chat.parsed_chat_completion import ParsedChatCompletion
 from pdf2image import convert_from_bytes
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 from semantic_kernel.contents import (
     AuthorRole,
     ChatHistory,
@@ -16,54 +22,153 @@ from semantic_kernel.contents import (
 from semantic_kernel.functions import KernelArguments, KernelFunctionFromPrompt
 from semantic_kernel.prompt_template import PromptTemplateConfig
 from semantic_kernel.prompt_template.input_variable import InputVariable
-from semantic_kernel_extended.custom_execution_settings import (
-    CustomChatCompletionExecutionSettings,
-)
 
 from libs.application.application_context import AppContext
-from libs.azure_helper.model.content_understanding import AnalyzedResult
+from libs.models.content_process import ContentProcess, Step_Outputs
+from libs.pipeline.entities.extracted_content import (
+    ExtractedContentDigest,
+    build_extracted_content_digest,
+)
 from libs.pipeline.entities.mime_types import MimeTypes
-from libs.pipeline.entities.pipeline_file import ArtifactType, PipelineLogEntry
+from libs.pipeline.entities.pipeline_data import DataPipeline
+from libs.pipeline.entities.pipeline_file import (
+    ArtifactType,
+    FileDetails,
+    PipelineLogEntry,
+)
 from libs.pipeline.entities.pipeline_message_context import MessageContext
 from libs.pipeline.entities.pipeline_step_result import StepResult
-from libs.pipeline.entities.schema import Schema
+from libs.pipeline.entities.schema_registry import (
+    SchemaRegistryEntry,
+    get_schema_registry,
+)
+from libs.pipeline.handlers.logics.map_handler.batch import (
+    TERMINAL_BATCH_STATUSES,
+    AzureOpenAIBatchExecutor,
+    BatchExecutor,
+    BatchManifest,
+    BatchManifestItem,
+    BatchPendingRequest,
+    BatchResultError,
+    BatchStore,
+    LocalBatchExecutor,
+    build_batch_request_line,
+)
+from libs.pipeline.handlers.logics.map_handler.modality import (
+    ModalityDecision,
+    ModalityMode,
+    ModalityPolicy,
+    select_modality,
+)
+from libs.pipeline.handlers.logics.map_handler.prompt_budget import (
+    PromptBudgetResult,
+    compact_markdown,
+    count_prompt_tokens,
+    get_encoding,
+    trim_markdown_to_budget,
+)
+from libs.pipeline.handlers.logics.map_handler.response_cache import (
+    ResponseCache,
+    build_response_cache_key,
+    create_response_cache,
+)
 from libs.pipeline.queue_handler_base import HandlerBase
-from libs.utils.remote_module_loader import load_schema_from_blob
+from libs.semantic_kernel_extended.custom_execution_settings import (
+    CustomChatCompletionExecutionSettings,
+)
+
+SYSTEM_PROMPT = "system : You are an AI assistant that extracts data from documents."
+
+EXTRACTION_RULES = """Extract the data from this Document.
+- If a value is not present, provide null.
+- Some values must be inferred based on the rules defined in the policy and Contents.
+- Dates should be in the format YYYY-MM-DD."""
+
+# The static system message - a prompt prefix shared by every request. The schema is not
+# repeated here: the model receives it once, through the response_format of the request.
+SYSTEM_MESSAGE = f"{SYSTEM_PROMPT}\n\n{EXTRACTION_RULES}"
+
+# Define the prompt template - the system message and the user content are both part of the history
+PROMPT_TEMPLATE = "{{$history}}"
+
+
+class CompiledChatFunction(BaseModel):
+    """
+    Prompt function and execution settings built for one schema version.
+
+    Attributes:
+        version: The schema version the function was built for.
+        system_message: The static system message (prompt prefix).
+        kernel_function: The prompt function invoked through the kernel.
+        execution_settings: The execution settings of the prompt function.
+        execution_settings_dict: The execution settings as a dictionary, used for the response cache key.
+        request_settings: The request parameters used by the direct Azure OpenAI client path.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    version: str
+    system_message: str
+    kernel_function: KernelFunctionFromPrompt
+    execution_settings: CustomChatCompletionExecutionSettings
+    execution_settings_dict: dict
+    request_settings: dict
 
 
 class MapHandler(HandlerBase):
+    _response_cache: ResponseCache = None
+    _response_cache_created: bool = False
+    _chat_functions: dict[str, CompiledChatFunction] = PrivateAttr(default_factory=dict)
+    _batch_store: BatchStore = None
+    _batch_executor: BatchExecutor = None
+    _batch_last_checked: float = float("-inf")
+
     def __init__(self, appContext: AppContext, step_name: str, **data):
         super().__init__(appContext, step_name, **data)
 
-    async def execute(self, context: MessageContext) -> StepResult:
-        print(context.data_pipeline.get_previous_step_result(self.handler_name))
-
-        # Get Output files from context.data_pipeline in files list where processed by 'extract' and artifact_type is 'extacted_content'
-        output_file_json_string = self.download_output_file_to_json_string(
-            processed_by="extract",
-            artifact_type=ArtifactType.ExtractedContent,
+    async def execute(self, context: MessageContext) -> Optional[StepResult]:
+        # Decide which page images have to be sent along with the markdown
+        configuration = self.application_context.configuration
+        modality_policy = ModalityPolicy(
+            policy=configuration.app_map_modality_policy,
+            low_confidence_threshold=configuration.app_map_modality_low_confidence_threshold,
+            min_mean_confidence=configuration.app_map_modality_min_mean_confidence,
+            max_low_confidence_ratio=configuration.app_map_modality_max_low_confidence_ratio,
+            min_words_per_page=configuration.app_map_modality_min_words_per_page,
+            max_selected_page_ratio=configuration.app_map_modality_max_selected_page_ratio,
         )
 
-        # Deserialize the result to AnalyzedResult
-        previous_result = AnalyzedResult(**json.loads(output_file_json_string))
+        # Get the markdown and the page statistics from the Extract step - see _load_extracted_content_digest
+        extracted_content = self._load_extracted_content_digest(
+            data_pipeline=context.data_pipeline,
+            low_confidence_threshold=modality_policy.low_confidence_threshold,
+        )
 
         # Get Markdown content string from the previous result
-        markdown_string = previous_result.result.contents[0].markdown
+        markdown_string = extracted_content.markdown
+
+        # Compact the markdown - page breaks, figure placeholders, table scaffolding and whitespace
+        raw_markdown_string = markdown_string
+        if self.application_context.configuration.app_map_markdown_compaction:
+            markdown_string = compact_markdown(markdown_string)
 
         # Prepare the prompt
         user_content = self._prepare_prompt(markdown_string)
 
+        modality = select_modality(extracted_content.page_stats, modality_policy)
+
         # Check file type : PDF
-        if context.data_pipeline.get_source_files()[0].mime_type == MimeTypes.Pdf:
+        if modality.mode == ModalityMode.TextOnly:
+            # Markdown only - no images are sent
+            pass
+        elif context.data_pipeline.get_source_files()[0].mime_type == MimeTypes.Pdf:
             # Convert PDF to multiple images
             pdf_bytes = context.data_pipeline.get_source_files()[0].download_stream(
                 self.application_context.configuration.app_storage_blob_url,
                 self.application_context.configuration.app_cps_processes,
             )
 
-            pdf_stream = io.BytesIO(pdf_bytes)
-            # Set the position to the beginning of the stream
-            for image in convert_from_bytes(pdf_stream.read()):
+            for image in self._convert_pdf_to_images(pdf_bytes, modality):
                 byteIO = io.BytesIO()
                 image.save(byteIO, format="PNG")
                 user_content.append(
@@ -85,21 +190,61 @@ class MapHandler(HandlerBase):
                 )
             )
 
-        # Check Schema Information
-        selected_schema = Schema.get_schema(
+        # Check Schema Information - served from the schema registry cache
+        schema_id = context.data_pipeline.pipeline_status.schema_id
+        selected_schema = get_schema_registry(
+            self.application_context.configuration.app_schema_cache_ttl_seconds
+        ).get_schema(
+            schema_id=schema_id,
             connection_string=self.application_context.configuration.app_cosmos_connstr,
             database_name=self.application_context.configuration.app_cosmos_database,
             collection_name=self.application_context.configuration.app_cosmos_container_schema,
-            schema_id=context.data_pipeline.pipeline_status.schema_id,
+            account_url=self.application_context.configuration.app_storage_blob_url,
+            container_name=f"{self.application_context.configuration.app_cps_configuration}/Schemas/{schema_id}",
         )
 
+        # Estimate the prompt tokens and fit the markdown into the token budget
+        prompt_budget = self._apply_token_budget(user_content, raw_markdown_string)
+
+        step_details = {
+            "modality": modality.model_dump(mode="json"),
+            "prompt_tokens": prompt_budget.model_dump(),
+        }
+
+        # Batch mode - the request is sent with the next batch and the step completes when its result arrives
+        if self.application_context.configuration.app_map_invocation_mode == "batch":
+            return await self._defer_to_batch(
+                user_content, context, selected_schema, step_details
+            )
+
         # Invoke GPT with the prompt
-        gpt_response_raw = await self.invoke_chat_completion(
+        gpt_response, response_cache_status = await self.invoke_chat_completion(
             user_content, context, selected_schema
         )
 
+        result_file = self._save_gpt_output(
+            context.data_pipeline, gpt_response.to_dict()
+        )
+
+        return StepResult(
+            process_id=context.data_pipeline.pipeline_status.process_id,
+            step_name=self.handler_name,
+            result={
+                "result": "success",
+                "file_name": result_file.name,
+                "response_cache": response_cache_status,
+                **step_details,
+            },
+        )
+
+    def _save_gpt_output(
+        self, data_pipeline: DataPipeline, completion: dict
+    ) -> FileDetails:
+        """
+        Save the chat completion as the output file of the Map step.
+        """
         # Save Result as a file
-        result_file = context.data_pipeline.add_file(
+        result_file = data_pipeline.add_file(
             file_name="gpt_output.json",
             artifact_type=ArtifactType.SchemaMappedData,
         )
@@ -116,28 +261,79 @@ class MapHandler(HandlerBase):
         result_file.upload_json_text(
             account_url=self.application_context.configuration.app_storage_blob_url,
             container_name=self.application_context.configuration.app_cps_processes,
-            text=json.dumps(gpt_response_raw.value[0].inner_content.to_dict()),
+            text=json.dumps(completion),
         )
 
-        return StepResult(
-            process_id=context.data_pipeline.pipeline_status.process_id,
-            step_name=self.handler_name,
-            result={
-                "result": "success",
-                "file_name": result_file.name,
-            },
-        )
+        return result_file
 
     async def invoke_chat_completion(
-        self, user_content: list, context: MessageContext, selected_schema: Schema
-    ):
-        # Define the prompt template
-        prompt = """
-        system : You are an AI assistant that extracts data from documents.
+        self,
+        user_content: list,
+        context: MessageContext,
+        selected_schema: SchemaRegistryEntry,
+    ) -> tuple[ParsedChatCompletion, str]:
+        """
+        Invoke the chat completion, serving identical requests from the response cache.
 
-        {{$history}}
+        Returns:
+            tuple[ParsedChatCompletion, str]: The completion and the response cache status
+            ("hit", "miss", "bypass" or "disabled").
+        """
+        chat_function = self._get_chat_function(selected_schema)
+
+        # Look up the response of an identical request
+        response_cache = self._get_response_cache()
+        if response_cache is None:
+            response_cache_status = "disabled"
+        else:
+            cache_key = self._get_response_cache_key(
+                user_content, selected_schema, chat_function
+            )
+            if self.application_context.configuration.app_map_response_cache_bypass:
+                response_cache_status = "bypass"
+            else:
+                cached_response = response_cache.get(cache_key)
+                if cached_response is not None:
+                    return ParsedChatCompletion(**cached_response), "hit"
+                response_cache_status = "miss"
+
+        if self.application_context.configuration.app_map_invocation_mode == "direct":
+            completion = await self._invoke_openai_client(user_content, chat_function)
+        else:
+            completion = await self._invoke_kernel_function(user_content, chat_function)
+
+        if response_cache is not None:
+            response_cache.set(cache_key, completion)
+
+        return ParsedChatCompletion(**completion), response_cache_status
+
+    def _get_response_cache_key(
+        self,
+        user_content: list,
+        selected_schema: SchemaRegistryEntry,
+        chat_function: CompiledChatFunction,
+    ) -> str:
+        return build_response_cache_key(
+            prompt=chat_function.system_message,
+            user_content=user_content,
+            schema_version=selected_schema.version,
+            deployment_name=self.application_context.configuration.app_azure_openai_model,
+            execution_settings=chat_function.execution_settings_dict,
+        )
 
-        assistant :"""
+    def _get_chat_function(
+        self, selected_schema: SchemaRegistryEntry
+    ) -> CompiledChatFunction:
+        """
+        Get the prompt function and execution settings for the schema, building them once per schema version.
+        """
+        schema_id = selected_schema.schema_info.Id
+        chat_function = self._chat_functions.get(schema_id)
+        if (
+            chat_function is not None
+            and chat_function.version == selected_schema.version
+        ):
+            return chat_function
 
         # Set Execution Settings - logprobs property doesn't spported in ExecutionSettings
         # So we had to  use CustomChatCompletionExecutionSettings
@@ -149,28 +345,41 @@ class MapHandler(HandlerBase):
         req_settings.temperature = 0.1
         req_settings.top_p = 0.1
         req_settings.logprobs = True
-        req_settings.response_format = load_schema_from_blob(
-            account_url=self.application_context.configuration.app_storage_blob_url,
-            container_name=f"{self.application_context.configuration.app_cps_configuration}/Schemas/{context.data_pipeline.pipeline_status.schema_id}",
-            blob_name=selected_schema.FileName,
-            module_name=selected_schema.ClassName,
-        )
+        # Use the JSON schema derived once per schema version by the registry
+        req_settings.response_format = selected_schema.response_format
 
         prompt_template_config = PromptTemplateConfig(
-            template=prompt,
+            template=PROMPT_TEMPLATE,
             input_variables=[InputVariable(name="history", description="Chat history")],
             execution_settings=req_settings,
         )
 
         # Create Ad-hoc function with the prompt template
-        chat_function = KernelFunctionFromPrompt(
+        kernel_function = KernelFunctionFromPrompt(
             function_name="contentextractor",
             plugin_name="contentprocessplugin",
             prompt_template_config=prompt_template_config,
         )
 
-        # Set Empty Chat History
-        chat_history = ChatHistory()
+        chat_function = CompiledChatFunction(
+            version=selected_schema.version,
+            system_message=SYSTEM_MESSAGE,
+            kernel_function=kernel_function,
+            execution_settings=req_settings,
+            execution_settings_dict=req_settings.model_dump(exclude_none=True),
+            request_settings=req_settings.prepare_settings_dict(),
+        )
+        self._chat_functions[schema_id] = chat_function
+        return chat_function
+
+    async def _invoke_kernel_function(
+        self, user_content: list, chat_function: CompiledChatFunction
+    ) -> dict:
+        """
+        Invoke the cached prompt function through Semantic Kernel.
+        """
+        # Set Chat History with the static system message as the prompt prefix
+        chat_history = ChatHistory(system_message=chat_function.system_message)
 
         # Set User Prompot with Image and Text(Markdown) content
         chat_items = []
@@ -186,9 +395,357 @@ class MapHandler(HandlerBase):
         )
 
         # Invoke the function with the chat history as a parameter in prompt teamplate
-        return await self.application_context.kernel.invoke(
-            chat_function, KernelArguments(history=chat_history)
+        response = await self.application_context.kernel.invoke(
+            chat_function.kernel_function, KernelArguments(history=chat_history)
+        )
+        return response.value[0].inner_content.to_dict()
+
+    async def _invoke_openai_client(
+        self, user_content: list, chat_function: CompiledChatFunction
+    ) -> dict:
+        """
+        Invoke the Azure OpenAI client of the kernel service directly, skipping prompt rendering.
+        The messages are the same ones the kernel renders from the chat history.
+        """
+        client = self.application_context.kernel.get_service(
+            chat_function.execution_settings.service_id
+        ).client
+
+        response = await client.chat.completions.create(
+            model=self.application_context.configuration.app_azure_openai_model,
+            messages=self._build_messages(user_content, chat_function),
+            **chat_function.request_settings,
+        )
+        return response.to_dict()
+
+    def _build_messages(
+        self, user_content: list, chat_function: CompiledChatFunction
+    ) -> list[dict]:
+        """
+        Build the chat messages the kernel renders from the chat history:
+        the static system message first, then the per-document user content.
+        """
+        return [
+            {"role": "system", "content": chat_function.system_message},
+            {"role": "user", "content": user_content},
+        ]
+
+    async def _defer_to_batch(
+        self,
+        user_content: list,
+        context: MessageContext,
+        selected_schema: SchemaRegistryEntry,
+        step_details: dict,
+    ) -> Optional[StepResult]:
+        """
+        Add the request to the pending batch requests.
+        Cached responses are used right away, like in the other invocation modes.
+
+        Returns:
+            Optional[StepResult]: The step result for a cached response, otherwise None (deferred).
+        """
+        configuration = self.application_context.configuration
+        chat_function = self._get_chat_function(selected_schema)
+
+        response_cache = self._get_response_cache()
+        cache_key = None
+        if response_cache is not None:
+            cache_key = self._get_response_cache_key(
+                user_content, selected_schema, chat_function
+            )
+            cached_response = (
+                None
+                if configuration.app_map_response_cache_bypass
+                else response_cache.get(cache_key)
+            )
+            if cached_response is not None:
+                result_file = self._save_gpt_output(
+                    context.data_pipeline, cached_response
+                )
+                return StepResult(
+                    process_id=context.data_pipeline.pipeline_status.process_id,
+                    step_name=self.handler_name,
+                    result={
+                        "result": "success",
+                        "file_name": result_file.name,
+                        "response_cache": "hit",
+                        **step_details,
+                    },
+                )
+
+        process_id = context.data_pipeline.pipeline_status.process_id
+        self._get_batch_store().add_pending(
+            BatchPendingRequest(
+                custom_id=process_id,
+                request_line=build_batch_request_line(
+                    custom_id=process_id,
+                    deployment_name=configuration.app_map_batch_deployment
+                    or configuration.app_azure_openai_model,
+                    messages=self._build_messages(user_content, chat_function),
+                    request_settings=chat_function.request_settings,
+                ),
+                data_pipeline=context.data_pipeline.model_dump_json(),
+                step_details={**step_details, "response_cache_key": cache_key},
+            )
+        )
+        logging.info(f"Map request for {process_id} is deferred to the next batch.")
+        return None
+
+    async def on_polling_cycle(self):
+        """
+        In batch mode, submit the pending requests and collect the results of submitted batches.
+        """
+        configuration = self.application_context.configuration
+        if configuration.app_map_invocation_mode != "batch":
+            return
+
+        if (
+            time.monotonic() - self._batch_last_checked
+            < configuration.app_map_batch_poll_interval_seconds
+        ):
+            return
+        self._batch_last_checked = time.monotonic()
+
+        batch_store = self._get_batch_store()
+        await self._submit_pending_requests(batch_store)
+        await self._collect_batch_results(batch_store)
+
+    async def _submit_pending_requests(self, batch_store: BatchStore):
+        """
+        Submit the pending requests as a batch once enough requests are pending or the oldest one waited long enough.
+        """
+        configuration = self.application_context.configuration
+        pending_requests = sorted(
+            batch_store.list_pending(), key=lambda request: request.created_at
+        )
+        if not pending_requests:
+            return
+
+        if (
+            len(pending_requests) < configuration.app_map_batch_max_requests
+            and time.time() - pending_requests[0].created_at
+            < configuration.app_map_batch_max_wait_seconds
+        ):
+            return
+
+        pending_requests = pending_requests[: configuration.app_map_batch_max_requests]
+        batch_id = await self._get_batch_executor().submit(
+            "\n".join(json.dumps(request.request_line) for request in pending_requests)
+        )
+
+        batch_store.save_manifest(
+            BatchManifest(
+                batch_id=batch_id,
+                items=[
+                    BatchManifestItem(
+                        custom_id=request.custom_id,
+                        data_pipeline=request.data_pipeline,
+                        step_details=request.step_details,
+                    )
+                    for request in pending_requests
+                ],
+            )
         )
+        batch_store.remove_pending([request.custom_id for request in pending_requests])
+        logging.info(
+            f"Batch {batch_id} submitted with {len(pending_requests)} requests."
+        )
+
+    async def _collect_batch_results(self, batch_store: BatchStore):
+        """
+        Fan the results of finished batches back into each process and continue the pipeline.
+        """
+        batch_executor = self._get_batch_executor()
+        for manifest in batch_store.list_manifests():
+            status = await batch_executor.get_status(manifest.batch_id)
+            if status not in TERMINAL_BATCH_STATUSES:
+                continue
+
+            results = {
+                result.custom_id: result
+                for result in await batch_executor.get_results(manifest.batch_id)
+            }
+            logging.info(
+                f"Batch {manifest.batch_id} {status} - {len(results)} results."
+            )
+
+            for item in manifest.items:
+                data_pipeline = DataPipeline.get_object(item.data_pipeline)
+                result = results.get(item.custom_id)
+                try:
+                    if result is None or result.response is None:
+                        raise BatchResultError(
+                            f"Batch {manifest.batch_id} ({status}) has no response for {item.custom_id}: "
+                            f"{result.error if result else None}"
+                        )
+                    self._complete_batch_item(
+                        data_pipeline, manifest.batch_id, item, result.response
+                    )
+                except Exception as e:
+                    logging.error(f"Error Occurred: {e}")
+                    self._fail_batch_item(data_pipeline, manifest.batch_id, e)
+
+            batch_store.remove_manifest(manifest.batch_id)
+
+    def _complete_batch_item(
+        self,
+        data_pipeline: DataPipeline,
+        batch_id: str,
+        item: BatchManifestItem,
+        completion: dict,
+    ):
+        step_details = dict(item.step_details)
+        cache_key = step_details.pop("response_cache_key", None)
+
+        response_cache = self._get_response_cache()
+        if response_cache is not None and cache_key is not None:
+            response_cache.set(cache_key, completion)
+
+        result_file = self._save_gpt_output(data_pipeline, completion)
+
+        self._complete_step(
+            data_pipeline,
+            StepResult(
+                process_id=data_pipeline.pipeline_status.process_id,
+                step_name=self.handler_name,
+                result={
+                    "result": "success",
+                    "file_name": result_file.name,
+                    "response_cache": "disabled" if cache_key is None else "miss",
+                    "batch_id": batch_id,
+                    **step_details,
+                },
+            ),
+        )
+        self._update_process_status(data_pipeline)
+
+    def _fail_batch_item(
+        self, data_pipeline: DataPipeline, batch_id: str, error: Exception
+    ):
+        exception_result = StepResult(
+            process_id=data_pipeline.pipeline_status.process_id,
+            step_name=self.handler_name,
+            result={"result": "error", "batch_id": batch_id, "error": str(error)},
+        )
+        exception_result.save_to_persistent_storage(
+            account_url=self.application_context.configuration.app_storage_blob_url,
+            container_name=self.application_context.configuration.app_cps_processes,
+        )
+
+        data_pipeline.pipeline_status.add_step_result(exception_result)
+        data_pipeline.pipeline_status.save_to_persistent_storage(
+            account_url=self.application_context.configuration.app_storage_blob_url,
+            container_name=self.application_context.configuration.app_cps_processes,
+        )
+
+        # Update Process Status to Cosmos DB
+        ContentProcess(
+            process_id=data_pipeline.pipeline_status.process_id,
+            processed_file_name=data_pipeline.files[0].name,
+            processed_file_mime_type=data_pipeline.files[0].mime_type,
+            status="Error",
+            last_modified_time=datetime.datetime.now(datetime.UTC),
+            last_modified_by=self.handler_name,
+            imported_time=datetime.datetime.strptime(
+                data_pipeline.pipeline_status.creation_time,
+                "%Y-%m-%dT%H:%M:%S.%fZ",
+            ),
+            process_output=[
+                Step_Outputs(
+                    step_name=self.handler_name,
+                    step_result=exception_result.result,
+                )
+            ],
+        ).update_status_to_cosmos(
+            connection_string=self.application_context.configuration.app_cosmos_connstr,
+            database_name=self.application_context.configuration.app_cosmos_database,
+            collection_name=self.application_context.configuration.app_cosmos_container_process,
+            status_collection_name=self.application_context.configuration.app_cosmos_container_process_status,
+        )
+
+    def _get_batch_store(self) -> BatchStore:
+        if self._batch_store is None:
+            self._batch_store = BatchStore(
+                account_url=self.application_context.configuration.app_storage_blob_url,
+                container_name=self.application_context.configuration.app_map_batch_container,
+            )
+        return self._batch_store
+
+    def _get_batch_executor(self) -> BatchExecutor:
+        if self._batch_executor is None:
+            client = self.application_context.kernel.get_service("vision-agent").client
+            if self.application_context.configuration.app_map_batch_executor == "local":
+
+                async def respond(body: dict) -> dict:
+                    return (await client.chat.completions.create(**body)).to_dict()
+
+                self._batch_executor = LocalBatchExecutor(responder=respond)
+            else:
+                self._batch_executor = AzureOpenAIBatchExecutor(client=client)
+        return self._batch_executor
+
+    def _load_extracted_content_digest(
+        self, data_pipeline: DataPipeline, low_confidence_threshold: float
+    ) -> ExtractedContentDigest:
+        """
+        Load the markdown and the page statistics from the Extract step.
+
+        The digest saved by the Extract step is used when its page statistics were calculated
+        with the same threshold. Otherwise (e.g. processes extracted before the digest existed)
+        it is built from the whole Extract output, read as plain JSON without validating it.
+        """
+        digest_files = [
+            file
+            for file in data_pipeline.files
+            if file.processed_by == "extract"
+            and file.artifact_type == ArtifactType.ExtractedContentDigest
+        ]
+        if digest_files:
+            digest = ExtractedContentDigest.model_validate_json(
+                digest_files[0].download_stream(
+                    self.application_context.configuration.app_storage_blob_url,
+                    self.application_context.configuration.app_cps_processes,
+                )
+            )
+            if digest.low_confidence_threshold == low_confidence_threshold:
+                return digest
+
+        return build_extracted_content_digest(
+            json.loads(
+                self.download_output_file_to_json_string(
+                    processed_by="extract",
+                    artifact_type=ArtifactType.ExtractedContent,
+                )
+            ),
+            low_confidence_threshold,
+        )
+
+    def _get_response_cache(self) -> ResponseCache:
+        """
+        Create the response cache once per handler process.
+        """
+        if not self._response_cache_created:
+            self._response_cache = create_response_cache(
+                self.application_context.configuration
+            )
+            self._response_cache_created = True
+        return self._response_cache
+
+    def _convert_pdf_to_images(self, pdf_bytes: bytes, modality: ModalityDecision):
+        """
+        Rasterize the pages selected by the modality decision.
+        """
+        if modality.mode == ModalityMode.AllPages:
+            return convert_from_bytes(pdf_bytes)
+
+        images = []
+        for page_number in modality.pages:
+            images.extend(
+                convert_from_bytes(
+                    pdf_bytes, first_page=page_number, last_page=page_number
+                )
+            )
+        return images
 
     def _convert_image_bytes_to_prompt(
         self, mime_string: str, image_stream: bytes
@@ -205,21 +762,58 @@ class MapHandler(HandlerBase):
             "image_url": {"url": f"data:{mime_string};base64,{base64_encoded_data}"},
         }
 
-    def _prepare_prompt(self, markdown_string: str) -> list[dict]:
+    def _apply_token_budget(
+        self, user_content: list[dict], raw_markdown_string: str
+    ) -> PromptBudgetResult:
         """
-        Prepare the prompt for the model.
+        Count the prompt tokens before (raw markdown) and after compaction, and trim the
+        markdown in place when the prompt exceeds app_map_prompt_token_budget.
+        The count includes the system message sent ahead of the user content.
         """
-        user_content = []
-        user_content.append(
-            {
-                "type": "text",
-                "text": """Extract the data from this Document.
-            - If a value is not present, provide null.
-            - Some values must be inferred based on the rules defined in the policy and Contents.
-            - Dates should be in the format YYYY-MM-DD.""",
-            }
+        configuration = self.application_context.configuration
+        encoding = get_encoding(configuration.app_azure_openai_model)
+        budget = configuration.app_map_prompt_token_budget
+
+        # The markdown is the first item - see _prepare_prompt
+        markdown_content = user_content[0]
+        system_content = {"type": "text", "text": SYSTEM_MESSAGE}
+
+        before = count_prompt_tokens(
+            [system_content]
+            + [
+                {"type": "text", "text": raw_markdown_string}
+                if content is markdown_content
+                else content
+                for content in user_content
+            ],
+            encoding,
+        )
+        after = count_prompt_tokens([system_content] + user_content, encoding)
+
+        trimmed_blocks = 0
+        if budget > 0 and after.total_tokens > budget:
+            markdown_tokens = len(encoding.encode(markdown_content["text"]))
+            markdown_content["text"], trimmed_blocks = trim_markdown_to_budget(
+                markdown_content["text"],
+                max(0, budget - (after.total_tokens - markdown_tokens)),
+                encoding,
+            )
+            after = count_prompt_tokens([system_content] + user_content, encoding)
+
+        return PromptBudgetResult(
+            before=before,
+            after=after,
+            budget=budget,
+            trimmed_blocks=trimmed_blocks,
+            over_budget=budget > 0 and after.total_tokens > budget,
         )
 
+    def _prepare_prompt(self, markdown_string: str) -> list[dict]:
+        """
+        Prepare the user content for the model.
+        Only per-document content goes here; the extraction rules are part of the system message.
+        """
+        user_content = []
         user_content.append({"type": "text", "text": markdown_string})
 
         return user_content
@@ -1,11 +1,15 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import asyncio
 import datetime
 import json
+import logging
+import time
 
 from libs.application.application_context import AppContext
 from libs.models.content_process import ContentProcess, Step_Outputs
+from libs.models.process_archive import archive_processes
 from libs.pipeline.entities.pipeline_file import ArtifactType, PipelineLogEntry
 from libs.pipeline.entities.pipeline_message_context import MessageContext
 from libs.pipeline.entities.pipeline_step_result import StepResult
@@ -15,9 +19,43 @@ from libs.pipeline.queue_handler_base import HandlerBase
 
 
 class SaveHandler(HandlerBase):
+    _archive_last_checked: float = float("-inf")
+
     def __init__(self, appContext: AppContext, step_name: str, **data):
         super().__init__(appContext, step_name, **data)
 
+    async def on_polling_cycle(self):
+        """
+        Archive the processes older than the retention window to blob storage, once per archive interval.
+        """
+        configuration = self.application_context.configuration
+        if configuration.app_process_archive_retention_days <= 0:
+            return
+
+        if (
+            time.monotonic() - self._archive_last_checked
+            < configuration.app_process_archive_interval_seconds
+        ):
+            return
+        self._archive_last_checked = time.monotonic()
+
+        try:
+            archived_count = await asyncio.to_thread(
+                archive_processes,
+                connection_string=configuration.app_cosmos_connstr,
+                database_name=configuration.app_cosmos_database,
+                collection_name=configuration.app_cosmos_container_process,
+                account_url=configuration.app_storage_blob_url,
+                container_name=configuration.app_cps_processes,
+                retention_days=configuration.app_process_archive_retention_days,
+                batch_size=configuration.app_process_archive_batch_size,
+            )
+        except Exception as e:
+            logging.error(f"Error archiving processes: {e}")
+            return
+        if archived_count:
+            print(f"{archived_count} processes archived to blob storage.")
+
     async def execute(self, context: MessageContext) -> StepResult:
         print(context.data_pipeline.get_previous_step_result(self.handler_name))
 
@@ -125,8 +163,14 @@ class SaveHandler(HandlerBase):
             )
         )
 
+        # Save is the last step - the process document is only written once, with the final status
+        pipeline_status = context.data_pipeline.pipeline_status
         processed_result = ContentProcess(
-            status=context.data_pipeline.pipeline_status.active_step,
+            status="Completed"
+            if pipeline_status.remaining_steps in ([], [self.handler_name])
+            else pipeline_status.active_step,
+            last_modified_time=datetime.datetime.now(datetime.UTC),
+            last_modified_by=self.handler_name,
             result=evaluated_result.extracted_result,
             process_id=context.data_pipeline.pipeline_status.process_id,
             processed_file_name=context.data_pipeline.get_source_files()[0].name,
@@ -146,6 +190,7 @@ class SaveHandler(HandlerBase):
                 "min_extracted_field_confidence"
             ],
             prompt_tokens=evaluated_result.prompt_tokens,
+            cached_tokens=evaluated_result.cached_tokens,
             completion_tokens=evaluated_result.completion_tokens,
             target_schema=Schema.get_schema(
                 schema_id=context.data_pipeline.pipeline_status.schema_id,
@@ -164,6 +209,7 @@ class SaveHandler(HandlerBase):
             connection_string=self.application_context.configuration.app_cosmos_connstr,
             database_name=self.application_context.configuration.app_cosmos_database,
             collection_name=self.application_context.configuration.app_cosmos_container_process,
+            status_collection_name=self.application_context.configuration.app_cosmos_container_process_status,
         )
 
         # save process_output to blob storage.
@@ -6,7 +6,9 @@ import base64
 import datetime
 import json
 import logging
+import signal
 from abc import ABC, abstractmethod
+from typing import Optional
 
 from azure.storage.queue import QueueClient
 
@@ -18,6 +20,7 @@ from libs.pipeline.entities.pipeline_data import DataPipeline
 from libs.pipeline.entities.pipeline_file import ArtifactType, PipelineLogEntry
 from libs.pipeline.entities.pipeline_message_context import MessageContext
 from libs.pipeline.entities.pipeline_step_result import StepResult
+from libs.pipeline.status_write_buffer import StatusWriteBuffer
 from libs.utils import base64_util, stopwatch
 
 
@@ -29,6 +32,7 @@ class HandlerBase(AppModelBase, ABC):
     dead_letter_queue_client: QueueClient = None
     dead_letter_queue_name: str = None
     _current_message_context: MessageContext = None
+    _status_buffer: StatusWriteBuffer = None
 
     def __init__(self, appContext: AppContext, step_name: str, **data):
         super().__init__(**data)
@@ -42,6 +46,21 @@ class HandlerBase(AppModelBase, ABC):
         # Initialize the handler
         self.__initialize_handler(app_context, step_name)
 
+        # Stop on SIGTERM like on cancellation, so the pending status updates are written
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel
+            )
+        except NotImplementedError:
+            pass
+
+        try:
+            await self._poll_queue(show_information, step_name)
+        finally:
+            if not await self._get_status_buffer().flush():
+                logging.error("Pending process status updates could not be written.")
+
+    async def _poll_queue(self, show_information: bool, step_name: str):
         while True:
             checking_message: str = """Checking Message.... at {datetime} by {queue_name}
             """
@@ -55,6 +74,10 @@ class HandlerBase(AppModelBase, ABC):
 
             logging.info(checking_message) if show_information else None
 
+            # Give the handler a chance to run its periodic work
+            await self.on_polling_cycle()
+            await self._get_status_buffer().flush_if_due()
+
             # Check if queue is available in the storage account or not
             pipeline_queue_helper.invalidate_queue(self.queue_client)
             pipeline_queue_helper.invalidate_queue(self.dead_letter_queue_client)
@@ -65,6 +88,9 @@ class HandlerBase(AppModelBase, ABC):
                     f"No messages found. - {self.queue_name}"
                 ) if show_information else None
 
+                # Nothing to coalesce while idle - write the pending status updates now
+                await self._get_status_buffer().flush()
+
                 await asyncio.sleep(
                     # Sleep for 5 seconds
                     self.application_context.configuration.app_message_queue_interval
@@ -119,30 +145,18 @@ class HandlerBase(AppModelBase, ABC):
                         print(
                             f"Completed : {self.handler_name} - Elapsed :{timer.elapsed_string}"
                         ) if show_information else None
-                        step_result.elapsed = timer.elapsed_string
-
-                        # Save the executed result to persistent - Save the result as a file
-                        step_result.save_to_persistent_storage(
-                            self.application_context.configuration.app_storage_blob_url,
-                            self.application_context.configuration.app_cps_processes,
-                        )
-
-                        # Add result to the pipeline status
-                        self._current_message_context.data_pipeline.pipeline_status.add_step_result(
-                            step_result
-                        )
+                        # The handler deferred the step (e.g. batch mode) - it will complete the step later
+                        if step_result is None:
+                            pipeline_queue_helper.delete_queue_message(
+                                queue_message, self.queue_client
+                            )
+                            continue
 
-                        # Save(update) pipeline status to the persistent storage
-                        self._current_message_context.data_pipeline.save_to_persistent_storage(
-                            self.application_context.configuration.app_storage_blob_url,
-                            self.application_context.configuration.app_cps_processes,
-                        )
+                        step_result.elapsed = timer.elapsed_string
 
-                        # Enqueue the message to the next step queue
-                        pipeline_queue_helper.pass_data_pipeline_to_next_step(
-                            self._current_message_context.data_pipeline,
-                            self.application_context.configuration.app_storage_queue_url,
-                            self.application_context.credential,
+                        # Save the result, update the pipeline status and pass it to the next step
+                        self._complete_step(
+                            self._current_message_context.data_pipeline, step_result
                         )
 
                         # Delete the message from the current queue
@@ -151,29 +165,10 @@ class HandlerBase(AppModelBase, ABC):
                         )
 
                         # Update Process Status to Cosmos DB
-                        # process_id, processed_file_name, status, last_modified_time, last_modified_by update per each every steps.
-                        ContentProcess(
-                            process_id=self._current_message_context.data_pipeline.pipeline_status.process_id,
-                            processed_file_name=self._current_message_context.data_pipeline.files[
-                                0
-                            ].name,
-                            processed_file_mime_type=self._current_message_context.data_pipeline.files[
-                                0
-                            ].mime_type,
-                            status="Completed"
-                            if self._current_message_context.data_pipeline.pipeline_status.completed
-                            else step_name,
-                            imported_time=datetime.datetime.strptime(
-                                self._current_message_context.data_pipeline.pipeline_status.creation_time,
-                                "%Y-%m-%dT%H:%M:%S.%fZ",
-                            ),
-                            last_modified_time=datetime.datetime.now(datetime.UTC),
-                            last_modified_by=step_name,
-                        ).update_process_status_to_cosmos(
-                            connection_string=self.application_context.configuration.app_cosmos_connstr,
-                            database_name=self.application_context.configuration.app_cosmos_database,
-                            collection_name=self.application_context.configuration.app_cosmos_container_process,
+                        self._update_process_status(
+                            self._current_message_context.data_pipeline
                         )
+                        await self._get_status_buffer().flush_if_due()
                     else:
                         logging.error("Message is not a valid model.")
                         self._move_to_dead_letter_queue(queue_message)
@@ -257,6 +252,7 @@ class HandlerBase(AppModelBase, ABC):
                             connection_string=self.application_context.configuration.app_cosmos_connstr,
                             database_name=self.application_context.configuration.app_cosmos_database,
                             collection_name=self.application_context.configuration.app_cosmos_container_process,
+                            status_collection_name=self.application_context.configuration.app_cosmos_container_process_status,
                         )
 
                         #######################################################################
@@ -358,6 +354,7 @@ class HandlerBase(AppModelBase, ABC):
                                 connection_string=self.application_context.configuration.app_cosmos_connstr,
                                 database_name=self.application_context.configuration.app_cosmos_database,
                                 collection_name=self.application_context.configuration.app_cosmos_container_process,
+                                status_collection_name=self.application_context.configuration.app_cosmos_container_process_status,
                             )
 
                             process_outputs.append(
@@ -406,6 +403,82 @@ class HandlerBase(AppModelBase, ABC):
                             ),
                         )
 
+    def _complete_step(self, data_pipeline: DataPipeline, step_result: StepResult):
+        """
+        Save the step result, update the pipeline status and pass the pipeline to the next step.
+
+        Args:
+            data_pipeline: The DataPipeline of the process.
+            step_result: The result of the executed step.
+        """
+        # Save the executed result to persistent - Save the result as a file
+        step_result.save_to_persistent_storage(
+            self.application_context.configuration.app_storage_blob_url,
+            self.application_context.configuration.app_cps_processes,
+        )
+
+        # Add result to the pipeline status
+        data_pipeline.pipeline_status.add_step_result(step_result)
+
+        # Save(update) pipeline status to the persistent storage
+        data_pipeline.save_to_persistent_storage(
+            self.application_context.configuration.app_storage_blob_url,
+            self.application_context.configuration.app_cps_processes,
+        )
+
+        # Enqueue the message to the next step queue
+        pipeline_queue_helper.pass_data_pipeline_to_next_step(
+            data_pipeline,
+            self.application_context.configuration.app_storage_queue_url,
+            self.application_context.credential,
+        )
+
+    def _update_process_status(self, data_pipeline: DataPipeline):
+        """
+        Update the process status in Cosmos DB after the step completed.
+
+        The update is buffered and written with the other pending updates (see StatusWriteBuffer).
+
+        Args:
+            data_pipeline: The DataPipeline of the process.
+        """
+        # process_id, processed_file_name, status, last_modified_time, last_modified_by update per each every steps.
+        self._get_status_buffer().add(
+            ContentProcess(
+                process_id=data_pipeline.pipeline_status.process_id,
+                processed_file_name=data_pipeline.files[0].name,
+                processed_file_mime_type=data_pipeline.files[0].mime_type,
+                status="Completed"
+                if data_pipeline.pipeline_status.completed
+                else self.handler_name,
+                imported_time=datetime.datetime.strptime(
+                    data_pipeline.pipeline_status.creation_time,
+                    "%Y-%m-%dT%H:%M:%S.%fZ",
+                ),
+                last_modified_time=datetime.datetime.now(datetime.UTC),
+                last_modified_by=self.handler_name,
+            )
+        )
+
+    def _get_status_buffer(self) -> StatusWriteBuffer:
+        if self._status_buffer is None:
+            configuration = self.application_context.configuration
+            self._status_buffer = StatusWriteBuffer(
+                connection_string=configuration.app_cosmos_connstr,
+                database_name=configuration.app_cosmos_database,
+                collection_name=configuration.app_cosmos_container_process_status,
+                max_size=configuration.app_status_write_buffer_max_size,
+                flush_interval_seconds=configuration.app_status_write_buffer_flush_interval_seconds,
+            )
+        return self._status_buffer
+
+    async def on_polling_cycle(self):
+        """
+        Called on every polling cycle of the queue, before messages are received.
+        Handlers with periodic work (e.g. submitting or polling batches) override this method.
+        """
+        pass
+
     def __initialize_handler(self, appContext: AppContext, step_name: str):
         self.handler_name = step_name
         self.application_context = appContext
@@ -457,7 +530,12 @@ class HandlerBase(AppModelBase, ABC):
         print(queue_statue_message)
 
     @abstractmethod
-    async def execute(self, context: MessageContext) -> StepResult:
+    async def execute(self, context: MessageContext) -> Optional[StepResult]:
+        """
+        Execute the step for the message.
+        Returning None defers the step: the message is removed from the queue and the
+        handler completes the step later with _complete_step.
+        """
         raise NotImplementedError("execute method is not implemented")
 
     def connect_queue(
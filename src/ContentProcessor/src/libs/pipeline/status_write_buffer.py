@@ -0,0 +1,155 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from libs.azure_helper.comsos_mongo import CosmosMongDBHelper
+from libs.models.content_process import ContentProcess
+
+
+def build_status_operations(content_process: ContentProcess) -> list[UpdateOne]:
+    """
+    Build the bulk write operations of a process status update.
+
+    The first operation inserts the status document when it does not exist yet. The second
+    one sets the status fields, unless the stored process was modified later than this
+    update, so a delayed write never overwrites a newer status (e.g. of the next step).
+    Either order gives the same document, so they can be written unordered.
+
+    Args:
+        content_process: The process with its status.
+
+    Returns:
+        list[UpdateOne]: The operations of the update.
+    """
+    status_fields = content_process.get_status_fields()
+    return [
+        UpdateOne(
+            {"process_id": content_process.process_id},
+            {"$setOnInsert": content_process.get_status_document()},
+            upsert=True,
+        ),
+        UpdateOne(
+            {
+                "process_id": content_process.process_id,
+                "$or": [
+                    {
+                        "last_modified_time": {
+                            "$lte": content_process.last_modified_time
+                        }
+                    },
+                    {"last_modified_time": None},
+                ],
+            },
+            {"$set": status_fields},
+        ),
+    ]
+
+
+class StatusWriteBuffer:
+    """
+    Write-behind buffer of the process status updates of a handler, written to the status collection.
+
+    Updates are coalesced per process_id, so only the last status of a process is written,
+    and are flushed together in one unordered bulk write once max_size processes are
+    pending or the oldest update waited flush_interval_seconds.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        database_name: str,
+        collection_name: str,
+        max_size: int = 50,
+        flush_interval_seconds: float = 2.0,
+    ):
+        self.connection_string = connection_string
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.max_size = max_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: dict[str, ContentProcess] = {}
+        self._pending_since: Optional[float] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def add(self, content_process: ContentProcess):
+        """
+        Add a status update; it replaces the pending update of the same process.
+        """
+        self._pending.pop(content_process.process_id, None)
+        self._pending[content_process.process_id] = content_process
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def is_flush_due(self) -> bool:
+        """
+        Check if the pending updates reached max_size or the oldest one waited flush_interval_seconds.
+        """
+        if not self._pending:
+            return False
+        return (
+            len(self._pending) >= self.max_size
+            or time.monotonic() - self._pending_since >= self.flush_interval_seconds
+        )
+
+    async def flush_if_due(self):
+        if self.is_flush_due():
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """
+        Write the pending updates without blocking the event loop.
+
+        Returns:
+            bool: True if the pending updates were written. On failure they are kept for the next flush.
+        """
+        async with self._flush_lock:
+            pending = self._take_pending()
+            if not pending:
+                return True
+            try:
+                await asyncio.to_thread(self._write, pending)
+                return True
+            except Exception as e:
+                logging.error(f"Error writing the process status: {e}")
+                self._restore_pending(pending)
+                return False
+
+    def _take_pending(self) -> list[ContentProcess]:
+        pending = list(self._pending.values())
+        self._pending = {}
+        self._pending_since = None
+        return pending
+
+    def _restore_pending(self, pending: list[ContentProcess]):
+        # Updates added while writing are newer and win over the failed ones
+        for content_process in pending:
+            if content_process.process_id not in self._pending:
+                self._pending[content_process.process_id] = content_process
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def _write(self, pending: list[ContentProcess]):
+        mongo_helper = CosmosMongDBHelper(
+            connection_string=self.connection_string,
+            db_name=self.database_name,
+            container_name=self.collection_name,
+            indexes=["process_id"],
+        )
+        mongo_helper.bulk_write(
+            [
+                operation
+                for content_process in pending
+                for operation in build_status_operations(content_process)
+            ],
+            ordered=False,
+        )
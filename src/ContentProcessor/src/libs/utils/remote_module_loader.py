@@ -14,18 +14,37 @@ def load_schema_from_blob(
     """
     Load the schema from a blob in Azure Storage.
     """
+    loaded_class, _ = load_schema_with_etag_from_blob(
+        account_url, container_name, blob_name, module_name
+    )
+    return loaded_class
+
+
+def load_schema_with_etag_from_blob(
+    account_url: str, container_name: str, blob_name: str, module_name: str
+) -> tuple[type, str]:
+    """
+    Load the schema from a blob in Azure Storage and return it with the etag of the blob it was loaded from.
+    """
     # Download the blob content
-    blob_content = _download_blob_content(container_name, blob_name, account_url)
+    blob_content, etag = _download_blob_content(container_name, blob_name, account_url)
 
     # Execute the script content
-    module_name = module_name
     module = _execute_script(blob_content, module_name)
 
     loaded_class = getattr(module, module_name)
-    return loaded_class
+    return loaded_class, etag
 
 
-def _download_blob_content(container_name, blob_name, account_url):
+def get_blob_etag(account_url: str, container_name: str, blob_name: str) -> str:
+    """
+    Get the etag of a blob without downloading its content.
+    """
+    blob_client = _get_blob_client(container_name, blob_name, account_url)
+    return blob_client.get_blob_properties().etag
+
+
+def _get_blob_client(container_name, blob_name, account_url):
     # Create the BlobServiceClient object which will be used to create a container client
     credential = DefaultAzureCredential()
     blob_service_client = BlobServiceClient(
@@ -33,15 +52,18 @@ def _download_blob_content(container_name, blob_name, account_url):
     )
 
     # Create a blob client using the local file name as the name for the blob
-    blob_client = blob_service_client.get_blob_client(
-        container=container_name, blob=blob_name
-    )
+    return blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+
+
+def _download_blob_content(container_name, blob_name, account_url):
+    blob_client = _get_blob_client(container_name, blob_name, account_url)
 
     print(f"\nDownloading blob content from \n\t{blob_name}")
 
     # Download the blob content as a string
-    blob_content = blob_client.download_blob().readall().decode("utf-8")
-    return blob_content
+    downloader = blob_client.download_blob()
+    blob_content = downloader.readall().decode("utf-8")
+    return blob_content, downloader.properties.etag
 
 
 def _execute_script(script_content, module_name):
@@ -27,6 +27,43 @@ class CustomEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+def iter_flattened_items(data, parent_key="", sep="_"):
+    """
+    Iterate over the leaf values of a nested dictionary with their flattened keys, in depth-first order.
+
+    Nested dictionaries are walked with an explicit stack instead of recursion, and no
+    intermediate dictionaries are built. Keys are joined with the separator; list items
+    are keyed by their index, joined with "_".
+
+    Args:
+        data: The dictionary to flatten.
+        parent_key: The parent key.
+        sep: The separator to use between keys.
+
+    Yields:
+        tuple: The flattened key and the leaf value.
+    """
+
+    def _dict_items(items, prefix):
+        return ((f"{prefix}{sep}{k}" if prefix else k, v) for k, v in items)
+
+    def _list_items(items, prefix):
+        return ((f"{prefix}_{i}", item) for i, item in enumerate(items))
+
+    stack = [_dict_items(data.items(), parent_key)]
+    while stack:
+        for key, value in stack[-1]:
+            if isinstance(value, dict):
+                stack.append(_dict_items(value.items(), key))
+                break
+            if isinstance(value, list):
+                stack.append(_list_items(value, key))
+                break
+            yield key, value
+        else:
+            stack.pop()
+
+
 def flatten_dict(data, parent_key="", sep="_"):
     """
     Flatten a nested dictionary.
@@ -40,19 +77,7 @@ def flatten_dict(data, parent_key="", sep="_"):
         dict: The flattened dictionary with keys separated by the separator.
     """
 
-    items = []
-    for k, v in data.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        elif isinstance(v, list):
-            for i, item in enumerate(v):
-                items.extend(
-                    flatten_dict({f"{new_key}_{i}": item}, "", sep=sep).items()
-                )
-        else:
-            items.append((new_key, v))
-    return dict(items)
+    return dict(iter_flattened_items(data, parent_key, sep))
 
 
 def value_match(value_a: any, value_b: any) -> bool:
@@ -87,6 +112,20 @@ def value_match(value_a: any, value_b: any) -> bool:
     return value_a == value_b
 
 
+def normalize_text(value: str) -> str:
+    """
+    Normalize a string for value_contains: spaces are removed and the string is lower cased.
+
+    Args:
+        value: The string to normalize.
+
+    Returns:
+        str: The normalized string.
+    """
+
+    return value.replace(" ", "").lower()
+
+
 def value_contains(value_a: any, value_b: any) -> bool:
     """
     Check if a value contains another value.
@@ -104,7 +143,7 @@ def value_contains(value_a: any, value_b: any) -> bool:
     """
 
     if isinstance(value_a, str) and isinstance(value_b, str):
-        return value_a.replace(" ", "").lower() in value_b.replace(" ", "").lower()
+        return normalize_text(value_a) in normalize_text(value_b)
 
     if isinstance(value_a, list) and isinstance(value_b, list):
         for v in value_a:
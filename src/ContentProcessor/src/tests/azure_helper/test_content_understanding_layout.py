@@ -0,0 +1,160 @@
+import numpy as np
+
+from libs.azure_helper.model.content_understanding import Page
+from libs.azure_helper.model.content_understanding_layout import (
+    ColumnarDocument,
+    ColumnarPage,
+    normalize_polygons,
+)
+from libs.pipeline.handlers.logics.evaluate_handler.content_understanding_confidence_evaluator import (
+    normalize_polygon,
+)
+
+PAGE = {
+    "pageNumber": 1,
+    "angle": 0,
+    "width": 10,
+    "height": 20,
+    "spans": [{"offset": 0, "length": 30}],
+    "words": [
+        # Out of offset order, and one word crossing the end of the first line
+        {
+            "content": "Smith",
+            "span": {"offset": 5, "length": 5},
+            "confidence": 0.7,
+            "source": "D(1,3,1,5,1,5,2,3,2)",
+        },
+        {
+            "content": "John",
+            "span": {"offset": 0, "length": 4},
+            "confidence": 0.9,
+            "source": "D(1,1,1,2,1,2,2,1,2)",
+        },
+        {
+            "content": "Seattle",
+            "span": {"offset": 11, "length": 12},
+            "confidence": 0.8,
+            "source": "D(1,1,3,4,3,4,4,1,4)",
+        },
+    ],
+    "lines": [
+        {
+            "content": "John Smith",
+            "source": "D(1,1,1,5,1,5,2,1,2)",
+            "span": {"offset": 0, "length": 12},
+        },
+        {
+            "content": "Seattle",
+            "source": "D(1,1,3,4,3,4,4,1,4)",
+            "span": {"offset": 11, "length": 12},
+        },
+        {"content": "", "source": "", "span": {"offset": 30, "length": 0}},
+    ],
+}
+
+
+def test_columnar_page_from_dict():
+    page = ColumnarPage.from_dict(PAGE)
+
+    assert page.word_count == 3
+    assert page.line_count == 3
+    assert page.word_offsets.tolist() == [5, 0, 11]
+    assert page.word_confidences.tolist() == [0.7, 0.9, 0.8]
+    assert page.word_polygons.shape == (3, 8)
+    assert page.word_polygons[1].tolist() == [1, 1, 2, 1, 2, 2, 1, 2]
+    assert np.isnan(page.line_polygons[2]).all()
+
+
+def test_columnar_page_matches_validated_page():
+    from_dict = ColumnarPage.from_dict(PAGE)
+    from_page = ColumnarPage.from_page(Page(**PAGE))
+
+    for name in ColumnarPage.__slots__:
+        expected = getattr(from_dict, name)
+        actual = getattr(from_page, name)
+        if isinstance(expected, np.ndarray):
+            np.testing.assert_array_equal(actual, expected)
+        else:
+            assert actual == expected, name
+
+
+def test_line_words_and_confidences():
+    page = ColumnarPage.from_dict(PAGE)
+
+    line_indexes, word_indexes = page.get_line_words()
+
+    # "Smith" (page order 0) comes before "John" (page order 1) in the first line
+    assert line_indexes.tolist() == [0, 0, 1]
+    assert word_indexes.tolist() == [0, 1, 2]
+    assert page.get_line_confidences().tolist() == [0.7, 0.8, 0.0]
+
+
+def test_line_words_match_linear_scan():
+    words = [("b", 4, 3), ("a", 0, 3), ("empty", 7, 0), ("c", 8, 2), ("d", 6, 4)]
+    spans = [(0, 3), (0, 7), (4, 6), (3, 5), (0, 100), (11, 9)]
+    page = ColumnarPage.from_dict(
+        {
+            **PAGE,
+            "words": [
+                {
+                    "content": content,
+                    "span": {"offset": offset, "length": length},
+                    "confidence": 1,
+                    "source": "",
+                }
+                for content, offset, length in words
+            ],
+            "lines": [
+                {
+                    "content": "",
+                    "source": "",
+                    "span": {"offset": offset, "length": length},
+                }
+                for offset, length in spans
+            ],
+        }
+    )
+
+    line_indexes, word_indexes = page.get_line_words()
+
+    expected = [
+        (line, word)
+        for line, (start, length) in enumerate(spans)
+        for word, (_, offset, word_length) in enumerate(words)
+        if offset >= start and offset + word_length <= start + length
+    ]
+    assert list(zip(line_indexes.tolist(), word_indexes.tolist())) == expected
+
+
+def test_columnar_document_from_dict():
+    document = ColumnarDocument.from_dict({"markdown": "# Resume", "pages": [PAGE]})
+
+    assert document.markdown == "# Resume"
+    assert [page.page_number for page in document.pages] == [1]
+    assert ColumnarDocument.from_dict({}).pages == []
+
+
+def test_normalize_polygons_matches_normalize_polygon():
+    rng = np.random.default_rng(0)
+    # Four decimal coordinates, like Content Understanding sources - many are half-way after scaling
+    polygons = np.round(rng.uniform(0, 11, (2000, 8)), 4)
+    page = Page(**{**PAGE, "width": 10, "height": 11})
+
+    normalized = normalize_polygons(polygons, page.width, page.height)
+
+    for polygon, row in zip(polygons.tolist(), normalized.tolist()):
+        points = normalize_polygon(page, polygon)
+        assert row == [coordinate for point in points for coordinate in point.values()]
+
+
+def test_normalized_line_polygon_points():
+    page = ColumnarPage.from_dict(PAGE)
+
+    assert page.get_normalized_line_polygon(0) == [
+        {"x": 0.1, "y": 0.05},
+        {"x": 0.5, "y": 0.05},
+        {"x": 0.5, "y": 0.1},
+        {"x": 0.1, "y": 0.1},
+    ]
+    assert page.get_normalized_line_polygon(2) == []
+    assert page.get_normalized_line_polygons() is page.get_normalized_line_polygons()
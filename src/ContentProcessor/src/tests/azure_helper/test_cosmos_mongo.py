@@ -1,5 +1,5 @@
 import pytest
-from libs.azure_helper.comsos_mongo import CosmosMongDBHelper
+from libs.azure_helper.comsos_mongo import CosmosMongDBHelper, clear_mongo_clients
 import mongomock
 
 
@@ -11,7 +11,9 @@ def mock_mongo_client(monkeypatch):
     monkeypatch.setattr(
         "libs.azure_helper.comsos_mongo.MongoClient", mock_mongo_client_init
     )
-    return mongomock.MongoClient()
+    clear_mongo_clients()
+    yield mongomock.MongoClient()
+    clear_mongo_clients()
 
 
 def test_prepare(mock_mongo_client, monkeypatch):
@@ -87,3 +89,42 @@ def test_delete_document(mock_mongo_client):
 
     result = helper.find_document({"Id": "123"})
     assert len(result) == 0
+
+
+def test_helpers_share_client_and_prepare_container_once(mock_mongo_client, mocker):
+    create_container = mocker.spy(CosmosMongDBHelper, "_create_container")
+    create_indexes = mocker.spy(CosmosMongDBHelper, "_create_indexes")
+
+    first = CosmosMongDBHelper(
+        "connection_string", "db_name", "container_name", indexes=["process_id"]
+    )
+    second = CosmosMongDBHelper(
+        "connection_string", "db_name", "container_name", indexes=["process_id"]
+    )
+
+    assert second.client is first.client
+    assert second.container is first.container
+    assert create_container.call_count == 1
+    assert create_indexes.call_count == 1
+    assert "process_id_1" in first.container.index_information()
+
+    other = CosmosMongDBHelper("other_connection_string", "db_name", "container_name")
+    assert other.client is not first.client
+
+
+def test_upsert_document(mock_mongo_client):
+    helper = CosmosMongDBHelper("connection_string", "db_name", "container_name")
+
+    helper.upsert_document(
+        {"Id": "123"},
+        {"status": "Started"},
+        insert_only={"Id": "123", "status": "Ignored", "created": "now"},
+    )
+    helper.upsert_document(
+        {"Id": "123"}, {"status": "Completed"}, insert_only={"created": "later"}
+    )
+
+    result = helper.find_document({"Id": "123"}, [("Id", 1)])
+    assert len(result) == 1
+    assert result[0]["status"] == "Completed"
+    assert result[0]["created"] == "now"
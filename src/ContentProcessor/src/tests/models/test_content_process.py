@@ -0,0 +1,69 @@
+import mongomock
+import pytest
+
+from libs.azure_helper.comsos_mongo import clear_mongo_clients
+from libs.models.content_process import PROCESS_STATUS_FIELDS, ContentProcess
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(
+        "libs.azure_helper.comsos_mongo.MongoClient", lambda *args, **kwargs: client
+    )
+    clear_mongo_clients()
+    yield client
+    clear_mongo_clients()
+
+
+def test_update_process_status_to_cosmos_upserts(mongo_client, mocker):
+    collection = mongo_client["db"]["processes"]
+    find = mocker.spy(mongomock.collection.Collection, "find")
+
+    ContentProcess(
+        process_id="123", status="Processing", processed_file_name="a.pdf"
+    ).update_process_status_to_cosmos("connection_string", "db", "processes")
+    ContentProcess(
+        process_id="123", status="Completed", schema_score=0.5
+    ).update_process_status_to_cosmos("connection_string", "db", "processes")
+    # The process is not read before it is written
+    assert find.call_count == 0
+
+    documents = list(collection.find({"process_id": "123"}))
+    assert len(documents) == 1
+    assert documents[0]["status"] == "Completed"
+    assert documents[0]["processed_file_name"] is None
+    # Fields other than the status are only written on insert
+    assert documents[0]["schema_score"] == 0.0
+    assert "result" not in documents[0]
+
+
+def test_update_status_to_cosmos_upserts(mongo_client):
+    collection = mongo_client["db"]["processes"]
+
+    ContentProcess(process_id="123", status="Processing").update_status_to_cosmos(
+        "connection_string", "db", "processes"
+    )
+    ContentProcess(
+        process_id="123", status="Completed", schema_score=0.5
+    ).update_status_to_cosmos("connection_string", "db", "processes")
+
+    documents = list(collection.find({"process_id": "123"}))
+    assert len(documents) == 1
+    assert documents[0]["status"] == "Completed"
+    assert documents[0]["schema_score"] == 0.5
+
+
+def test_update_status_to_cosmos_writes_status_document(mongo_client):
+    ContentProcess(
+        process_id="123", status="Completed", schema_score=0.5, result={"a": 1}
+    ).update_status_to_cosmos(
+        "connection_string", "db", "processes", status_collection_name="status"
+    )
+
+    process = mongo_client["db"]["processes"].find_one({"process_id": "123"})
+    status = mongo_client["db"]["status"].find_one({"process_id": "123"}, {"_id": 0})
+    assert process["result"] == {"a": 1}
+    assert set(status) == set(PROCESS_STATUS_FIELDS)
+    assert status["status"] == "Completed"
+    assert status["schema_score"] == 0.5
@@ -0,0 +1,143 @@
+import datetime
+import gzip
+
+import mongomock
+import pytest
+from bson import json_util
+
+from libs.azure_helper.comsos_mongo import clear_mongo_clients
+from libs.models.process_archive import (
+    ARCHIVE_BLOB_NAME,
+    archive_processes,
+    build_archive_stub,
+)
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(
+        "libs.azure_helper.comsos_mongo.MongoClient", lambda *args, **kwargs: client
+    )
+    clear_mongo_clients()
+    yield client
+    clear_mongo_clients()
+
+
+@pytest.fixture
+def blob_helper(mocker):
+    blob_helper = mocker.MagicMock()
+    mocker.patch(
+        "libs.models.process_archive.StorageBlobHelper.get", return_value=blob_helper
+    )
+    return blob_helper
+
+
+def _insert_process(collection, process_id, status, days_ago):
+    imported_time = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+        days=days_ago
+    )
+    collection.insert_one(
+        {
+            "process_id": process_id,
+            "processed_file_name": f"{process_id}.pdf",
+            "status": status,
+            "imported_time": imported_time,
+            "last_modified_time": imported_time,
+            "prompt_tokens": 10,
+            "target_schema": {
+                "Id": "schema",
+                "ClassName": "Invoice",
+                "Description": "x",
+            },
+            "result": {"total": 1},
+        }
+    )
+
+
+def _archive(retention_days=30, batch_size=100):
+    return archive_processes(
+        "connection_string",
+        "db",
+        "processes",
+        "https://account",
+        "processes",
+        retention_days=retention_days,
+        batch_size=batch_size,
+    )
+
+
+def test_archive_processes_replaces_old_finished_processes(mongo_client, blob_helper):
+    collection = mongo_client["db"]["processes"]
+    _insert_process(collection, "old", "Completed", 60)
+    _insert_process(collection, "failed", "Error", 60)
+    _insert_process(collection, "recent", "Completed", 1)
+    _insert_process(collection, "running", "map", 60)
+
+    assert _archive() == 2
+
+    archived = {call.args[0] for call in blob_helper.upload_blob.call_args_list}
+    assert archived == {"old", "failed"}
+    assert "result" in collection.find_one({"process_id": "recent"})
+    assert "result" in collection.find_one({"process_id": "running"})
+
+    stub = collection.find_one({"process_id": "old"})
+    assert "result" not in stub
+    assert stub["processed_file_name"] == "old.pdf"
+    assert stub["prompt_tokens"] == 10
+    # The whole schema is kept, so the stub is still a valid process document
+    assert stub["target_schema"] == {
+        "Id": "schema",
+        "ClassName": "Invoice",
+        "Description": "x",
+    }
+    assert stub["archive"]["container_name"] == "processes/old"
+    assert stub["archive"]["blob_name"] == ARCHIVE_BLOB_NAME
+
+    # Archived processes are not archived again
+    blob_helper.upload_blob.reset_mock()
+    assert _archive() == 0
+    blob_helper.upload_blob.assert_not_called()
+
+
+def test_archive_processes_writes_the_whole_document(mongo_client, blob_helper):
+    collection = mongo_client["db"]["processes"]
+    _insert_process(collection, "old", "Completed", 60)
+    document = collection.find_one({"process_id": "old"})
+
+    _archive()
+
+    container_name, blob_name, data = blob_helper.upload_blob.call_args.args
+    assert (container_name, blob_name) == ("old", ARCHIVE_BLOB_NAME)
+    archived_document = json_util.loads(gzip.decompress(data).decode("utf-8"))
+    assert archived_document["_id"] == document["_id"]
+    assert archived_document["result"] == {"total": 1}
+
+
+def test_archive_processes_limits_the_batch(mongo_client, blob_helper):
+    collection = mongo_client["db"]["processes"]
+    for index in range(3):
+        _insert_process(collection, f"old-{index}", "Completed", 60)
+
+    assert _archive(batch_size=2) == 2
+    assert _archive(batch_size=2) == 1
+
+
+def test_build_archive_stub_without_target_schema():
+    archived_time = datetime.datetime.now(datetime.UTC)
+
+    stub = build_archive_stub(
+        {"process_id": "123", "status": "Completed", "result": {}},
+        "processes/123",
+        archived_time,
+    )
+
+    assert stub == {
+        "process_id": "123",
+        "status": "Completed",
+        "archive": {
+            "container_name": "processes/123",
+            "blob_name": ARCHIVE_BLOB_NAME,
+            "archived_time": archived_time,
+        },
+    }
@@ -0,0 +1,75 @@
+from libs.azure_helper.model.content_understanding import DocumentContent
+from libs.pipeline.entities.extracted_content import (
+    build_extracted_content_digest,
+    calculate_page_confidence_stats,
+)
+
+
+def _analyzed_result(*pages):
+    return {
+        "id": "analyze",
+        "status": "Succeeded",
+        "result": {
+            "contents": [
+                {
+                    "markdown": "# Resume\n\nJohn Smith",
+                    "kind": "document",
+                    "startPageNumber": 1,
+                    "endPageNumber": len(pages),
+                    "unit": "inch",
+                    "pages": [
+                        {
+                            "pageNumber": page_number,
+                            "angle": 0,
+                            "width": 8.5,
+                            "height": 11,
+                            "spans": [],
+                            "words": [
+                                {
+                                    "content": f"word{i}",
+                                    "span": {"offset": i, "length": 1},
+                                    "confidence": confidence,
+                                    "source": f"D({page_number},0,0,1,0,1,1,0,1)",
+                                }
+                                for i, confidence in enumerate(confidences)
+                            ],
+                        }
+                        for page_number, confidences in enumerate(pages, start=1)
+                    ],
+                }
+            ]
+        },
+    }
+
+
+def test_calculate_page_confidence_stats():
+    stats = calculate_page_confidence_stats(1, [0.9, 0.7, 1.0, 0.6], 0.8)
+
+    assert stats.page_number == 1
+    assert stats.word_count == 4
+    assert stats.mean_confidence == 0.8
+    assert stats.low_confidence_ratio == 0.5
+    assert calculate_page_confidence_stats(2, [], 0.8).mean_confidence == 0.0
+
+
+def test_digest_matches_validated_document():
+    analyzed_result = _analyzed_result([0.99, 0.5, 0.97], [], [0.81, 0.79])
+
+    digest = build_extracted_content_digest(analyzed_result, 0.8)
+
+    assert digest.markdown == "# Resume\n\nJohn Smith"
+    assert digest.low_confidence_threshold == 0.8
+    document = DocumentContent(**analyzed_result["result"]["contents"][0])
+    assert digest.page_stats == [
+        calculate_page_confidence_stats(
+            page.pageNumber, [word.confidence for word in page.words], 0.8
+        )
+        for page in document.pages
+    ]
+
+
+def test_digest_of_empty_result():
+    digest = build_extracted_content_digest({"result": {"contents": []}}, 0.8)
+
+    assert digest.markdown == ""
+    assert digest.page_stats == []
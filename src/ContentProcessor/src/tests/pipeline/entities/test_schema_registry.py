@@ -0,0 +1,129 @@
+import datetime
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from libs.pipeline.entities.schema import Schema
+from libs.pipeline.entities.schema_registry import SchemaRegistry, get_schema_registry
+
+
+class SampleSchema(BaseModel):
+    name: Optional[str]
+
+
+def _schema(updated_on=datetime.datetime(2025, 1, 1)):
+    return Schema(
+        Id="schema-1",
+        ClassName="SampleSchema",
+        Description="Sample",
+        FileName="sample.py",
+        ContentType="application/pdf",
+        Updated_On=updated_on,
+    )
+
+
+@pytest.fixture
+def mock_sources(mocker):
+    get_schema = mocker.patch(
+        "libs.pipeline.entities.schema_registry.Schema.get_schema",
+        return_value=_schema(),
+    )
+    load_schema = mocker.patch(
+        "libs.pipeline.entities.schema_registry.load_schema_with_etag_from_blob",
+        return_value=(SampleSchema, "etag-1"),
+    )
+    get_etag = mocker.patch(
+        "libs.pipeline.entities.schema_registry.get_blob_etag",
+        return_value="etag-1",
+    )
+    return get_schema, load_schema, get_etag
+
+
+def _get(registry):
+    return registry.get_schema(
+        schema_id="schema-1",
+        connection_string="connection_string",
+        database_name="db",
+        collection_name="Schemas",
+        account_url="https://testbloburl.com",
+        container_name="cps-configuration/Schemas/schema-1",
+    )
+
+
+def test_get_schema_is_cached_within_ttl(mock_sources):
+    get_schema, load_schema, get_etag = mock_sources
+    registry = SchemaRegistry(ttl_seconds=300)
+
+    first = _get(registry)
+    second = _get(registry)
+
+    assert first is second
+    assert first.schema_class is SampleSchema
+    assert first.response_format["type"] == "json_schema"
+    assert first.response_format["json_schema"]["name"] == "SampleSchema"
+    assert get_schema.call_count == 1
+    assert load_schema.call_count == 1
+    get_etag.assert_not_called()
+
+
+def test_get_schema_revalidates_unchanged_entry(mock_sources):
+    get_schema, load_schema, get_etag = mock_sources
+    registry = SchemaRegistry(ttl_seconds=0)
+
+    first = _get(registry)
+    second = _get(registry)
+
+    assert first is second
+    assert get_schema.call_count == 2
+    assert load_schema.call_count == 1
+    assert get_etag.call_count == 1
+
+
+def test_get_schema_reloads_when_blob_changed(mock_sources):
+    _, load_schema, get_etag = mock_sources
+    registry = SchemaRegistry(ttl_seconds=0)
+
+    first = _get(registry)
+    get_etag.return_value = "etag-2"
+    load_schema.return_value = (SampleSchema, "etag-2")
+    second = _get(registry)
+
+    assert first is not second
+    assert second.etag == "etag-2"
+    assert first.version != second.version
+    assert load_schema.call_count == 2
+
+
+def test_get_schema_reloads_when_document_updated(mock_sources):
+    get_schema, load_schema, get_etag = mock_sources
+    registry = SchemaRegistry(ttl_seconds=0)
+
+    _get(registry)
+    get_schema.return_value = _schema(datetime.datetime(2025, 2, 1))
+    second = _get(registry)
+
+    assert second.schema_info.Updated_On == datetime.datetime(2025, 2, 1)
+    assert load_schema.call_count == 2
+    get_etag.assert_not_called()
+
+
+def test_invalidate(mock_sources):
+    _, load_schema, _ = mock_sources
+    registry = SchemaRegistry(ttl_seconds=300)
+
+    _get(registry)
+    registry.invalidate("schema-1")
+    _get(registry)
+
+    assert load_schema.call_count == 2
+
+
+def test_get_schema_registry_applies_the_latest_ttl(monkeypatch):
+    monkeypatch.setattr("libs.pipeline.entities.schema_registry._schema_registry", None)
+
+    registry = get_schema_registry(300)
+    assert registry.ttl_seconds == 300
+
+    assert get_schema_registry(0) is registry
+    assert registry.ttl_seconds == 0
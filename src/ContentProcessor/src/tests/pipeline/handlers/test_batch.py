@@ -0,0 +1,220 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from libs.application.application_context import AppContext
+from libs.pipeline.handlers.logics.map_handler.batch import (
+    BatchManifest,
+    BatchManifestItem,
+    BatchPendingRequest,
+    BatchResult,
+    BatchResultError,
+    LocalBatchExecutor,
+    build_batch_request_line,
+    parse_batch_output,
+)
+from libs.pipeline.handlers.map_handler import MapHandler
+
+
+class InMemoryBatchStore:
+    def __init__(self):
+        self.pending = {}
+        self.manifests = {}
+
+    def add_pending(self, request):
+        self.pending[request.custom_id] = request
+
+    def list_pending(self):
+        return list(self.pending.values())
+
+    def remove_pending(self, custom_ids):
+        for custom_id in custom_ids:
+            self.pending.pop(custom_id, None)
+
+    def save_manifest(self, manifest):
+        self.manifests[manifest.batch_id] = manifest
+
+    def list_manifests(self):
+        return list(self.manifests.values())
+
+    def remove_manifest(self, batch_id):
+        self.manifests.pop(batch_id, None)
+
+
+def _completion(content):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+    }
+
+
+def test_build_batch_request_line():
+    line = build_batch_request_line(
+        custom_id="process-1",
+        deployment_name="gpt-4o-batch",
+        messages=[{"role": "user", "content": "hello"}],
+        request_settings={"temperature": 0.1, "logprobs": True},
+    )
+
+    assert line == {
+        "custom_id": "process-1",
+        "method": "POST",
+        "url": "/chat/completions",
+        "body": {
+            "model": "gpt-4o-batch",
+            "messages": [{"role": "user", "content": "hello"}],
+            "temperature": 0.1,
+            "logprobs": True,
+        },
+    }
+
+
+def test_parse_batch_output():
+    output = "\n".join(
+        [
+            json.dumps(
+                {
+                    "custom_id": "process-1",
+                    "response": {"status_code": 200, "body": _completion("{}")},
+                    "error": None,
+                }
+            ),
+            json.dumps(
+                {
+                    "custom_id": "process-2",
+                    "response": {"status_code": 400, "body": {"message": "bad"}},
+                    "error": None,
+                }
+            ),
+        ]
+    )
+
+    results = parse_batch_output(output)
+
+    assert results[0].custom_id == "process-1"
+    assert results[0].response == _completion("{}")
+    assert results[1].response is None
+    assert results[1].error == {"message": "bad"}
+
+
+@pytest.mark.asyncio
+async def test_local_batch_executor():
+    async def responder(body):
+        return _completion(body["messages"][0]["content"])
+
+    executor = LocalBatchExecutor(responder=responder)
+    jsonl = "\n".join(
+        json.dumps(
+            build_batch_request_line(
+                f"process-{i}", "gpt-4o", [{"role": "user", "content": str(i)}], {}
+            )
+        )
+        for i in range(3)
+    )
+
+    batch_id = await executor.submit(jsonl)
+
+    assert await executor.get_status(batch_id) == "completed"
+    results = await executor.get_results(batch_id)
+    assert [result.custom_id for result in results] == [
+        "process-0",
+        "process-1",
+        "process-2",
+    ]
+    assert results[2].response["choices"][0]["message"]["content"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_map_handler_batch_submit_and_fan_out(mocker):
+    app_context = MagicMock(spec=AppContext)
+    app_context.configuration = MagicMock()
+    app_context.configuration.app_map_batch_max_requests = 2
+    app_context.configuration.app_map_batch_max_wait_seconds = 300
+    app_context.configuration.app_map_response_cache_store = "none"
+
+    handler = MapHandler(appContext=app_context, step_name="map")
+    handler.application_context = app_context
+    handler.handler_name = "map"
+
+    async def responder(body):
+        return _completion(body["messages"][0]["content"])
+
+    store = InMemoryBatchStore()
+    handler._batch_store = store
+    handler._batch_executor = LocalBatchExecutor(responder=responder)
+    mocker.patch(
+        "libs.pipeline.handlers.map_handler.DataPipeline.get_object",
+        side_effect=lambda data_pipeline: data_pipeline,
+    )
+    complete_item = mocker.patch.object(MapHandler, "_complete_batch_item")
+
+    for i in range(2):
+        store.add_pending(
+            BatchPendingRequest(
+                custom_id=f"process-{i}",
+                request_line=build_batch_request_line(
+                    f"process-{i}", "gpt-4o", [{"role": "user", "content": str(i)}], {}
+                ),
+                data_pipeline=f"pipeline-{i}",
+            )
+        )
+
+    await handler._submit_pending_requests(store)
+
+    assert store.pending == {}
+    assert len(store.manifests) == 1
+
+    await handler._collect_batch_results(store)
+
+    assert store.manifests == {}
+    assert complete_item.call_count == 2
+    data_pipeline, _, item, completion = complete_item.call_args_list[1].args
+    assert data_pipeline == "pipeline-1"
+    assert item.custom_id == "process-1"
+    assert completion["choices"][0]["message"]["content"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_map_handler_batch_fails_items_without_response(mocker):
+    app_context = MagicMock(spec=AppContext)
+    app_context.configuration = MagicMock()
+
+    handler = MapHandler(appContext=app_context, step_name="map")
+    handler.application_context = app_context
+    handler.handler_name = "map"
+
+    store = InMemoryBatchStore()
+    store.save_manifest(
+        BatchManifest(
+            batch_id="batch-1",
+            items=[
+                BatchManifestItem(custom_id="process-0", data_pipeline="pipeline-0"),
+                BatchManifestItem(custom_id="process-1", data_pipeline="pipeline-1"),
+            ],
+        )
+    )
+    handler._batch_executor = MagicMock()
+    handler._batch_executor.get_status = AsyncMock(return_value="completed")
+    handler._batch_executor.get_results = AsyncMock(
+        return_value=[
+            BatchResult(custom_id="process-0", response=_completion("0")),
+            BatchResult(custom_id="process-1", error={"code": "content_filter"}),
+        ]
+    )
+    mocker.patch(
+        "libs.pipeline.handlers.map_handler.DataPipeline.get_object",
+        side_effect=lambda data_pipeline: data_pipeline,
+    )
+    complete_item = mocker.patch.object(MapHandler, "_complete_batch_item")
+    fail_item = mocker.patch.object(MapHandler, "_fail_batch_item")
+
+    await handler._collect_batch_results(store)
+
+    assert store.manifests == {}
+    assert complete_item.call_count == 1
+    data_pipeline, batch_id, error = fail_item.call_args.args
+    assert (data_pipeline, batch_id) == ("pipeline-1", "batch-1")
+    assert isinstance(error, BatchResultError)
+    assert "content_filter" in str(error)
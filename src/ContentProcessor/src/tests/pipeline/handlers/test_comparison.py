@@ -0,0 +1,46 @@
+from libs.pipeline.handlers.logics.evaluate_handler.comparison import (
+    get_extraction_comparison_data,
+)
+
+
+def test_get_extraction_comparison_data():
+    actual = {"name": "John", "skills": ["C#", "SQL"], "contact": {"email": None}}
+    confidence = {
+        "name": {
+            "confidence": 0.9,
+            "value": "John",
+            "line_references": [{"page": 0, "line": 1}],
+        },
+        "skills": [{"confidence": 0.8, "value": "C#"}, {"confidence": 0.5}],
+        "contact": {"email": {"confidence": 0.0, "value": None}},
+        "overall_confidence": 0.55,
+    }
+
+    comparison = get_extraction_comparison_data(actual, confidence, threads_hold=0.8)
+
+    assert [item.model_dump() for item in comparison.items] == [
+        {
+            "Field": "contact_email",
+            "Extracted": None,
+            "Confidence": "0.00%",
+            "IsAboveThreshold": False,
+        },
+        {
+            "Field": "name",
+            "Extracted": "John",
+            "Confidence": "90.00%",
+            "IsAboveThreshold": True,
+        },
+        {
+            "Field": "skills_0",
+            "Extracted": "C#",
+            "Confidence": "80.00%",
+            "IsAboveThreshold": False,
+        },
+        {
+            "Field": "skills_1",
+            "Extracted": "SQL",
+            "Confidence": "50.00%",
+            "IsAboveThreshold": False,
+        },
+    ]
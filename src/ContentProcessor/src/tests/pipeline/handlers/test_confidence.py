@@ -0,0 +1,96 @@
+from libs.pipeline.handlers.logics.evaluate_handler.confidence import (
+    find_keys_with_min_confidence,
+    get_confidence_values,
+    merge_confidence_values,
+)
+
+
+def _leaf(confidence, value="v", **extra):
+    return {"confidence": confidence, "value": value, **extra}
+
+
+def _evaluations():
+    confidence_a = {
+        "name": _leaf(
+            0.9,
+            "John",
+            match_mode="exact",
+            line_references=[{"page": 0, "line": 2}],
+        ),
+        "contact": {"email": _leaf(0.0, "a@b.c"), "phone": _leaf(0.5, "555")},
+        "skills": [_leaf(0.7, "C#"), _leaf(None, "SQL"), _leaf(0.5, "Go")],
+        "education": [{"school": _leaf(0.0), "degree": _leaf(0.8)}],
+        "_overall": 0.6,
+    }
+    confidence_b = {
+        "name": _leaf(0.95, "John"),
+        "contact": {"email": _leaf(0.0, "a@b.c"), "phone": _leaf(0.6, "555")},
+        "skills": [_leaf(0.3, "C#"), _leaf(0.9, "SQL"), _leaf(0.5, "Go")],
+        "education": [{"school": _leaf(0.0), "degree": _leaf(0.81234)}],
+        "_overall": 0.7,
+    }
+    return confidence_a, confidence_b
+
+
+def test_merge_confidence_values():
+    merged = merge_confidence_values(*_evaluations())
+
+    assert merged["name"] == {
+        "confidence": 0.9,
+        "value": "John",
+        "match_mode": "exact",
+        "line_references": [{"page": 0, "line": 2}],
+    }
+    assert merged["skills"][1] == {"confidence": 0.9, "value": "SQL"}
+    assert merged["education"][0]["degree"]["confidence"] == 0.8
+    assert "_overall" not in merged
+    assert merged["total_evaluated_fields_count"] == 6
+    assert merged["min_extracted_field_confidence"] == 0.3
+    assert merged["min_extracted_field_confidence_field"] == ["skills[0]"]
+    assert merged["zero_confidence_fields"] == [
+        "contact.email",
+        "education[0].school",
+    ]
+    assert merged["zero_confidence_fields_count"] == 2
+
+
+def test_merge_confidence_values_statistics_match_tree_traversal():
+    confidence_a, confidence_b = _evaluations()
+    confidence_b["skills"][0] = _leaf(0.5, "C#")
+
+    merged = merge_confidence_values(confidence_a, confidence_b)
+    tree = {
+        key: value
+        for key, value in merged.items()
+        if key in ("name", "contact", "skills", "education")
+    }
+    scores = get_confidence_values(tree)
+
+    assert merged["total_evaluated_fields_count"] == len(scores)
+    assert merged["overall_confidence"] == round(sum(scores) / len(scores), 3)
+    assert merged["min_extracted_field_confidence"] == min(scores)
+    assert merged["min_extracted_field_confidence_field"] == (
+        find_keys_with_min_confidence(tree, min(scores))
+    )
+    assert merged["min_extracted_field_confidence_field"] == [
+        "contact.phone",
+        "skills[0]",
+        "skills[2]",
+    ]
+    assert merged["zero_confidence_fields"] == find_keys_with_min_confidence(tree, 0)
+
+
+def test_merge_confidence_values_without_scores():
+    merged = merge_confidence_values(
+        {"name": _leaf(0.0), "_overall": 0.0}, {"name": _leaf(None), "_overall": 0.0}
+    )
+
+    assert merged == {
+        "name": {"confidence": 0.0, "value": "v"},
+        "overall": 0.0,
+        "total_evaluated_fields_count": 0,
+        "overall_confidence": 0.0,
+        "min_extracted_field_confidence": 0.0,
+        "zero_confidence_fields": [],
+        "zero_confidence_fields_count": 0,
+    }
@@ -0,0 +1,296 @@
+from libs.azure_helper.model.content_understanding import DocumentContent
+from libs.azure_helper.model.content_understanding_layout import ColumnarDocument
+from libs.pipeline.handlers.logics.evaluate_handler.content_understanding_confidence_evaluator import (
+    DIDocumentLine,
+    DocumentLineIndex,
+    FuzzyMatchPolicy,
+    evaluate_confidence,
+    extract_lines,
+    find_matching_lines,
+    normalize_polygon,
+)
+from libs.utils.utils import value_contains
+
+
+def _document(lines: list[tuple[str, list[float]]]) -> DocumentContent:
+    """Build a single page document; every line is split into words with the given confidences."""
+    page_lines = []
+    page_words = []
+    offset = 0
+    for index, (content, confidences) in enumerate(lines):
+        y = index + 1
+        page_lines.append(
+            {
+                "content": content,
+                "source": f"D(1,1,{y},5,{y},5,{y + 0.5},1,{y + 0.5})",
+                "span": {"offset": offset, "length": len(content)},
+            }
+        )
+        word_offset = offset
+        for word, confidence in zip(content.split(" "), confidences):
+            page_words.append(
+                {
+                    "content": word,
+                    "span": {"offset": word_offset, "length": len(word)},
+                    "confidence": confidence,
+                    "source": f"D(1,1,{y},2,{y},2,{y + 0.5},1,{y + 0.5})",
+                }
+            )
+            word_offset += len(word) + 1
+        offset += len(content) + 1
+
+    return DocumentContent(
+        markdown="\n".join(content for content, _ in lines),
+        kind="document",
+        startPageNumber=1,
+        endPageNumber=1,
+        unit="inch",
+        pages=[
+            {
+                "pageNumber": 1,
+                "angle": 0,
+                "width": 10,
+                "height": 10,
+                "spans": [{"offset": 0, "length": offset}],
+                "words": page_words,
+                "lines": page_lines,
+            }
+        ],
+    )
+
+
+def _linear_scan_lines(document: DocumentContent) -> list[DIDocumentLine]:
+    """Enrich every line by scanning all the words of its page."""
+    lines = []
+    for page_number, page in enumerate(document.pages):
+        for line_number, line in enumerate(page.lines):
+            span = line.span
+            di_line = DIDocumentLine(**line.model_dump())
+            di_line.contained_words = [
+                word
+                for word in page.words
+                if word.span.offset >= span.offset
+                and word.span.offset + word.span.length <= span.offset + span.length
+            ]
+            di_line.page_number = page_number
+            di_line.line_number = line_number
+            di_line.confidence = min(
+                word.confidence for word in di_line.contained_words
+            )
+            di_line.normalized_polygon = normalize_polygon(page, line.polygon)
+            lines.append(di_line)
+    return lines
+
+
+def test_extract_lines():
+    document = _document([("John Smith", [0.9, 0.8]), ("Seattle", [0.95])])
+
+    lines = extract_lines(document)
+
+    assert [line.content for line in lines] == ["John Smith", "Seattle"]
+    assert lines[0].confidence == 0.8
+    assert [word.content for word in lines[0].contained_words] == ["John", "Smith"]
+    assert lines[1].normalized_polygon[0] == {"x": 0.1, "y": 0.2}
+
+
+def test_line_index_find_matches_full_scan():
+    document = _document(
+        [
+            ("John Smith", [0.9, 0.8]),
+            ("john smith", [0.7, 0.7]),
+            ("Seattle, WA", [0.9, 0.9]),
+        ]
+    )
+    line_index = DocumentLineIndex(document)
+
+    assert [line.content for line in line_index.find("JOHN SMITH")] == [
+        "John Smith",
+        "john smith",
+    ]
+    assert [line.content for line in line_index.find("seattle", value_contains)] == [
+        "Seattle, WA"
+    ]
+    assert line_index.find("Portland") == []
+    assert [
+        line.content
+        for line in find_matching_lines("Seattle", document, value_contains)
+    ] == [line.content for line in line_index.find("Seattle", value_contains)]
+
+
+def test_evaluate_confidence_extracts_lines_once(mocker):
+    document = _document([("John Smith", [0.9, 0.8]), ("Seattle, WA", [0.9, 0.6])])
+    spy = mocker.spy(DocumentLineIndex, "__init__")
+
+    confidence = evaluate_confidence(
+        {"name": "John Smith", "address": {"city": "Seattle"}, "phone": "555"},
+        document,
+    )
+
+    assert spy.call_count == 1
+    assert confidence["name"]["confidence"] == 0.8
+    assert confidence["address"]["city"]["confidence"] == 0.6
+    assert confidence["phone"]["confidence"] == 0.0
+
+
+def test_line_index_contains_matches_value_contains():
+    document = _document(
+        [
+            ("John Smith", [0.9, 0.8]),
+            ("Senior Software Engineer", [0.9, 0.9, 0.9]),
+            ("2019-05 to Present", [0.9, 0.9, 0.9]),
+            ("Python, C#, SQL", [0.9, 0.9, 0.9]),
+            ("İstanbul Üniversitesi", [0.9, 0.9]),
+        ]
+    )
+    line_index = DocumentLineIndex(document)
+    values = [
+        "smith",
+        "John",
+        "software engineer",
+        "SoftwareEngineer",
+        "2019-05",
+        "05 to",
+        "c#",
+        "Py",
+        "n",
+        " ",
+        "istanbul",
+        "i̇stanbul",
+        "Seattle",
+        "engineers",
+    ]
+
+    for value in values:
+        expected = [
+            line.content
+            for line in line_index.lines
+            if value_contains(value, line.content)
+        ]
+        assert [
+            line.content for line in line_index.find(value, value_contains)
+        ] == expected, value
+
+
+def test_evaluate_confidence_records_match_mode():
+    document = _document(
+        [
+            ("John Smith", [0.9, 0.8]),
+            ("Senior Software Engineer, Contoso", [0.9, 0.9, 0.9, 0.9]),
+            ("May 1, 2021 - Present", [0.9, 0.7, 0.9, 0.9, 0.9]),
+            ("Phone: (555) 123-4567", [0.9, 0.9, 0.9]),
+        ]
+    )
+
+    confidence = evaluate_confidence(
+        {
+            "name": "john smith",
+            "title": "Software Engineer",
+            "start_date": "2021-05-01",
+            "phone": "555-123-4567",
+            "employer": "Contosso",
+            "missing": "Fabrikam",
+        },
+        document,
+        FuzzyMatchPolicy(thresholds={"text": 0.8, "date": 0.85}),
+    )
+
+    assert confidence["name"]["match_mode"] == "exact"
+    assert confidence["title"]["match_mode"] == "contains"
+    assert confidence["start_date"]["match_mode"] == "fuzzy"
+    assert confidence["start_date"]["confidence"] == 0.7
+    assert confidence["phone"]["match_mode"] == "fuzzy"
+    assert confidence["phone"]["confidence"] == 0.9
+    assert confidence["employer"]["match_mode"] == "fuzzy"
+    assert 0 < confidence["employer"]["confidence"] < 0.9
+    assert confidence["missing"]["match_mode"] == "none"
+    assert confidence["missing"]["confidence"] == 0.0
+
+    disabled = evaluate_confidence(
+        {"start_date": "2021-05-01"}, document, FuzzyMatchPolicy(enabled=False)
+    )
+    assert disabled["start_date"]["match_mode"] == "none"
+
+
+def test_evaluate_confidence_does_not_fuzzy_match_short_values():
+    document = _document(
+        [
+            ("Experienced software engineer", [0.9, 0.9, 0.9]),
+            ("Acme Corp 2019", [0.9] * 3),
+        ]
+    )
+
+    confidence = evaluate_confidence(
+        {"skill": "C#", "lang": "C++", "stats": "R"}, document
+    )
+
+    for field in ("skill", "lang", "stats"):
+        assert confidence[field]["confidence"] == 0.0
+        assert confidence[field]["match_mode"] == "none"
+        assert confidence[field]["line_references"] == []
+
+
+def test_evaluate_confidence_matches_short_values_as_words():
+    document = _document(
+        [
+            ("Experienced software engineer", [0.9, 0.9, 0.9]),
+            ("Skills: R, C#", [0.8] * 3),
+        ]
+    )
+
+    confidence = evaluate_confidence({"stats": "R", "skill": "C#"}, document)
+
+    assert confidence["stats"]["match_mode"] == "contains"
+    assert confidence["stats"]["line_references"] == [{"page": 0, "line": 1}]
+    assert confidence["skill"]["line_references"] == [{"page": 0, "line": 1}]
+
+
+def test_line_index_find_similar_requires_filterable_values():
+    line_index = DocumentLineIndex(
+        _document([("Experienced software engineer", [0.9, 0.9, 0.9])])
+    )
+
+    # Too short to be filtered by its q-grams at this threshold
+    assert line_index.find_similar_indexes("soft", 0.5) == []
+    assert line_index.find_similar_indexes("softwre", 0.85) == [(0, 0.857)]
+
+
+def test_evaluate_confidence_references_matching_lines():
+    document = _document(
+        [("John Smith", [0.9, 0.8]), ("Seattle, WA", [0.9, 0.6]), ("Seattle", [1.0])]
+    )
+
+    confidence = evaluate_confidence(
+        {"name": "John Smith", "city": "Seattle"}, document
+    )
+
+    assert confidence["name"]["line_references"] == [{"page": 0, "line": 0}]
+    assert "matching_lines" not in confidence["name"]
+
+    line_index = DocumentLineIndex(document)
+    resolved = [
+        line_index.get_line(line_index.references.index(reference))
+        for reference in confidence["city"]["line_references"]
+    ]
+    assert [line.content for line in resolved] == ["Seattle"]
+    assert resolved[0].line_number == 2
+
+
+def test_line_index_materializes_lines_like_linear_scan():
+    document = _document(
+        [("John Smith", [0.9, 0.8]), ("Seattle, WA", [0.9, 0.6]), ("Seattle", [1.0])]
+    )
+
+    line_index = DocumentLineIndex(ColumnarDocument.from_document_content(document))
+
+    assert [line.model_dump(warnings=False) for line in line_index.lines] == [
+        line.model_dump(warnings=False) for line in _linear_scan_lines(document)
+    ]
+    assert [line.model_dump(warnings=False) for line in extract_lines(document)] == [
+        line.model_dump(warnings=False) for line in line_index.lines
+    ]
+    assert line_index.confidences == [0.8, 0.6, 1.0]
+    assert line_index.find_indexes("seattle", value_contains) == [1, 2]
+    assert line_index.get_line(2) is line_index.find("Seattle")[0]
+
+    resolver_index = DocumentLineIndex(document, multiple_score_resolver=max)
+    assert resolver_index.confidences == [0.9, 0.9, 1.0]
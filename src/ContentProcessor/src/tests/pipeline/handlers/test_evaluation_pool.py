@@ -0,0 +1,123 @@
+import json
+
+import pytest
+from openai.types.chat.chat_completion import Choice
+
+from libs.pipeline.handlers.logics.evaluate_handler import evaluation_pool
+from libs.pipeline.handlers.logics.evaluate_handler.evaluation_pool import (
+    FuzzyMatchPolicy,
+    evaluate_confidences,
+    get_evaluation_executor,
+)
+
+
+def _analyzed_result_json(lines: list[tuple[str, float]]) -> str:
+    page_lines = []
+    page_words = []
+    offset = 0
+    for index, (content, confidence) in enumerate(lines):
+        source = f"D(1,1,{index + 1},5,{index + 1},5,{index + 1.5},1,{index + 1.5})"
+        span = {"offset": offset, "length": len(content)}
+        page_lines.append({"content": content, "source": source, "span": span})
+        page_words.append(
+            {
+                "content": content,
+                "source": source,
+                "span": span,
+                "confidence": confidence,
+            }
+        )
+        offset += len(content) + 1
+
+    return json.dumps(
+        {
+            "id": "analyze",
+            "status": "Succeeded",
+            "result": {
+                "analyzerId": "analyzer",
+                "apiVersion": "2024-12-01-preview",
+                "createdAt": "2025-01-01T00:00:00Z",
+                "warnings": [],
+                "contents": [
+                    {
+                        "markdown": "\n".join(content for content, _ in lines),
+                        "kind": "document",
+                        "startPageNumber": 1,
+                        "endPageNumber": 1,
+                        "unit": "inch",
+                        "pages": [
+                            {
+                                "pageNumber": 1,
+                                "angle": 0,
+                                "width": 10,
+                                "height": 10,
+                                "spans": [{"offset": 0, "length": offset}],
+                                "words": page_words,
+                                "lines": page_lines,
+                            }
+                        ],
+                    }
+                ],
+            },
+        }
+    )
+
+
+def _choice(content: str) -> Choice:
+    # One token per character, with the token bytes so no tokenizer is needed
+    return Choice(
+        index=0,
+        finish_reason="stop",
+        message={"role": "assistant", "content": content},
+        logprobs={
+            "content": [
+                {
+                    "token": character,
+                    "logprob": -0.01,
+                    "bytes": list(character.encode("utf-8")),
+                    "top_logprobs": [],
+                }
+                for character in content
+            ]
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_evaluate_confidences_pool_matches_sequential():
+    extract_result = {"name": "John Smith", "city": "Seattle"}
+    analyzed_result_json = _analyzed_result_json(
+        [("John Smith", 0.9), ("Seattle", 0.7)]
+    )
+    choice = _choice(json.dumps(extract_result))
+
+    sequential = await evaluate_confidences(
+        extract_result, analyzed_result_json, choice, FuzzyMatchPolicy()
+    )
+    executor = get_evaluation_executor(2)
+    try:
+        concurrent = await evaluate_confidences(
+            extract_result,
+            analyzed_result_json,
+            choice,
+            FuzzyMatchPolicy(),
+            executor=executor,
+        )
+    finally:
+        evaluation_pool._discard_executor(executor)
+
+    assert concurrent == sequential
+    assert sequential[0]["city"]["confidence"] == 0.7
+    assert 0.98 < sequential[1]["name"]["confidence"] < 1
+
+
+def test_get_evaluation_executor_reuses_pool():
+    assert get_evaluation_executor(0) is None
+
+    executor = get_evaluation_executor(1)
+    try:
+        assert get_evaluation_executor(1) is executor
+    finally:
+        evaluation_pool._discard_executor(executor)
+    assert get_evaluation_executor(1) is not executor
+    evaluation_pool._discard_executor(get_evaluation_executor(1))
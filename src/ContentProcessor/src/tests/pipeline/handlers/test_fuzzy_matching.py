@@ -0,0 +1,92 @@
+import itertools
+
+from libs.pipeline.handlers.logics.evaluate_handler.fuzzy_matching import (
+    FuzzyMatchPolicy,
+    bounded_substring_distance,
+    get_date_variants,
+    get_field_type,
+    get_fuzzy_pattern,
+    get_min_shared_qgrams,
+    get_qgrams,
+    normalize_fuzzy_text,
+)
+
+
+def _edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def test_get_field_type():
+    assert get_field_type("2021-05-01") == "date"
+    assert get_field_type("2021-05") == "date"
+    assert get_field_type(3) == "number"
+    assert get_field_type("1,200.50") == "number"
+    assert get_field_type(True) == "boolean"
+    assert get_field_type("Microsoft Azure") == "text"
+
+
+def test_normalize_fuzzy_text():
+    assert normalize_fuzzy_text("(555) 123-4567") == "5551234567"
+    assert normalize_fuzzy_text("Node.js, C#") == "nodejsc"
+
+
+def test_get_fuzzy_pattern():
+    assert get_fuzzy_pattern("555-123-4567") == "5551234567"
+    assert get_fuzzy_pattern("May 1, 2021") == "may12021"
+    # Too short once normalized
+    assert get_fuzzy_pattern("C#") is None
+    assert get_fuzzy_pattern("R") is None
+    assert get_fuzzy_pattern("Go 1") is None
+    # Most characters dropped by normalization
+    assert get_fuzzy_pattern("C++/C#/F#") is None
+
+
+def test_get_date_variants():
+    assert "May 1, 2021" in get_date_variants("2021-05-01")
+    assert "05/01/2021" in get_date_variants("2021-05-01")
+    assert "Sep 2019" in get_date_variants("2019-09")
+    assert get_date_variants("2019-13") == ["2019-13"]
+
+
+def test_bounded_substring_distance_matches_brute_force():
+    texts = ["seniorsoftwareengineer", "universityofwashington", "abc"]
+    patterns = ["softwareenginer", "universtyofwashington", "washingtn", "xyz", "abcd"]
+
+    for text, pattern in itertools.product(texts, patterns):
+        expected = min(
+            _edit_distance(pattern, text[start:end])
+            for start in range(len(text) + 1)
+            for end in range(start, len(text) + 1)
+        )
+        for max_distance in range(0, 4):
+            distance = bounded_substring_distance(pattern, text, max_distance)
+            assert distance == (expected if expected <= max_distance else None)
+
+
+def test_qgram_bound_keeps_matching_lines():
+    pattern = "softwareenginer"
+    text = "seniorsoftwareengineer"
+    max_distance = 2
+    shared = sum(1 for qgram in get_qgrams(pattern) if qgram in set(get_qgrams(text)))
+
+    assert shared >= get_min_shared_qgrams(len(pattern), max_distance)
+
+
+def test_fuzzy_match_policy_threshold():
+    policy = FuzzyMatchPolicy(thresholds={"text": 0.9})
+
+    assert policy.get_threshold("text") == 0.9
+    assert policy.get_threshold("date") is None
+    assert FuzzyMatchPolicy(enabled=False).get_threshold("text") is None
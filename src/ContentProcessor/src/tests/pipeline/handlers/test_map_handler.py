@@ -0,0 +1,224 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from libs.application.application_context import AppContext
+from libs.pipeline.entities.pipeline_file import ArtifactType
+from libs.pipeline.entities.schema import Schema
+from libs.pipeline.entities.schema_registry import SchemaRegistryEntry
+from libs.pipeline.entities.extracted_content import (
+    ExtractedContentDigest,
+)
+from libs.pipeline.handlers.map_handler import (
+    EXTRACTION_RULES,
+    SYSTEM_MESSAGE,
+    SYSTEM_PROMPT,
+    MapHandler,
+)
+
+
+@pytest.fixture
+def mock_app_context():
+    mock_app_context = MagicMock(spec=AppContext)
+    mock_app_context.configuration = MagicMock()
+    mock_app_context.kernel = MagicMock()
+    mock_app_context.configuration.app_azure_openai_model = "gpt-4o"
+    mock_app_context.configuration.app_map_response_cache_store = "none"
+    mock_app_context.configuration.app_map_response_cache_bypass = False
+    return mock_app_context
+
+
+def _schema_entry(version="v1"):
+    return SchemaRegistryEntry(
+        schema_info=Schema(
+            Id="schema-1",
+            ClassName="SampleSchema",
+            Description="Sample",
+            FileName="sample.py",
+            ContentType="application/pdf",
+        ),
+        schema_class=object,
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "SampleSchema", "schema": {}, "strict": True},
+        },
+        etag="etag-1",
+        version=version,
+        validated_at=0,
+    )
+
+
+def _completion():
+    return {
+        "id": "chatcmpl-1",
+        "created": 1,
+        "model": "gpt-4o",
+        "object": "chat.completion",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": '{"name": "A"}'},
+                "logprobs": {"content": []},
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def test_get_chat_function_is_cached_per_schema_version(mock_app_context):
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+
+    first = handler._get_chat_function(_schema_entry("v1"))
+    second = handler._get_chat_function(_schema_entry("v1"))
+    third = handler._get_chat_function(_schema_entry("v2"))
+
+    assert first is second
+    assert third is not first
+    assert third.version == "v2"
+    assert first.request_settings["logprobs"] is True
+    assert first.request_settings["response_format"]["type"] == "json_schema"
+
+
+@pytest.mark.asyncio
+async def test_invoke_chat_completion_direct(mock_app_context):
+    mock_app_context.configuration.app_map_invocation_mode = "direct"
+    client = mock_app_context.kernel.get_service.return_value.client
+    response = MagicMock()
+    response.to_dict.return_value = _completion()
+    client.chat.completions.create = AsyncMock(return_value=response)
+
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+    user_content = [{"type": "text", "text": "# Resume"}]
+
+    completion, cache_status = await handler.invoke_chat_completion(
+        user_content, MagicMock(), _schema_entry()
+    )
+
+    assert cache_status == "disabled"
+    assert completion.choices[0].message.content == '{"name": "A"}'
+    mock_app_context.kernel.invoke.assert_not_called()
+    request = client.chat.completions.create.call_args.kwargs
+    assert request["model"] == "gpt-4o"
+    assert request["messages"] == [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": user_content},
+    ]
+    assert request["logprobs"] is True
+
+
+def test_system_message_is_static_and_leaves_the_schema_to_response_format(
+    mock_app_context,
+):
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+    entry = _schema_entry()
+    entry.response_format["json_schema"]["schema"] = {
+        "type": "object",
+        "properties": {"candidate_email": {"type": "string"}},
+    }
+
+    chat_function = handler._get_chat_function(entry)
+
+    assert chat_function.system_message == f"{SYSTEM_PROMPT}\n\n{EXTRACTION_RULES}"
+    # The schema is sent once, in the response format
+    assert "candidate_email" not in chat_function.system_message
+    assert chat_function.request_settings["response_format"] == entry.response_format
+
+
+class WhitespaceEncoding:
+    """Stand-in for a tiktoken encoding - one token per word."""
+
+    def encode(self, text):
+        return text.split()
+
+
+def test_apply_token_budget_counts_the_system_message(mock_app_context, mocker):
+    mocker.patch(
+        "libs.pipeline.handlers.map_handler.get_encoding",
+        return_value=WhitespaceEncoding(),
+    )
+    mock_app_context.configuration.app_map_prompt_token_budget = 0
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+
+    prompt_budget = handler._apply_token_budget(
+        [{"type": "text", "text": "# Resume"}], "# Resume"
+    )
+
+    assert prompt_budget.after.text_tokens == len(SYSTEM_MESSAGE.split()) + 2
+
+
+def test_apply_token_budget_trims_with_the_system_message(mock_app_context, mocker):
+    mocker.patch(
+        "libs.pipeline.handlers.map_handler.get_encoding",
+        return_value=WhitespaceEncoding(),
+    )
+    system_tokens = len(SYSTEM_MESSAGE.split())
+    mock_app_context.configuration.app_map_prompt_token_budget = system_tokens + 20
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+    markdown = "\n\n".join(f"Paragraph {index} of the resume." for index in range(50))
+    user_content = [{"type": "text", "text": markdown}]
+
+    prompt_budget = handler._apply_token_budget(user_content, markdown)
+
+    assert prompt_budget.trimmed_blocks > 0
+    assert prompt_budget.after.total_tokens <= system_tokens + 20
+    assert not prompt_budget.over_budget
+
+
+def test_prepare_prompt_contains_only_document_content(mock_app_context):
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+
+    assert handler._prepare_prompt("# Resume") == [{"type": "text", "text": "# Resume"}]
+
+
+def _extract_file(artifact_type, content: str):
+    file = MagicMock()
+    file.processed_by = "extract"
+    file.artifact_type = artifact_type
+    file.download_stream.return_value = content.encode("utf-8")
+    return file
+
+
+def test_load_extracted_content_digest_uses_digest_file(mock_app_context, mocker):
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+    digest = ExtractedContentDigest(markdown="# Resume", low_confidence_threshold=0.8)
+    data_pipeline = MagicMock()
+    data_pipeline.files = [
+        _extract_file(ArtifactType.ExtractedContentDigest, digest.model_dump_json())
+    ]
+    download = mocker.patch.object(MapHandler, "download_output_file_to_json_string")
+
+    assert handler._load_extracted_content_digest(data_pipeline, 0.8) == digest
+    download.assert_not_called()
+
+
+def test_load_extracted_content_digest_falls_back_to_extract_output(
+    mock_app_context, mocker
+):
+    handler = MapHandler(appContext=mock_app_context, step_name="map")
+    handler.application_context = mock_app_context
+    data_pipeline = MagicMock()
+    data_pipeline.files = [
+        _extract_file(
+            ArtifactType.ExtractedContentDigest,
+            ExtractedContentDigest(
+                markdown="# Resume", low_confidence_threshold=0.9
+            ).model_dump_json(),
+        )
+    ]
+    mocker.patch.object(
+        MapHandler,
+        "download_output_file_to_json_string",
+        return_value='{"result": {"contents": [{"markdown": "# Resume", "pages": []}]}}',
+    )
+
+    digest = handler._load_extracted_content_digest(data_pipeline, 0.8)
+
+    assert digest.markdown == "# Resume"
+    assert digest.low_confidence_threshold == 0.8
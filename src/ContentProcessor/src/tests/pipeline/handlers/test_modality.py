@@ -0,0 +1,48 @@
+from libs.pipeline.entities.extracted_content import calculate_page_confidence_stats
+from libs.pipeline.handlers.logics.map_handler.modality import (
+    ModalityMode,
+    ModalityPolicy,
+    select_modality,
+)
+
+
+def _decide(pages, policy="adaptive", **thresholds):
+    policy = ModalityPolicy(policy=policy, **thresholds)
+    return select_modality(
+        [
+            calculate_page_confidence_stats(
+                page_number, confidences, policy.low_confidence_threshold
+            )
+            for page_number, confidences in enumerate(pages, start=1)
+        ],
+        policy,
+    )
+
+
+def test_select_modality_text_only_for_clean_document():
+    decision = _decide([[0.99] * 30, [0.98] * 30])
+
+    assert decision.mode == ModalityMode.TextOnly
+    assert decision.pages == []
+
+
+def test_select_modality_selected_pages():
+    decision = _decide([[0.99] * 30, [0.5] * 30, [0.99] * 30])
+
+    assert decision.mode == ModalityMode.SelectedPages
+    assert decision.pages == [2]
+
+
+def test_select_modality_all_pages_for_scanned_document():
+    decision = _decide([[0.6] * 30, [0.99] * 5])
+
+    assert decision.mode == ModalityMode.AllPages
+    assert decision.pages == [1, 2]
+
+
+def test_select_modality_policy_override():
+    pages = [[0.99] * 30]
+
+    assert ModalityPolicy().policy == "images"
+    assert _decide(pages, policy="images").mode == ModalityMode.AllPages
+    assert _decide([[0.1] * 5], policy="text").mode == ModalityMode.TextOnly
@@ -0,0 +1,123 @@
+import json
+import math
+
+from openai.types.chat.chat_completion import Choice
+
+from libs.pipeline.handlers.logics.evaluate_handler import (
+    openai_confidence_evaluator,
+)
+from libs.pipeline.handlers.logics.evaluate_handler.openai_confidence_evaluator import (
+    evaluate_confidence,
+    get_token_offsets,
+)
+
+
+class CharacterEncoding:
+    """Offline stand-in for a tiktoken encoding - one token per character."""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(character) for character in text]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+def _choice(tokens: list[tuple[str, float]], with_bytes: bool = True) -> Choice:
+    return Choice(
+        index=0,
+        finish_reason="stop",
+        message={"role": "assistant", "content": "".join(token for token, _ in tokens)},
+        logprobs={
+            "content": [
+                {
+                    "token": token,
+                    "logprob": logprob,
+                    "bytes": list(token.encode("utf-8")) if with_bytes else None,
+                    "top_logprobs": [],
+                }
+                for token, logprob in tokens
+            ]
+        },
+    )
+
+
+def _reference_confidence(tokens, start, end):
+    """Mean logprob of the tokens overlapping [start, end), computed one token at a time."""
+    position = 0
+    logprobs = []
+    for token, logprob in tokens:
+        if position < end and position + len(token) > start and logprob > -9999.0:
+            logprobs.append(logprob)
+        position += len(token)
+    return math.exp(sum(logprobs) / len(logprobs))
+
+
+def test_token_offsets_from_bytes():
+    choice = _choice([('{"', -0.1), ("café", -0.2), ("ét", -0.3), ('"}', -0.1)])
+
+    starts, ends = get_token_offsets(choice.logprobs.content, "gpt-4o")
+
+    assert starts.tolist() == [0, 2, 6, 8]
+    assert ends.tolist() == [2, 6, 8, 10]
+
+
+def test_token_offsets_split_character():
+    # A multi-byte character split over two tokens belongs to the token with its first byte
+    choice = _choice([("a", -0.1)])
+    choice.logprobs.content[0].bytes = [0x61, 0xC3]
+    choice.logprobs.content.append(
+        choice.logprobs.content[0].model_copy(update={"token": "", "bytes": [0xA9]})
+    )
+
+    starts, ends = get_token_offsets(choice.logprobs.content, "gpt-4o")
+
+    assert starts.tolist() == [0, 2]
+    assert ends.tolist() == [2, 2]
+
+
+def test_evaluate_confidence_matches_token_by_token_mean(monkeypatch):
+    monkeypatch.setattr(
+        openai_confidence_evaluator, "get_encoding", lambda model: CharacterEncoding()
+    )
+    tokens = [
+        ('{"', -0.01),
+        ("name", -0.02),
+        ('":"', -0.01),
+        ("Jo", -0.5),
+        ("hn", -0.1),
+        (" Sm", -0.3),
+        ("ith", -0.2),
+        ('","', -0.01),
+        ("skills", -0.02),
+        ('":["', -0.01),
+        ("C", -0.05),
+        ("#", -10000.0),
+        ('","', -0.01),
+        ("Py", -0.4),
+        ("thon", -0.6),
+        ('"]}', -0.01),
+    ]
+    text = "".join(token for token, _ in tokens)
+    extract_result = json.loads(text)
+
+    for with_bytes in (True, False):
+        confidence = evaluate_confidence(extract_result, _choice(tokens, with_bytes))
+
+        name_start = text.index("John Smith")
+        assert math.isclose(
+            confidence["name"]["confidence"],
+            _reference_confidence(tokens, name_start, name_start + len("John Smith")),
+        )
+        python_start = text.index("Python")
+        assert math.isclose(
+            confidence["skills"][1]["confidence"],
+            _reference_confidence(tokens, python_start, python_start + len("Python")),
+        )
+        assert math.isclose(confidence["skills"][0]["confidence"], math.exp(-0.05))
+
+
+def test_evaluate_confidence_without_logprobs():
+    choice = _choice([('{"a":"b"}', -0.1)])
+    choice.logprobs = None
+
+    assert evaluate_confidence({"a": "b"}, choice) == {"_overall": 0.0}
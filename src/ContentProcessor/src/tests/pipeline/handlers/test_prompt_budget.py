@@ -0,0 +1,83 @@
+import base64
+import io
+
+from PIL import Image
+
+from libs.pipeline.handlers.logics.map_handler.prompt_budget import (
+    compact_markdown,
+    count_prompt_tokens,
+    estimate_image_tokens,
+    trim_markdown_to_budget,
+)
+
+
+class WhitespaceEncoding:
+    """Stand-in for a tiktoken encoding - one token per word."""
+
+    def encode(self, text):
+        return text.split()
+
+
+def _png_data_url(width, height):
+    stream = io.BytesIO()
+    Image.new("RGB", (width, height)).save(stream, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(stream.getvalue()).decode()}"
+
+
+def test_compact_markdown():
+    markdown = (
+        '<!-- PageHeader="John Doe - Resume" -->\n\n'
+        "# John   Doe   \n\n\n\n"
+        "<figure>\n\n![logo](figures/0)\n\n</figure>\n\n"
+        "<table>\n<tr><th>Skill</th><th>Years</th></tr>\n"
+        "<tr><td>Python</td><td>5</td></tr>\n<tr><td></td><td></td></tr>\n</table>\n\n"
+        '<!-- PageNumber="1" -->\n<!-- PageBreak -->\n'
+        '<!-- PageHeader="John Doe - Resume" -->\n\n'
+        "Experience :selected:"
+    )
+
+    assert compact_markdown(markdown) == (
+        "John Doe - Resume\n\n"
+        "# John Doe\n\n"
+        "logo\n\n"
+        "| Skill | Years |\n| Python | 5 |\n\n"
+        "Experience :selected:"
+    )
+
+
+def test_estimate_image_tokens():
+    # 1700 x 2200 page: scaled to 768 x 994 -> 2 x 2 tiles
+    assert estimate_image_tokens(1700, 2200) == 85 + 170 * 4
+    # small image is not upscaled
+    assert estimate_image_tokens(512, 512) == 85 + 170
+
+
+def test_count_prompt_tokens():
+    counts = count_prompt_tokens(
+        [
+            {"type": "text", "text": "extract the data"},
+            {"type": "image_url", "image_url": {"url": _png_data_url(512, 512)}},
+        ],
+        WhitespaceEncoding(),
+    )
+
+    assert counts.text_tokens == 3
+    assert counts.image_tokens == 255
+    assert counts.total_tokens == 258
+
+
+def test_trim_markdown_to_budget():
+    markdown = "# Name\n\nSkills a b\n\n---\n\nSkills a b\n\nHobbies x y z"
+    encoding = WhitespaceEncoding()
+
+    assert trim_markdown_to_budget(markdown, 100, encoding) == (markdown, 0)
+
+    # The repeated block and the separator go first, then blocks from the end
+    assert trim_markdown_to_budget(markdown, 9, encoding) == (
+        "# Name\n\nSkills a b\n\nHobbies x y z",
+        2,
+    )
+    assert trim_markdown_to_budget(markdown, 6, encoding) == (
+        "# Name\n\nSkills a b",
+        3,
+    )
@@ -0,0 +1,85 @@
+import os
+import time
+from unittest.mock import MagicMock
+
+from libs.application.application_configuration import AppConfiguration
+from libs.pipeline.handlers.logics.map_handler.response_cache import (
+    LocalResponseCache,
+    build_response_cache_key,
+    create_response_cache,
+)
+
+
+def _user_content(markdown="# Resume", image_url="data:image/png;base64,AAAA"):
+    return [
+        {"type": "text", "text": markdown},
+        {"type": "image_url", "image_url": {"url": image_url}},
+    ]
+
+
+def _key(**overrides):
+    arguments = {
+        "prompt": "system : extract",
+        "user_content": _user_content(),
+        "schema_version": "2025-01-01T00:00:00|etag-1",
+        "deployment_name": "gpt-4o",
+        "execution_settings": {"temperature": 0.1, "logprobs": True},
+    }
+    arguments.update(overrides)
+    return build_response_cache_key(**arguments)
+
+
+def test_build_response_cache_key_is_deterministic():
+    assert _key() == _key()
+    assert _key(execution_settings={"logprobs": True, "temperature": 0.1}) == _key()
+
+
+def test_build_response_cache_key_changes_with_inputs():
+    key = _key()
+    assert _key(user_content=_user_content(markdown="# Other")) != key
+    assert (
+        _key(user_content=_user_content(image_url="data:image/png;base64,BBBB")) != key
+    )
+    assert _key(schema_version="2025-02-01T00:00:00|etag-2") != key
+    assert _key(deployment_name="gpt-4o-mini") != key
+    assert _key(execution_settings={"temperature": 0.2, "logprobs": True}) != key
+
+
+def test_local_response_cache_round_trip(tmp_path):
+    cache = LocalResponseCache(directory=str(tmp_path), max_size_bytes=1024 * 1024)
+    response = {"choices": [{"logprobs": {"content": [{"token": "a"}]}}]}
+
+    assert cache.get("key") is None
+    cache.set("key", response)
+    assert cache.get("key") == response
+
+
+def test_local_response_cache_evicts_least_recently_used(tmp_path):
+    cache = LocalResponseCache(directory=str(tmp_path), max_size_bytes=250)
+    response = {"content": "x" * 100}
+
+    cache.set("first", response)
+    cache.set("second", response)
+    # Make "first" the least recently used entry
+    past = time.time() - 60
+    os.utime(tmp_path / "first.json", (past, past))
+    cache.get("second")
+
+    cache.set("third", response)
+
+    assert cache.get("first") is None
+    assert cache.get("second") == response
+    assert cache.get("third") == response
+
+
+def test_response_cache_is_disabled_by_default(tmp_path):
+    configuration = MagicMock()
+    configuration.app_map_response_cache_store = AppConfiguration.model_fields[
+        "app_map_response_cache_store"
+    ].default
+    assert create_response_cache(configuration) is None
+
+    configuration.app_map_response_cache_store = "local"
+    configuration.app_map_response_cache_dir = str(tmp_path)
+    configuration.app_map_response_cache_max_mb = 1
+    assert isinstance(create_response_cache(configuration), LocalResponseCache)
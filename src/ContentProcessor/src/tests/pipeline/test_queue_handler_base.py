@@ -1,9 +1,11 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from azure.storage.queue import QueueClient
 from libs.pipeline.entities.pipeline_message_context import MessageContext
 from libs.pipeline.entities.pipeline_step_result import StepResult
 from libs.pipeline.queue_handler_base import HandlerBase
+from libs.pipeline.status_write_buffer import StatusWriteBuffer
 from libs.application.application_context import AppContext
 
 
@@ -75,3 +77,24 @@ def test_show_queue_information(mock_queue_helper, mock_app_context):
     handler.queue_client = mock_queue_client
 
     handler._show_queue_information()
+
+
+@pytest.mark.asyncio
+async def test_pending_status_updates_are_written_on_stop(
+    mock_queue_helper, mock_app_context, mocker
+):
+    handler = MockHandler(appContext=mock_app_context, step_name="extract")
+    mocker.patch.object(MockHandler, "_show_queue_information")
+    mocker.patch.object(
+        MockHandler, "_poll_queue", side_effect=asyncio.CancelledError()
+    )
+    status_buffer = MagicMock(spec=StatusWriteBuffer)
+    status_buffer.flush = AsyncMock(return_value=True)
+    handler._status_buffer = status_buffer
+
+    with pytest.raises(asyncio.CancelledError):
+        await handler._connect_async(
+            show_information=False, app_context=mock_app_context, step_name="extract"
+        )
+
+    status_buffer.flush.assert_awaited_once()
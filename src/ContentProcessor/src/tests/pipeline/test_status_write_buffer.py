@@ -0,0 +1,121 @@
+import datetime
+
+import mongomock
+import pytest
+
+from libs.azure_helper.comsos_mongo import CosmosMongDBHelper, clear_mongo_clients
+from libs.models.content_process import ContentProcess
+from libs.pipeline.status_write_buffer import StatusWriteBuffer
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(
+        "libs.azure_helper.comsos_mongo.MongoClient", lambda *args, **kwargs: client
+    )
+
+    # mongomock does not accept the operations of recent pymongo versions - apply them one by one
+    def bulk_write(self, operations, ordered=False):
+        for operation in operations:
+            self.container.update_one(
+                operation._filter, operation._doc, upsert=operation._upsert
+            )
+
+    monkeypatch.setattr(CosmosMongDBHelper, "bulk_write", bulk_write)
+    clear_mongo_clients()
+    yield client
+    clear_mongo_clients()
+
+
+def _status(process_id: str, status: str, minute: int) -> ContentProcess:
+    return ContentProcess(
+        process_id=process_id,
+        status=status,
+        processed_file_name="resume.pdf",
+        last_modified_time=datetime.datetime(2025, 1, 1, 0, minute),
+        last_modified_by=status,
+    )
+
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_updates_per_process(mongo_client, mocker):
+    collection = mongo_client["db"]["processes"]
+    buffer = StatusWriteBuffer("connection_string", "db", "processes")
+    bulk_write = mocker.spy(CosmosMongDBHelper, "bulk_write")
+
+    buffer.add(_status("1", "extract", 1))
+    buffer.add(_status("2", "extract", 1))
+    buffer.add(_status("1", "map", 2))
+    assert buffer.pending_count == 2
+
+    assert await buffer.flush()
+
+    assert bulk_write.call_count == 1
+    assert buffer.pending_count == 0
+    documents = {document["process_id"]: document for document in collection.find({})}
+    assert documents["1"]["status"] == "map"
+    assert documents["2"]["status"] == "extract"
+    # The status document is written when it does not exist yet
+    assert documents["1"]["schema_score"] == 0.0
+    assert "result" not in documents["1"]
+
+
+@pytest.mark.asyncio
+async def test_flush_does_not_overwrite_newer_status(mongo_client):
+    collection = mongo_client["db"]["processes"]
+    collection.insert_one(
+        {
+            "process_id": "1",
+            "status": "Completed",
+            "last_modified_time": datetime.datetime(2025, 1, 1, 0, 5),
+            "schema_score": 0.9,
+        }
+    )
+    collection.insert_one({"process_id": "2", "status": "Processing"})
+    buffer = StatusWriteBuffer("connection_string", "db", "processes")
+
+    buffer.add(_status("1", "map", 2))
+    buffer.add(_status("2", "extract", 1))
+    assert await buffer.flush()
+
+    first = collection.find_one({"process_id": "1"})
+    assert first["status"] == "Completed"
+    assert first["schema_score"] == 0.9
+    assert collection.find_one({"process_id": "2"})["status"] == "extract"
+    assert collection.count_documents({}) == 2
+
+
+@pytest.mark.asyncio
+async def test_flush_if_due(mongo_client, mocker):
+    buffer = StatusWriteBuffer(
+        "connection_string", "db", "processes", max_size=2, flush_interval_seconds=60
+    )
+    write = mocker.patch.object(StatusWriteBuffer, "_write")
+
+    buffer.add(_status("1", "extract", 1))
+    await buffer.flush_if_due()
+    write.assert_not_called()
+
+    buffer.add(_status("2", "extract", 1))
+    await buffer.flush_if_due()
+    write.assert_called_once()
+
+    buffer.flush_interval_seconds = 0
+    buffer.add(_status("3", "extract", 1))
+    await buffer.flush_if_due()
+    assert write.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_updates(mongo_client, mocker):
+    buffer = StatusWriteBuffer("connection_string", "db", "processes")
+    mocker.patch.object(StatusWriteBuffer, "_write", side_effect=Exception("down"))
+
+    buffer.add(_status("1", "extract", 1))
+    assert not await buffer.flush()
+    assert buffer.pending_count == 1
+
+    mocker.patch.object(StatusWriteBuffer, "_write")
+    assert await buffer.flush()
+    assert buffer.pending_count == 0
@@ -1,6 +1,12 @@
 import pytest
 from unittest.mock import Mock
-from libs.utils.utils import CustomEncoder, flatten_dict, value_match, value_contains
+from libs.utils.utils import (
+    CustomEncoder,
+    flatten_dict,
+    iter_flattened_items,
+    value_contains,
+    value_match,
+)
 
 
 def test_custom_encoder_to_dict(mocker):
@@ -28,6 +34,35 @@ def test_flatten_dict():
     assert result == expected
 
 
+def test_flatten_dict_nested_lists_and_separator():
+    data = {"a": [[1, [2, {"b": 3}]], {}], "c": {"d": [4]}, "e": []}
+
+    assert flatten_dict(data) == {"a_0_0": 1, "a_0_1_0": 2, "a_0_1_1_b": 3, "c_d_0": 4}
+    # List indexes are always joined with "_"
+    assert flatten_dict(data, parent_key="p", sep=".") == {
+        "p.a_0_0": 1,
+        "p.a_0_1_0": 2,
+        "p.a_0_1_1.b": 3,
+        "p.c.d_0": 4,
+    }
+
+
+def test_iter_flattened_items_is_lazy_and_deep():
+    data = {"a": 1, "b": {"c": 2}}
+    items = iter_flattened_items(data)
+
+    assert next(items) == ("a", 1)
+    assert list(items) == [("b_c", 2)]
+
+    # Deeper than the recursion limit
+    deep = leaf = {}
+    for _ in range(5000):
+        leaf["x"] = {}
+        leaf = leaf["x"]
+    leaf["y"] = 1
+    assert list(iter_flattened_items(deep)) == [("x_" * 5000 + "y", 1)]
+
+
 def test_value_match_strings():
     assert value_match("Hello", "hello") is True
     assert value_match("Hello", "world") is False
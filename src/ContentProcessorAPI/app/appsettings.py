@@ -25,10 +25,12 @@ class AppConfiguration(ModelBaseSettings):
     app_cosmos_database: str
     app_cosmos_container_schema: str
     app_cosmos_container_process: str
+    app_cosmos_container_process_status: str = "ProcessStatus"
     app_cps_configuration: str
     app_cps_processes: str
     app_message_queue_extract: str
     app_cps_max_filesize_mb: int
+    app_process_count_refresh_seconds: int = 60
     app_logging_enable: bool
     app_logging_level: str
 
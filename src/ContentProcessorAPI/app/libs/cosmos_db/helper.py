@@ -1,12 +1,65 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import os
+import threading
 from typing import Any, Dict, List, Optional
 
 import certifi
 from pymongo import MongoClient
 from pymongo.database import Collection, Database
 
+# Clients per connection string, shared by every helper of the process
+_clients: Dict[str, MongoClient] = dict()
+# Collections already created and indexed, per connection string, database, collection and indexes
+_containers: Dict[tuple, Collection] = dict()
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def _reset_after_fork():
+    # A client must not be used across fork, so a forked worker starts with its own registry
+    global _registry_pid
+    if _registry_pid != os.getpid():
+        _clients.clear()
+        _containers.clear()
+        _registry_pid = os.getpid()
+
+
+def get_mongo_client(connection_string: str) -> MongoClient:
+    """
+    Get the process-wide MongoClient of a connection string, connecting on first use.
+
+    A MongoClient holds its own connection pool, so sharing it saves the TLS handshake
+    and the topology discovery every time a helper is created.
+
+    Args:
+        connection_string (str): Connection String for MongoDB
+
+    Returns:
+        MongoClient: The shared client.
+    """
+    with _registry_lock:
+        _reset_after_fork()
+        client = _clients.get(connection_string)
+        if client is None:
+            # MongoClient need to get Certificate but in Container,
+            # it doesn't have native certificate so we need to add it othwerwise the connection will be fail
+            client = MongoClient(connection_string, tlsCAFile=certifi.where())
+            _clients[connection_string] = client
+        return client
+
+
+def clear_mongo_clients():
+    """
+    Close the shared clients and forget the prepared collections.
+    """
+    with _registry_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _containers.clear()
+
 
 class CosmosMongDBHelper:
     def __init__(
@@ -39,20 +92,33 @@ class CosmosMongDBHelper:
             connection_string (str): Connection String for MongoDB
             db_name (str): Database Name
             container_name (str): Collection Name to be created or used
-            indexes (list, optional): Adding Fields to be get indexed for searching and ordering. Defaults to None.
+            indexes (list, optional): Adding Fields to be get indexed for searching and ordering,
+                as (field, order) or a list of them for a compound index. Defaults to None.
 
         Returns:
             tuple: MongoClient, Database, Collection
         """
-        # MongoClient need to get Certificate but in Container,
-        # it doesn't have native certificate so we need to add it othwerwise the connection will be fail
-        mongoClient = MongoClient(connection_string, tlsCAFile=certifi.where())
+        mongoClient = get_mongo_client(connection_string)
         database = mongoClient[db_name]
-        container = self._create_container(database, container_name)
-        # Add Indexes
-        if indexes:
-            self._create_indexes(container, indexes)
-        # self._create_indexes(container, ["ClassName", "Id"])
+
+        # The collection and its indexes are only checked the first time they are used
+        key = (
+            connection_string,
+            db_name,
+            container_name,
+            tuple(
+                tuple(map(tuple, index)) if isinstance(index, list) else tuple(index)
+                for index in indexes or ()
+            ),
+        )
+        container = _containers.get(key)
+        if container is None:
+            container = self._create_container(database, container_name)
+            # Add Indexes
+            if indexes:
+                self._create_indexes(container, indexes)
+            with _registry_lock:
+                _containers[key] = container
 
         return mongoClient, database, container
 
@@ -63,9 +129,12 @@ class CosmosMongDBHelper:
 
     def _create_indexes(self, container, fields):
         existing_indexes = container.index_information()
-        for field, order in fields:
-            if f"{field}_{order}" not in existing_indexes:
-                container.create_index([(field, order)])
+        for index in fields:
+            # A list of (field, order) is a compound index, e.g. for a sort on several fields
+            keys = index if isinstance(index, list) else [index]
+            name = "_".join(f"{field}_{order}" for field, order in keys)
+            if name not in existing_indexes:
+                container.create_index(keys)
 
     def insert_document(self, document: Dict[str, Any]):
         result = self.container.insert_one(document)
@@ -94,6 +163,9 @@ class CosmosMongDBHelper:
             query = {}
         return self.container.count_documents(query)
 
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return list(self.container.aggregate(pipeline))
+
     def update_document(self, item_id: str, update: Dict[str, Any]):
         result = self.container.update_one({"Id": item_id}, {"$set": update})
         return result
@@ -102,6 +174,41 @@ class CosmosMongDBHelper:
         result = self.container.update_one(query, {"$set": update})
         return result
 
+    def upsert_document(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        insert_only: Dict[str, Any] = None,
+    ):
+        """
+        Update the matching document, or insert it, in a single round-trip.
+
+        Args:
+            query (dict): Query matching the document.
+            update (dict): Fields set on the existing or the new document ($set).
+            insert_only (dict, optional): Fields only set when the document is inserted ($setOnInsert).
+                Fields also in update are skipped.
+
+        Returns:
+            UpdateResult: The result of the update.
+        """
+        operations = {"$set": update}
+        if insert_only:
+            insert_only = {
+                key: value for key, value in insert_only.items() if key not in update
+            }
+            if insert_only:
+                operations["$setOnInsert"] = insert_only
+        return self.container.update_one(query, operations, upsert=True)
+
+    def replace_document(self, query: Dict[str, Any], document: Dict[str, Any]):
+        result = self.container.replace_one(query, document)
+        return result
+
+    def bulk_write(self, operations: List[Any], ordered: bool = False):
+        result = self.container.bulk_write(operations, ordered=ordered)
+        return result
+
     def delete_document(self, item_id: str, field_name: str = None):
         field_name = field_name or "Id"  # Use "Id" if field_name is empty or None
         result = self.container.delete_one({field_name: item_id})
@@ -2,14 +2,44 @@
 # Licensed under the MIT License.
 
 import datetime
+import logging
+import threading
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Response
 
+from app.appsettings import get_app_config
 from app.routers import contentprocessor, schemavault
+from app.routers.models.contentprocessor.content_process import (
+    backfill_status_collection,
+)
 
 start_time = datetime.datetime.now()
+
+
+def _backfill_status_collection():
+    app_config = get_app_config()
+    try:
+        backfill_status_collection(
+            connection_string=app_config.app_cosmos_connstr,
+            database_name=app_config.app_cosmos_database,
+            status_collection_name=app_config.app_cosmos_container_process_status,
+            process_collection_name=app_config.app_cosmos_container_process,
+        )
+    except Exception:
+        logging.exception("Backfilling the process status collection failed.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Copy the status of the processes written before the status collection existed,
+    # off the request path - the processed list reads the processes until it is done
+    threading.Thread(target=_backfill_status_collection, daemon=True).start()
+    yield
+
+
 # app = FastAPI(dependencies=[Depends(get_token_header), Depends(get_query_token)])
-app = FastAPI(redirect_slashes=False)
+app = FastAPI(redirect_slashes=False, lifespan=lifespan)
 
 # Add the routers to the app
 app.include_router(contentprocessor.router)
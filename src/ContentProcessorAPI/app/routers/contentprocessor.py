@@ -19,7 +19,10 @@ from app.routers.models.contentprocessor.content_process import (
     ContentProcess as CosmosContentProcess,
 )
 from app.routers.models.contentprocessor.content_process import (
+    LineReferenceRequest,
     PaginatedResponse,
+    PromptCacheReport,
+    ResolvedLine,
 )
 from app.routers.models.contentprocessor.mime_types import MimeTypes, MimeTypesDetection
 from app.routers.models.contentprocessor.model import (
@@ -55,16 +58,22 @@ router = APIRouter(
     class Paging(BaseModel):
         page_number: int = Field(default=0, gt=0)
         page_size: int = Field(default=0, gt=0)
+        continuation_token: Optional[str] = None
 
     The request body should contain the following fields:
     * **page_number** : The page number to retrieve (1-based index).
     * **page_size** : The number of items per page.
     * **page_number** and **page_size** are both required and must be greater than 0.
+    * **continuation_token** : The continuation_token of the previous page, to read the next page
+      without skipping the previous ones. It is null in the response of the last page.
+
+    The total_count is refreshed periodically, so it can lag behind the latest submissions.
 
     ## Example Request Body
     {
-        "page_number": 1,
-        "page_size": 10
+        "page_number": 2,
+        "page_size": 10,
+        "continuation_token": "token of page 1"
     }
     """,
 )
@@ -73,16 +82,51 @@ async def get_all_processed_results(
     app_config: AppConfiguration = Depends(get_app_config),
 ) -> PaginatedResponse:
     # Get all the processed content
-    paged_cosmos_content_process = CosmosContentProcess.get_all_processes_from_cosmos(
+    try:
+        paged_cosmos_content_process = (
+            CosmosContentProcess.get_all_processes_from_cosmos(
+                connection_string=app_config.app_cosmos_connstr,
+                database_name=app_config.app_cosmos_database,
+                collection_name=app_config.app_cosmos_container_process_status,
+                process_collection_name=app_config.app_cosmos_container_process,
+                page_number=page_request.page_number if page_request else 0,
+                page_size=page_request.page_size if page_request else 0,
+                continuation_token=(
+                    page_request.continuation_token if page_request else None
+                ),
+                count_refresh_seconds=app_config.app_process_count_refresh_seconds,
+            )
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "failed", "message": str(e)},
+        )
+
+    return paged_cosmos_content_process
+
+
+@router.get(
+    "/reports/prompt-cache",
+    response_model=PromptCacheReport,
+    summary="Get the prompt cache hit ratio per schema",
+    description="""
+    Returns the prompt tokens, the prompt tokens served from the Azure OpenAI prompt cache
+    and the cache hit ratio (cached tokens / prompt tokens) of the processed contents, per schema.
+
+    The Map step sends the static part of the prompt (system text, extraction rules and schema) first,
+    so requests mapped with the same schema share a cacheable prefix.
+    """,
+)
+async def get_prompt_cache_report(
+    app_config: AppConfiguration = Depends(get_app_config),
+) -> PromptCacheReport:
+    return CosmosContentProcess.get_prompt_cache_report_from_cosmos(
         connection_string=app_config.app_cosmos_connstr,
         database_name=app_config.app_cosmos_database,
         collection_name=app_config.app_cosmos_container_process,
-        page_number=page_request.page_number if page_request else 0,
-        page_size=page_request.page_size if page_request else 0,
     )
 
-    return paged_cosmos_content_process
-
 
 @router.post(
     "/submit",
@@ -200,7 +244,7 @@ async def Submit_File_With_MetaData(
     ).update_process_status_to_cosmos(
         connection_string=content_processor.config.app_cosmos_connstr,
         database_name=content_processor.config.app_cosmos_database,
-        collection_name=content_processor.config.app_cosmos_container_process,
+        collection_name=content_processor.config.app_cosmos_container_process_status,
     )
     return JSONResponse(
         status_code=202,
@@ -238,9 +282,12 @@ async def get_status(
     process_id: str, app_config: AppConfiguration = Depends(get_app_config)
 ):
     # Get Content Process Status
-    process_status = CosmosContentProcess(process_id=process_id).get_status_from_cosmos(
+    process_status = CosmosContentProcess(
+        process_id=process_id
+    ).get_process_status_from_cosmos(
         connection_string=app_config.app_cosmos_connstr,
         database_name=app_config.app_cosmos_database,
+        status_collection_name=app_config.app_cosmos_container_process_status,
         collection_name=app_config.app_cosmos_container_process,
     )
 
@@ -298,8 +345,20 @@ async def get_process(
         connection_string=app_config.app_cosmos_connstr,
         database_name=app_config.app_cosmos_database,
         collection_name=app_config.app_cosmos_container_process,
+        archive_account_url=app_config.app_storage_blob_url,
     )
 
+    # The results are saved when the process completes - until then, return its status
+    if not process_status:
+        process_status = CosmosContentProcess(
+            process_id=process_id
+        ).get_process_status_from_cosmos(
+            connection_string=app_config.app_cosmos_connstr,
+            database_name=app_config.app_cosmos_database,
+            status_collection_name=app_config.app_cosmos_container_process_status,
+            collection_name=app_config.app_cosmos_container_process,
+        )
+
     if not process_status:
         return JSONResponse(
             status_code=404,
@@ -352,6 +411,49 @@ async def get_process_steps(
     return process_steps
 
 
+@router.post(
+    "/processed/{process_id}/lines",
+    response_model=list[ResolvedLine],
+    summary="Resolve the document lines referenced by the confidence evaluation",
+    description="""
+    The confidence of every extracted field references its matching document lines by
+    page index and line index within the page (`line_references`) instead of embedding them.
+    This endpoint resolves the references against the Extract step output
+    and returns the content, confidence and normalized polygon of each line.
+
+    ## Example Request Body
+    {
+        "references": [
+            {"page": 0, "line": 3},
+            {"page": 1, "line": 0}
+        ]
+    }
+    """,
+)
+async def get_process_lines(
+    process_id: str,
+    line_request: LineReferenceRequest,
+    app_config: AppConfiguration = Depends(get_app_config),
+):
+    resolved_lines = CosmosContentProcess(process_id=process_id).get_lines_from_blob(
+        connection_string=app_config.app_storage_blob_url,
+        container_name=f"{app_config.app_cps_processes}/{process_id}",
+        blob_name="content_understanding_output.json",
+        references=line_request.references,
+    )
+
+    if resolved_lines is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "status": "failed",
+                "message": f"Extracted content of Process ID '{process_id}' not found.",
+            },
+        )
+
+    return resolved_lines
+
+
 @router.put(
     "/processed/{process_id}",
     summary="Update the processed content result / Update the comment in this process",
@@ -405,6 +507,8 @@ async def update_process_result(
             database_name=app_config.app_cosmos_database,
             collection_name=app_config.app_cosmos_container_process,
             process_result=content_update_request.modified_result,
+            status_collection_name=app_config.app_cosmos_container_process_status,
+            archive_account_url=app_config.app_storage_blob_url,
         )
 
     if isinstance(content_update_request, ContentCommentUpdate):
@@ -416,6 +520,8 @@ async def update_process_result(
             database_name=app_config.app_cosmos_database,
             collection_name=app_config.app_cosmos_container_process,
             comment=content_update_request.comment,
+            status_collection_name=app_config.app_cosmos_container_process_status,
+            archive_account_url=app_config.app_storage_blob_url,
         )
 
     if not update_response:
@@ -452,9 +558,12 @@ async def get_original_file(
     process_id: str, app_config: AppConfiguration = Depends(get_app_config)
 ):
     # Check processed content in Cosmos
-    process_status = CosmosContentProcess(process_id=process_id).get_status_from_cosmos(
+    process_status = CosmosContentProcess(
+        process_id=process_id
+    ).get_process_status_from_cosmos(
         connection_string=app_config.app_cosmos_connstr,
         database_name=app_config.app_cosmos_database,
+        status_collection_name=app_config.app_cosmos_container_process_status,
         collection_name=app_config.app_cosmos_container_process,
     )
 
@@ -505,12 +614,15 @@ async def delete_processed_file(
     process_id: str, app_config: AppConfiguration = Depends(get_app_config)
 ) -> ContentResultDelete:
     try:
-        deleted_file = CosmosContentProcess(process_id=process_id).delete_processed_file(
+        deleted_file = CosmosContentProcess(
+            process_id=process_id
+        ).delete_processed_file(
             connection_string=app_config.app_cosmos_connstr,
             database_name=app_config.app_cosmos_database,
             collection_name=app_config.app_cosmos_container_process,
             storage_connection_string=app_config.app_storage_blob_url,
             container_name=app_config.app_cps_processes,
+            status_collection_name=app_config.app_cosmos_container_process_status,
         )
 
     except Exception as e:
@@ -518,5 +630,5 @@ async def delete_processed_file(
     return ContentResultDelete(
         status="Success" if deleted_file else "Failed",
         process_id=deleted_file.process_id if deleted_file else "",
-        message="" if deleted_file else "This record no longer exists. Please refresh."
+        message="" if deleted_file else "This record no longer exists. Please refresh.",
     )
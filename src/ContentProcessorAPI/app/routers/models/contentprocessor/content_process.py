@@ -1,16 +1,242 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import base64
 import datetime
+import gzip
 import json
+import threading
+import time
+import uuid
 from typing import Any, List, Optional
 
+from bson import json_util
 from pydantic import BaseModel, SkipValidation
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from app.libs.cosmos_db.helper import CosmosMongDBHelper
 from app.libs.storage_blob.helper import StorageBlobHelper
 from app.routers.models.schmavault.model import Schema
 
+# Fields of the lightweight status document, read by the status polls and the processed list
+PROCESS_STATUS_FIELDS = [
+    "process_id",
+    "processed_file_name",
+    "processed_file_mime_type",
+    "processed_time",
+    "imported_time",
+    "last_modified_time",
+    "last_modified_by",
+    "status",
+    "entity_score",
+    "min_extracted_entity_score",
+    "schema_score",
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+]
+
+# Blob of an archived process document, in the folder of the process (see the Save step)
+ARCHIVE_BLOB_NAME = "content_process.json.gz"
+
+# Collection of the one-time data migrations, with their progress and lease
+MIGRATIONS_COLLECTION = "Migrations"
+
+# Status collections already backfilled with the processes written before they existed
+_backfilled_status_collections: set = set()
+
+# Document counts per collection: (count, refreshed at), refreshed in the background when stale
+_total_counts: dict = dict()
+_total_counts_refreshing: set = set()
+_total_counts_lock = threading.Lock()
+
+# Order of the processed list; the continuation token holds the sort values of the last item
+PROCESS_LIST_SORT = [("imported_time", -1), ("_id", -1)]
+
+
+def _get_status_backfill_id(status_collection_name: str) -> str:
+    return f"process_status_backfill:{status_collection_name}"
+
+
+def is_status_collection_backfilled(
+    connection_string: str, database_name: str, status_collection_name: str
+) -> bool:
+    """
+    Check whether the status collection holds the processes written before it existed
+    (see backfill_status_collection).
+    """
+    key = (connection_string, database_name, status_collection_name)
+    if key in _backfilled_status_collections:
+        return True
+
+    migrations_helper = CosmosMongDBHelper(
+        connection_string=connection_string,
+        db_name=database_name,
+        container_name=MIGRATIONS_COLLECTION,
+    )
+    if migrations_helper.find_document(
+        query={
+            "_id": _get_status_backfill_id(status_collection_name),
+            "completed_time": {"$ne": None},
+        },
+        limit=1,
+    ):
+        _backfilled_status_collections.add(key)
+        return True
+    return False
+
+
+def backfill_status_collection(
+    connection_string: str,
+    database_name: str,
+    status_collection_name: str,
+    process_collection_name: str,
+    batch_size: int = 100,
+    pause_seconds: float = 1.0,
+    lease_seconds: int = 300,
+):
+    """
+    Copy the status of the processes written before the status collection existed, once.
+
+    It runs in the background (see the API startup), in batches with a pause between them to
+    stay within the Cosmos DB throughput. The progress is saved in the Migrations collection:
+    a lease lets one API worker run it at a time, and an interrupted backfill resumes after
+    the last copied process. Only missing status documents are inserted; existing ones are newer.
+
+    Args:
+        connection_string: The Cosmos DB connection string.
+        database_name: The Cosmos DB database name.
+        status_collection_name: The Cosmos DB collection name for process status.
+        process_collection_name: The Cosmos DB collection name for processes.
+        batch_size: The number of processes copied per batch.
+        pause_seconds: The pause between two batches.
+        lease_seconds: The time another worker waits before taking over a stopped backfill.
+    """
+    migrations_helper = CosmosMongDBHelper(
+        connection_string=connection_string,
+        db_name=database_name,
+        container_name=MIGRATIONS_COLLECTION,
+    )
+    migration_id = _get_status_backfill_id(status_collection_name)
+    owner = str(uuid.uuid4())
+
+    def renew_lease() -> bool:
+        now = datetime.datetime.now(datetime.UTC)
+        try:
+            # A completed backfill, or one leased to another worker, does not match:
+            # the upsert then fails on the existing _id
+            migrations_helper.upsert_document(
+                {
+                    "_id": migration_id,
+                    "completed_time": None,
+                    "$or": [
+                        {"lease_until": None},
+                        {"lease_until": {"$lt": now}},
+                        {"owner": owner},
+                    ],
+                },
+                {
+                    "owner": owner,
+                    "lease_until": now + datetime.timedelta(seconds=lease_seconds),
+                },
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    if not renew_lease():
+        return
+
+    status_helper = CosmosMongDBHelper(
+        connection_string=connection_string,
+        db_name=database_name,
+        container_name=status_collection_name,
+        indexes=[("process_id", 1)],
+    )
+    process_helper = CosmosMongDBHelper(
+        connection_string=connection_string,
+        db_name=database_name,
+        container_name=process_collection_name,
+        indexes=[("process_id", 1)],
+    )
+
+    last_id = migrations_helper.find_document(query={"_id": migration_id})[0].get(
+        "last_id"
+    )
+    while True:
+        processes = process_helper.find_document(
+            query={} if last_id is None else {"_id": {"$gt": last_id}},
+            sort_fields=[("_id", 1)],
+            limit=batch_size,
+            projection=PROCESS_STATUS_FIELDS,
+        )
+        if not processes:
+            break
+
+        status_helper.bulk_write(
+            [
+                UpdateOne(
+                    {"process_id": process["process_id"]},
+                    {
+                        "$setOnInsert": {
+                            key: value for key, value in process.items() if key != "_id"
+                        }
+                    },
+                    upsert=True,
+                )
+                for process in processes
+            ],
+            ordered=False,
+        )
+        last_id = processes[-1]["_id"]
+        migrations_helper.update_document_by_query(
+            {"_id": migration_id}, {"last_id": last_id}
+        )
+        if not renew_lease():
+            return
+        time.sleep(pause_seconds)
+
+    migrations_helper.update_document_by_query(
+        {"_id": migration_id},
+        {"completed_time": datetime.datetime.now(datetime.UTC), "lease_until": None},
+    )
+    _backfilled_status_collections.add(
+        (connection_string, database_name, status_collection_name)
+    )
+
+
+def load_archived_process(document: dict, account_url: str) -> dict:
+    """
+    Load the process document archived to blob storage, when the given document is its stub.
+
+    Args:
+        document: The process document read from Cosmos DB.
+        account_url: The Azure Storage Blob account URL.
+
+    Returns:
+        dict: The archived process document, or the given document if it is not archived.
+    """
+    archive = document.get("archive")
+    if not archive:
+        return document
+
+    blob_helper = StorageBlobHelper(
+        account_url=account_url, container_name=archive["container_name"]
+    )
+    archived_document = json_util.loads(
+        gzip.decompress(
+            blob_helper.download_blob(
+                blob_name=archive.get("blob_name", ARCHIVE_BLOB_NAME)
+            )
+        ).decode("utf-8")
+    )
+    # The stub holds the latest status and modification time
+    archived_document.update(
+        {key: document[key] for key in PROCESS_STATUS_FIELDS if key in document}
+    )
+    return archived_document
+
 
 class ExtractionComparisonItem(BaseModel):
     Field: Optional[str]
@@ -50,6 +276,201 @@ class PaginatedResponse(BaseModel):
     current_page: int
     page_size: int
     items: List["ContentProcess"]
+    continuation_token: Optional[str] = None
+
+
+def encode_continuation_token(document: dict) -> str:
+    """
+    Encode the position after a document of the processed list (see PROCESS_LIST_SORT).
+
+    Args:
+        document: The last document of the page.
+
+    Returns:
+        str: The opaque continuation token.
+    """
+    position = json_util.dumps(
+        {"imported_time": document.get("imported_time"), "_id": document["_id"]}
+    )
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+
+def decode_continuation_token(continuation_token: str) -> dict:
+    """
+    Decode a continuation token to the query of the documents after it in the processed list.
+
+    Args:
+        continuation_token: The token returned with the previous page.
+
+    Returns:
+        dict: The query of the following documents.
+
+    Raises:
+        ValueError: If the token is not valid.
+    """
+    try:
+        position = json_util.loads(
+            base64.urlsafe_b64decode(continuation_token.encode("ascii"))
+        )
+        imported_time = position["imported_time"]
+        document_id = position["_id"]
+    except Exception as e:
+        raise ValueError("Invalid continuation token.") from e
+
+    return {
+        "$or": [
+            {"imported_time": {"$lt": imported_time}},
+            {"imported_time": imported_time, "_id": {"$lt": document_id}},
+        ]
+    }
+
+
+def _refresh_total_count(key: tuple, mongo_helper: CosmosMongDBHelper):
+    try:
+        count = mongo_helper.count_documents()
+        with _total_counts_lock:
+            _total_counts[key] = (count, time.monotonic())
+    finally:
+        with _total_counts_lock:
+            _total_counts_refreshing.discard(key)
+
+
+def get_cached_total_count(
+    mongo_helper: CosmosMongDBHelper, refresh_seconds: float
+) -> int:
+    """
+    Get the number of documents of the collection, without counting them on every call.
+
+    The count is taken once, then served from memory. When it is older than refresh_seconds,
+    the stale count is returned while a background thread counts again.
+
+    Args:
+        mongo_helper: The helper of the collection.
+        refresh_seconds: The age after which the count is refreshed.
+
+    Returns:
+        int: The (possibly slightly stale) number of documents.
+    """
+    key = (
+        mongo_helper.connection_string,
+        mongo_helper.db.name,
+        mongo_helper.container.name,
+    )
+    cached = _total_counts.get(key)
+    if cached is None:
+        _refresh_total_count(key, mongo_helper)
+        return _total_counts[key][0]
+
+    count, refreshed_at = cached
+    if time.monotonic() - refreshed_at >= refresh_seconds:
+        with _total_counts_lock:
+            if key in _total_counts_refreshing:
+                return count
+            _total_counts_refreshing.add(key)
+        threading.Thread(
+            target=_refresh_total_count, args=(key, mongo_helper), daemon=True
+        ).start()
+    return count
+
+
+class PromptCacheReportItem(BaseModel):
+    """Prompt cache usage of the processes mapped with one schema"""
+
+    schema_id: Optional[str] = None
+    schema_name: Optional[str] = None
+    process_count: int = 0
+    cache_hit_count: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit_ratio: float = 0.0
+
+
+class PromptCacheReport(BaseModel):
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    cache_hit_ratio: float = 0.0
+    items: List[PromptCacheReportItem] = []
+
+
+class LineReference(BaseModel):
+    """Reference to a document line: the page index and the line index within the page"""
+
+    page: int
+    line: int
+
+
+class LineReferenceRequest(BaseModel):
+    references: List[LineReference]
+
+
+class ResolvedLine(BaseModel):
+    page: int
+    line: int
+    content: str
+    confidence: Optional[float] = None
+    normalized_polygon: List[dict] = []
+
+
+def _normalize_source_polygon(source: str, width: float, height: float) -> List[dict]:
+    """Normalize the polygon of a Content Understanding source ("D(page,x1,y1,...)") to the page dimensions"""
+    if (
+        not (source.startswith("D(") and source.endswith(")"))
+        or not width
+        or not height
+    ):
+        return []
+    coordinates = [float(x.strip()) for x in source[2:-1].split(",")[1:]]
+    return [
+        {
+            "x": round(coordinates[i] / width, 3),
+            "y": round(coordinates[i + 1] / height, 3),
+        }
+        for i in range(0, len(coordinates) - 1, 2)
+    ]
+
+
+def resolve_line_references(
+    extracted_content: dict, references: List[LineReference]
+) -> List[ResolvedLine]:
+    """
+    Resolve the line references of the confidence evaluation against the Extract step output.
+    References out of range are skipped.
+    """
+    contents = extracted_content.get("result", {}).get("contents") or [{}]
+    pages = contents[0].get("pages") or []
+
+    resolved_lines = []
+    for reference in references:
+        if not 0 <= reference.page < len(pages):
+            continue
+        page = pages[reference.page]
+        lines = page.get("lines") or []
+        if not 0 <= reference.line < len(lines):
+            continue
+
+        line = lines[reference.line]
+        line_start = line["span"]["offset"]
+        line_end = line_start + line["span"]["length"]
+        # The line confidence is the lowest confidence of the words within its span
+        word_confidences = [
+            word["confidence"]
+            for word in page.get("words") or []
+            if word["span"]["offset"] >= line_start
+            and word["span"]["offset"] + word["span"]["length"] <= line_end
+        ]
+        resolved_lines.append(
+            ResolvedLine(
+                page=reference.page,
+                line=reference.line,
+                content=line["content"],
+                confidence=min(word_confidences) if word_confidences else None,
+                normalized_polygon=_normalize_source_polygon(
+                    line.get("source", ""), page.get("width"), page.get("height")
+                ),
+            )
+        )
+    return resolved_lines
 
 
 class ContentProcess(BaseModel):
@@ -70,6 +491,7 @@ class ContentProcess(BaseModel):
     confidence: Optional[dict] = None
     target_schema: Optional[Schema] = None
     prompt_tokens: int = 0
+    cached_tokens: int = 0
     completion_tokens: int = 0
 
     process_output: list[Step_Outputs] = []
@@ -84,9 +506,8 @@ class ContentProcess(BaseModel):
         collection_name: str,
     ):
         """
-        Update the status of the process in Cosmos DB.
+        Update the status of the process in the status collection of Cosmos DB.
         """
-        # Check if the process_id is already in the database
         mongo_helper = CosmosMongDBHelper(
             connection_string=connection_string,
             db_name=database_name,
@@ -94,30 +515,32 @@ class ContentProcess(BaseModel):
             indexes=[("process_id", 1)],
         )
 
-        # Check if the process_id already exists in the database
-        existing_process = mongo_helper.find_document(
-            query={"process_id": self.process_id}
+        # Update the status, or insert the status document if it does not exist yet
+        mongo_helper.upsert_document(
+            {"process_id": self.process_id},
+            {
+                "status": self.status,
+                "processed_file_name": self.processed_file_name,
+            },
+            insert_only=self.get_status_document(),
         )
-        if existing_process:
-            # Update the existing document
-            mongo_helper.update_document_by_query(
-                {"process_id": self.process_id},
-                {
-                    "status": self.status,
-                    "processed_file_name": self.processed_file_name,
-                },
-            )
-        else:
-            # Insert a new document
-            mongo_helper.insert_document(self.model_dump())
+
+    def get_status_document(self) -> dict:
+        """
+        Get the lightweight status document of the process (see PROCESS_STATUS_FIELDS).
+        """
+        return self.model_dump(include=set(PROCESS_STATUS_FIELDS))
 
     def update_status_to_cosmos(
-        self, connection_string: str, database_name: str, collection_name: str
+        self,
+        connection_string: str,
+        database_name: str,
+        collection_name: str,
+        status_collection_name: Optional[str] = None,
     ):
         """
-        Update the status of the process in Cosmos DB.
+        Update the whole process in Cosmos DB, and its status document in the status collection.
         """
-        # Check if the process_id is already in the database
         mongo_helper = CosmosMongDBHelper(
             connection_string=connection_string,
             db_name=database_name,
@@ -125,16 +548,18 @@ class ContentProcess(BaseModel):
             indexes=[("process_id", 1)],
         )
 
-        # Check if the process_id already exists in the database
-        existing_process = mongo_helper.find_document({"process_id": self.process_id})
-        if existing_process:
-            # Update the existing document
-            mongo_helper.update_document_by_query(
-                {"process_id": self.process_id}, self.model_dump()
+        # Replace the fields of the process, or insert it if it does not exist yet
+        mongo_helper.upsert_document({"process_id": self.process_id}, self.model_dump())
+
+        if status_collection_name:
+            CosmosMongDBHelper(
+                connection_string=connection_string,
+                db_name=database_name,
+                container_name=status_collection_name,
+                indexes=[("process_id", 1)],
+            ).upsert_document(
+                {"process_id": self.process_id}, self.get_status_document()
             )
-        else:
-            # Insert a new document
-            mongo_helper.insert_document(self.model_dump())
 
     def get_status_from_blob(
         self,
@@ -164,14 +589,39 @@ class ContentProcess(BaseModel):
 
         return step_outputs_list
 
+    def get_lines_from_blob(
+        self,
+        connection_string: str,
+        container_name: str,
+        blob_name: str,
+        references: List[LineReference],
+    ) -> Optional[List[ResolvedLine]]:
+        """Resolve line references against the Extract step output in blob storage"""
+        blob_helper = StorageBlobHelper(
+            account_url=connection_string, container_name=container_name
+        )
+
+        try:
+            extracted_content = json.loads(
+                blob_helper.download_blob(blob_name=blob_name).decode("utf-8")
+            )
+        except Exception:
+            # blob not found.
+            return None
+
+        return resolve_line_references(extracted_content, references)
+
     def get_status_from_cosmos(
         self,
         connection_string: str,
         database_name: str,
         collection_name: str,
+        projection: Optional[List[str]] = None,
+        archive_account_url: Optional[str] = None,
     ):
         """
         Get the status of the process from Cosmos DB.
+        With archive_account_url, an archived process is read back from blob storage.
         """
         # Check if the process_id is already in the database
         mongo_helper = CosmosMongDBHelper(
@@ -183,13 +633,57 @@ class ContentProcess(BaseModel):
 
         # Check if the process_id already exists in the database
         existing_process = mongo_helper.find_document(
-            query={"process_id": self.process_id}
+            query={"process_id": self.process_id}, projection=projection
         )
         if existing_process:
+            if archive_account_url:
+                return ContentProcess(
+                    **load_archived_process(existing_process[0], archive_account_url)
+                )
             return ContentProcess(**existing_process[0])
         else:
             return None
 
+    def _restore_archived_process(
+        self, mongo_helper: CosmosMongDBHelper, archive_account_url: str
+    ):
+        """
+        Put an archived process document back in Cosmos DB, before it is modified.
+        """
+        archived_stub = mongo_helper.find_document(
+            query={"process_id": self.process_id, "archive": {"$exists": True}}
+        )
+        if archived_stub:
+            mongo_helper.replace_document(
+                {"_id": archived_stub[0]["_id"]},
+                load_archived_process(archived_stub[0], archive_account_url),
+            )
+
+    def get_process_status_from_cosmos(
+        self,
+        connection_string: str,
+        database_name: str,
+        status_collection_name: str,
+        collection_name: str,
+    ):
+        """
+        Get the status of the process from its status document, without reading the process results.
+        Processes written before the status collection existed are read from the process collection.
+        """
+        process_status = self.get_status_from_cosmos(
+            connection_string=connection_string,
+            database_name=database_name,
+            collection_name=status_collection_name,
+        )
+        if process_status is None:
+            process_status = self.get_status_from_cosmos(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name=collection_name,
+                projection=PROCESS_STATUS_FIELDS,
+            )
+        return process_status
+
     def delete_processed_file(
         self,
         connection_string: str,
@@ -197,6 +691,7 @@ class ContentProcess(BaseModel):
         collection_name: str,
         storage_connection_string: str,
         container_name: str,
+        status_collection_name: Optional[str] = None,
     ):
         """
         Delete the processed file from Cosmos DB & Storage account.
@@ -208,6 +703,23 @@ class ContentProcess(BaseModel):
             indexes=[("process_id", 1)],
         )
 
+        # A process still in progress only has its status document
+        existing_status = None
+        if status_collection_name:
+            status_helper = CosmosMongDBHelper(
+                connection_string=connection_string,
+                db_name=database_name,
+                container_name=status_collection_name,
+                indexes=[("process_id", 1)],
+            )
+            existing_status = status_helper.find_document(
+                query={"process_id": self.process_id}
+            )
+            if existing_status:
+                status_helper.delete_document(
+                    item_id=self.process_id, field_name="process_id"
+                )
+
         blob_helper = StorageBlobHelper(
             account_url=storage_connection_string, container_name=container_name
         )
@@ -220,8 +732,12 @@ class ContentProcess(BaseModel):
         blob_helper.delete_folder(folder_name=self.process_id)
 
         if existing_process:
-            mongo_helper.delete_document(item_id=self.process_id, field_name="process_id")
+            mongo_helper.delete_document(
+                item_id=self.process_id, field_name="process_id"
+            )
             return ContentProcess(**existing_process[0])
+        elif existing_status:
+            return ContentProcess(**existing_status[0])
         else:
             return None
 
@@ -231,6 +747,8 @@ class ContentProcess(BaseModel):
         database_name: str,
         collection_name: str,
         process_result: dict,
+        status_collection_name: Optional[str] = None,
+        archive_account_url: Optional[str] = None,
     ):
         # Update the process result in Cosmos DB
         mongo_helper = CosmosMongDBHelper(
@@ -239,29 +757,36 @@ class ContentProcess(BaseModel):
             container_name=collection_name,
             indexes=[("process_id", 1)],
         )
-        # Check if the process_id already exists in the database
-        existing_process = mongo_helper.find_document(
-            query={"process_id": self.process_id}
+        if archive_account_url:
+            self._restore_archived_process(mongo_helper, archive_account_url)
+        modified = {
+            "last_modified_time": datetime.datetime.now(datetime.UTC),
+            "last_modified_by": "user",
+        }
+        # Update the existing document; a missing process is not created
+        update_result = mongo_helper.update_document_by_query(
+            {"process_id": self.process_id}, {"result": process_result, **modified}
         )
-        if existing_process:
-            # Update the existing document
-            return mongo_helper.update_document_by_query(
-                {"process_id": self.process_id},
-                {
-                    "result": process_result,
-                    "last_modified_time": datetime.datetime.now(datetime.UTC),
-                    "last_modified_by": "user",
-                },
-            )
-        else:
+        if not update_result.matched_count:
             return None
 
+        if status_collection_name:
+            CosmosMongDBHelper(
+                connection_string=connection_string,
+                db_name=database_name,
+                container_name=status_collection_name,
+                indexes=[("process_id", 1)],
+            ).update_document_by_query({"process_id": self.process_id}, modified)
+        return update_result
+
     def update_process_comment(
         self,
         connection_string: str,
         database_name: str,
         collection_name: str,
         comment: str,
+        status_collection_name: Optional[str] = None,
+        archive_account_url: Optional[str] = None,
     ):
         # Update the process result in Cosmos DB
         mongo_helper = CosmosMongDBHelper(
@@ -270,23 +795,28 @@ class ContentProcess(BaseModel):
             container_name=collection_name,
             indexes=[("process_id", 1)],
         )
-        # Check if the process_id already exists in the database
-        existing_process = mongo_helper.find_document(
-            query={"process_id": self.process_id}
+        if archive_account_url:
+            self._restore_archived_process(mongo_helper, archive_account_url)
+        modified = {
+            "last_modified_time": datetime.datetime.now(datetime.UTC),
+            "last_modified_by": "user",
+        }
+        # Update the existing document; a missing process is not created
+        update_result = mongo_helper.update_document_by_query(
+            {"process_id": self.process_id}, {"comment": comment, **modified}
         )
-        if existing_process:
-            # Update the existing document
-            return mongo_helper.update_document_by_query(
-                {"process_id": self.process_id},
-                {
-                    "comment": comment,
-                    "last_modified_time": datetime.datetime.now(datetime.UTC),
-                    "last_modified_by": "user",
-                },
-            )
-        else:
+        if not update_result.matched_count:
             return None
 
+        if status_collection_name:
+            CosmosMongDBHelper(
+                connection_string=connection_string,
+                db_name=database_name,
+                container_name=status_collection_name,
+                indexes=[("process_id", 1)],
+            ).update_document_by_query({"process_id": self.process_id}, modified)
+        return update_result
+
     @staticmethod
     def get_all_processes_from_cosmos(
         connection_string: str,
@@ -294,42 +824,55 @@ class ContentProcess(BaseModel):
         collection_name: str,
         page_size: int = 0,
         page_number: int = 0,
+        process_collection_name: Optional[str] = None,
+        continuation_token: Optional[str] = None,
+        count_refresh_seconds: float = 60,
     ) -> PaginatedResponse:
         """
-        Get all processes from Cosmos DB.
+        Get all processes from the status collection of Cosmos DB.
+
+        Until the status collection is backfilled with the processes written before it existed
+        (see backfill_status_collection), they are listed from process_collection_name, if given.
+
+        With a continuation_token (returned with the previous page), the page is read from the
+        position of the token on the index, so every page costs the same as the first one.
+        Without it, the page is found by skipping the previous pages. The total count is cached
+        (see get_cached_total_count).
+
+        Raises:
+            ValueError: If the continuation token is not valid.
         """
+        query = (
+            decode_continuation_token(continuation_token) if continuation_token else {}
+        )
+
+        if process_collection_name and not is_status_collection_backfilled(
+            connection_string, database_name, collection_name
+        ):
+            collection_name = process_collection_name
+
         # Check if the process_id is already in the database
         mongo_helper = CosmosMongDBHelper(
             connection_string=connection_string,
             db_name=database_name,
             container_name=collection_name,
-            indexes=[("process_id", 1), ("imported_time", -1)],
+            indexes=[
+                ("process_id", 1),
+                ("imported_time", -1),
+                PROCESS_LIST_SORT,
+            ],
         )
 
-        total_count = mongo_helper.count_documents()
+        total_count = get_cached_total_count(mongo_helper, count_refresh_seconds)
         total_pages = (total_count + page_size - 1) // page_size if page_size > 0 else 1
 
         # Check if the process_id already exists in the database
         items = mongo_helper.find_document(
-            query={},
-            sort_fields=[("imported_time", -1)],
-            skip=(page_number - 1) * page_size,
+            query=query,
+            sort_fields=PROCESS_LIST_SORT,
+            skip=0 if continuation_token else max(page_number - 1, 0) * page_size,
             limit=page_size,
-            projection=[
-                "process_id",
-                "processed_file_name",
-                "processed_file_mime_type",
-                "processed_time",
-                "imported_time",
-                "last_modified_time",
-                "last_modified_by",
-                "status",
-                "entity_score",
-                "min_extracted_entity_score",
-                "schema_score",
-                "prompt_tokens",
-                "completion_tokens",
-            ],
+            projection=PROCESS_STATUS_FIELDS,
         )
 
         if items:
@@ -339,6 +882,11 @@ class ContentProcess(BaseModel):
                 current_page=page_number,
                 page_size=page_size,
                 items=items,
+                continuation_token=(
+                    encode_continuation_token(items[-1])
+                    if page_size > 0 and len(items) == page_size
+                    else None
+                ),
             )
         else:
             # Return an empty list if no processes are found
@@ -346,6 +894,75 @@ class ContentProcess(BaseModel):
                 total_count=0, total_pages=0, current_page=0, page_size=0, items=[]
             )
 
+    @staticmethod
+    def get_prompt_cache_report_from_cosmos(
+        connection_string: str,
+        database_name: str,
+        collection_name: str,
+    ) -> PromptCacheReport:
+        """
+        Get the prompt cache hit ratio (cached tokens / prompt tokens) per schema from Cosmos DB.
+        """
+        mongo_helper = CosmosMongDBHelper(
+            connection_string=connection_string,
+            db_name=database_name,
+            container_name=collection_name,
+            indexes=[("process_id", 1)],
+        )
+
+        groups = mongo_helper.aggregate(
+            [
+                {"$match": {"prompt_tokens": {"$gt": 0}}},
+                {
+                    "$group": {
+                        "_id": "$target_schema.Id",
+                        "schema_name": {"$first": "$target_schema.ClassName"},
+                        "process_count": {"$sum": 1},
+                        "cache_hit_count": {
+                            "$sum": {
+                                "$cond": [
+                                    {"$gt": [{"$ifNull": ["$cached_tokens", 0]}, 0]},
+                                    1,
+                                    0,
+                                ]
+                            }
+                        },
+                        "prompt_tokens": {"$sum": "$prompt_tokens"},
+                        "cached_tokens": {"$sum": {"$ifNull": ["$cached_tokens", 0]}},
+                        "completion_tokens": {"$sum": "$completion_tokens"},
+                    }
+                },
+                {"$sort": {"_id": 1}},
+            ]
+        )
+
+        items = [
+            PromptCacheReportItem(
+                schema_id=group["_id"],
+                schema_name=group.get("schema_name"),
+                process_count=group["process_count"],
+                cache_hit_count=group["cache_hit_count"],
+                prompt_tokens=group["prompt_tokens"],
+                cached_tokens=group["cached_tokens"],
+                completion_tokens=group["completion_tokens"],
+                cache_hit_ratio=round(
+                    group["cached_tokens"] / group["prompt_tokens"], 3
+                ),
+            )
+            for group in groups
+        ]
+
+        prompt_tokens = sum(item.prompt_tokens for item in items)
+        cached_tokens = sum(item.cached_tokens for item in items)
+        return PromptCacheReport(
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            cache_hit_ratio=(
+                round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0
+            ),
+            items=items,
+        )
+
     def get_file_bytes_from_blob(
         self,
         connection_string: str,
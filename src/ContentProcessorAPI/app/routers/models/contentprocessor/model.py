@@ -25,6 +25,7 @@ class ArtifactType(str, Enum):
     Undefined = "undefined"
     ConvertedContent = "converted_content"
     ExtractedContent = "extracted_content"
+    ExtractedContentDigest = "extracted_content_digest"
     SchemaMappedData = "schema_mapped_data"
     ScoreMergedData = "score_merged_data"
     SourceContent = "source_content"
@@ -58,6 +59,7 @@ class ProcessFile(BaseModel):
 class Paging(BaseModel):
     page_number: int = Field(default=0, gt=0)
     page_size: int = Field(default=0, gt=0)
+    continuation_token: Optional[str] = None
 
 
 class ContentResultUpdate(BaseModel):
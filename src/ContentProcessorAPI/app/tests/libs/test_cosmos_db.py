@@ -1,8 +1,9 @@
+import mongomock
 import pytest
 from pymongo import MongoClient
 from pymongo.collection import Collection
 from pymongo.database import Database
-from app.libs.cosmos_db.helper import CosmosMongDBHelper
+from app.libs.cosmos_db.helper import CosmosMongDBHelper, clear_mongo_clients
 
 
 @pytest.fixture
@@ -31,6 +32,7 @@ def mock_collection(mocker):
 
 @pytest.fixture
 def cosmos_mongo_db_helper(mock_mongo_client, mock_database, mock_collection, mocker):
+    clear_mongo_clients()
     # Mock the MongoClient to return the mock database
     mocker.patch(
         "app.libs.cosmos_db.helper.MongoClient", return_value=mock_mongo_client
@@ -47,7 +49,8 @@ def cosmos_mongo_db_helper(mock_mongo_client, mock_database, mock_collection, mo
     helper.client = mock_mongo_client
     helper.db = mock_database
     helper.container = mock_collection
-    return helper
+    yield helper
+    clear_mongo_clients()
 
 
 def test_insert_document(cosmos_mongo_db_helper, mock_collection):
@@ -87,3 +90,59 @@ def test_delete_document(cosmos_mongo_db_helper, mock_collection):
     result = cosmos_mongo_db_helper.delete_document(item_id)
     mock_collection.delete_one.assert_called_once_with({"Id": item_id})
     assert result.deleted_count == 1
+
+
+def test_helpers_share_client(mock_mongo_client, mock_database, mocker):
+    mongo_client = mocker.patch(
+        "app.libs.cosmos_db.helper.MongoClient", return_value=mock_mongo_client
+    )
+    mock_mongo_client.__getitem__.return_value = mock_database
+    clear_mongo_clients()
+
+    first = CosmosMongDBHelper(
+        "mongodb://localhost:27017", "test_db", "test_collection", [("Id", 1)]
+    )
+    second = CosmosMongDBHelper(
+        "mongodb://localhost:27017", "test_db", "test_collection", [("Id", 1)]
+    )
+    clear_mongo_clients()
+
+    assert first.client is second.client
+    assert first.container is second.container
+    mongo_client.assert_called_once()
+    mock_database.list_collection_names.assert_called_once()
+    mock_mongo_client.close.assert_called_once()
+
+
+def test_upsert_document(cosmos_mongo_db_helper, mock_collection):
+    cosmos_mongo_db_helper.upsert_document(
+        {"process_id": "123"},
+        {"status": "Completed"},
+        insert_only={"process_id": "123", "status": "Processing", "comment": None},
+    )
+    mock_collection.update_one.assert_called_once_with(
+        {"process_id": "123"},
+        {
+            "$set": {"status": "Completed"},
+            "$setOnInsert": {"process_id": "123", "comment": None},
+        },
+        upsert=True,
+    )
+
+
+def test_compound_indexes(mocker):
+    client = mongomock.MongoClient()
+    mocker.patch("app.libs.cosmos_db.helper.MongoClient", return_value=client)
+    clear_mongo_clients()
+
+    indexes = [("process_id", 1), [("imported_time", -1), ("_id", -1)]]
+    CosmosMongDBHelper("mongodb://localhost:27017", "test_db", "processes", indexes)
+    CosmosMongDBHelper("mongodb://localhost:27017", "test_db", "processes", indexes)
+    clear_mongo_clients()
+
+    index_information = client["test_db"]["processes"].index_information()
+    assert index_information["imported_time_-1__id_-1"]["key"] == [
+        ("imported_time", -1),
+        ("_id", -1),
+    ]
+    assert "process_id_1" in index_information
@@ -1,9 +1,24 @@
+import datetime
+import gzip
+import json
+import mongomock
 import pytest
+from bson import ObjectId, json_util
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 from app.main import app
 
-from app.appsettings import AppConfiguration
+from app.appsettings import AppConfiguration, get_app_config
+from app.libs.cosmos_db.helper import CosmosMongDBHelper, clear_mongo_clients
+from app.routers.models.contentprocessor import content_process
+from app.routers.models.contentprocessor.content_process import (
+    PROCESS_STATUS_FIELDS,
+    ContentProcess as CosmosContentProcess,
+    backfill_status_collection,
+    decode_continuation_token,
+    encode_continuation_token,
+    is_status_collection_backfilled,
+)
 
 client = TestClient(app)
 
@@ -63,6 +78,7 @@ def test_get_all_processed_results(
         "page_size": 10,
         "total_count": 0,
         "total_pages": 0,
+        "continuation_token": None,
     }
 
 
@@ -162,6 +178,60 @@ def test_get_process_steps_not_found(mock_get_steps, mock_get_app_config, app_co
     assert response.json()["status"] == "failed"
 
 
+@patch("app.routers.contentprocessor.get_app_config")
+@patch("app.routers.models.contentprocessor.content_process.StorageBlobHelper")
+def test_get_process_lines(mock_blob_helper, mock_get_app_config, app_config):
+    mock_get_app_config.return_value = app_config
+    extracted_content = {
+        "result": {
+            "contents": [
+                {
+                    "pages": [
+                        {
+                            "width": 10,
+                            "height": 10,
+                            "words": [
+                                {"span": {"offset": 0, "length": 4}, "confidence": 0.9},
+                                {"span": {"offset": 5, "length": 5}, "confidence": 0.8},
+                            ],
+                            "lines": [
+                                {
+                                    "content": "John Smith",
+                                    "source": "D(1,1,2,5,2,5,2.5,1,2.5)",
+                                    "span": {"offset": 0, "length": 10},
+                                }
+                            ],
+                        }
+                    ]
+                }
+            ]
+        }
+    }
+    mock_blob_helper.return_value.download_blob.return_value = json.dumps(
+        extracted_content
+    ).encode("utf-8")
+
+    response = client.post(
+        "/contentprocessor/processed/test_process_id/lines",
+        json={"references": [{"page": 0, "line": 0}, {"page": 1, "line": 0}]},
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "page": 0,
+            "line": 0,
+            "content": "John Smith",
+            "confidence": 0.8,
+            "normalized_polygon": [
+                {"x": 0.1, "y": 0.2},
+                {"x": 0.5, "y": 0.2},
+                {"x": 0.5, "y": 0.25},
+                {"x": 0.1, "y": 0.25},
+            ],
+        }
+    ]
+
+
 @patch("app.routers.contentprocessor.get_app_config")
 @patch("app.routers.contentprocessor.CosmosContentProcess.update_process_result")
 def test_update_process_result(mock_update_result, mock_get_app_config, app_config):
@@ -201,9 +271,7 @@ def test_get_original_file_success(
     mock_process_status.processed_file_name = "testfile.txt"
     mock_process_status.process_id = "123"
     mock_process_status.get_file_bytes_from_blob.return_value = b"file content"
-    mock_cosmos_content_process.return_value.get_status_from_cosmos.return_value = (
-        mock_process_status
-    )
+    mock_cosmos_content_process.return_value.get_process_status_from_cosmos.return_value = mock_process_status
 
     # Mocking the MIME type detection
     mock_mime_types_detection.get_file_type.return_value = "text/plain"
@@ -226,3 +294,434 @@ def test_get_original_file_not_found(mock_get_status, mock_get_app_config, app_c
     response = client.get("/contentprocessor/processed/files/test_process_id")
     assert response.status_code == 404
     assert response.json()["status"] == "failed"
+
+
+@patch("app.routers.contentprocessor.get_app_config")
+@patch("app.routers.models.contentprocessor.content_process.CosmosMongDBHelper")
+def test_get_prompt_cache_report(mock_mongo_helper, mock_get_app_config, app_config):
+    mock_get_app_config.return_value = app_config
+    mock_mongo_helper.return_value.aggregate.return_value = [
+        {
+            "_id": "schema-1",
+            "schema_name": "Resume",
+            "process_count": 2,
+            "cache_hit_count": 1,
+            "prompt_tokens": 4000,
+            "cached_tokens": 1024,
+            "completion_tokens": 300,
+        }
+    ]
+
+    response = client.get("/contentprocessor/reports/prompt-cache")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["prompt_tokens"] == 4000
+    assert report["cached_tokens"] == 1024
+    assert report["cache_hit_ratio"] == 0.256
+    assert report["items"][0]["schema_id"] == "schema-1"
+    assert report["items"][0]["cache_hit_count"] == 1
+    assert report["items"][0]["cache_hit_ratio"] == 0.256
+
+
+@patch("app.routers.models.contentprocessor.content_process.CosmosMongDBHelper")
+def test_get_process_status_falls_back_to_process_collection(mock_mongo_helper):
+    status_helper = MagicMock()
+    status_helper.find_document.return_value = []
+    process_helper = MagicMock()
+    process_helper.find_document.return_value = [
+        {"process_id": "123", "status": "Completed"}
+    ]
+    mock_mongo_helper.side_effect = lambda **kwargs: (
+        status_helper if kwargs["container_name"] == "status" else process_helper
+    )
+
+    process_status = CosmosContentProcess(
+        process_id="123"
+    ).get_process_status_from_cosmos(
+        connection_string="connection_string",
+        database_name="database",
+        status_collection_name="status",
+        collection_name="processes",
+    )
+
+    assert process_status.status == "Completed"
+    process_helper.find_document.assert_called_once_with(
+        query={"process_id": "123"}, projection=PROCESS_STATUS_FIELDS
+    )
+
+
+@patch("app.routers.models.contentprocessor.content_process.StorageBlobHelper")
+@patch("app.routers.models.contentprocessor.content_process.CosmosMongDBHelper")
+def test_get_status_from_cosmos_reads_archived_process(
+    mock_mongo_helper, mock_blob_helper
+):
+    mock_mongo_helper.return_value.find_document.return_value = [
+        {
+            "process_id": "123",
+            "status": "Completed",
+            "archive": {
+                "container_name": "processes/123",
+                "blob_name": "content_process.json.gz",
+            },
+        }
+    ]
+    mock_blob_helper.return_value.download_blob.return_value = gzip.compress(
+        json_util.dumps(
+            {"process_id": "123", "status": "save", "result": {"total": 1}}
+        ).encode("utf-8")
+    )
+
+    process_status = CosmosContentProcess(process_id="123").get_status_from_cosmos(
+        connection_string="connection_string",
+        database_name="database",
+        collection_name="processes",
+        archive_account_url="blob_url",
+    )
+
+    mock_blob_helper.assert_called_once_with(
+        account_url="blob_url", container_name="processes/123"
+    )
+    assert process_status.result == {"total": 1}
+    # The stub holds the latest status
+    assert process_status.status == "Completed"
+
+
+def test_continuation_token_round_trip():
+    imported_time = datetime.datetime(2025, 1, 1, 12, 30)
+    document_id = ObjectId()
+
+    query = decode_continuation_token(
+        encode_continuation_token(
+            {"_id": document_id, "imported_time": imported_time, "status": "Completed"}
+        )
+    )
+
+    assert query == {
+        "$or": [
+            {"imported_time": {"$lt": imported_time}},
+            {"imported_time": imported_time, "_id": {"$lt": document_id}},
+        ]
+    }
+    with pytest.raises(ValueError):
+        decode_continuation_token("not a token")
+
+
+@patch("app.routers.models.contentprocessor.content_process.CosmosMongDBHelper")
+def test_get_all_processes_reads_pages_from_the_continuation_token(
+    mock_mongo_helper, monkeypatch
+):
+    monkeypatch.setattr(content_process, "_total_counts", {})
+    mongo_helper = mock_mongo_helper.return_value
+    mongo_helper.connection_string = "connection_string"
+    mongo_helper.db.name = "database"
+    mongo_helper.container.name = "status"
+    mongo_helper.count_documents.return_value = 3
+    first_page = [
+        {
+            "_id": ObjectId(),
+            "process_id": str(index),
+            "imported_time": datetime.datetime(2025, 1, 1),
+        }
+        for index in range(2)
+    ]
+    mongo_helper.find_document.return_value = first_page
+
+    page = CosmosContentProcess.get_all_processes_from_cosmos(
+        connection_string="connection_string",
+        database_name="database",
+        collection_name="status",
+        page_size=2,
+        page_number=1,
+    )
+    assert page.continuation_token is not None
+    assert page.total_pages == 2
+
+    mongo_helper.find_document.return_value = first_page[:1]
+    page = CosmosContentProcess.get_all_processes_from_cosmos(
+        connection_string="connection_string",
+        database_name="database",
+        collection_name="status",
+        page_size=2,
+        page_number=2,
+        continuation_token=page.continuation_token,
+    )
+
+    # The next page starts after the last item, without skipping
+    kwargs = mongo_helper.find_document.call_args.kwargs
+    assert kwargs["query"] == decode_continuation_token(
+        encode_continuation_token(first_page[-1])
+    )
+    assert kwargs["skip"] == 0
+    assert page.continuation_token is None
+    # The total count is cached
+    mongo_helper.count_documents.assert_called_once()
+
+
+@patch(
+    "app.routers.contentprocessor.CosmosContentProcess.get_all_processes_from_cosmos"
+)
+def test_get_all_processed_results_invalid_continuation_token(mock_get_all_processes):
+    mock_get_all_processes.side_effect = ValueError("Invalid continuation token.")
+
+    response = client.post(
+        "/contentprocessor/processed",
+        json={"page_number": 2, "page_size": 10, "continuation_token": "x"},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["message"] == "Invalid continuation token."
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(
+        "app.libs.cosmos_db.helper.MongoClient", lambda *args, **kwargs: client
+    )
+    monkeypatch.setattr(content_process, "_total_counts", {})
+    monkeypatch.setattr(content_process, "_backfilled_status_collections", set())
+
+    # mongomock's bulk_write does not accept the UpdateOne of the current pymongo
+    def bulk_write(self, operations, ordered=False):
+        for operation in operations:
+            self.container.update_one(
+                operation._filter, operation._doc, upsert=operation._upsert
+            )
+
+    monkeypatch.setattr(CosmosMongDBHelper, "bulk_write", bulk_write)
+    clear_mongo_clients()
+    yield client
+    clear_mongo_clients()
+
+
+def test_get_all_processed_results_pages_the_status_collection(mongo_client):
+    imported_time = datetime.datetime(2025, 1, 1)
+    mongo_client["db"]["ProcessStatus"].insert_many(
+        [
+            {
+                "process_id": str(index),
+                "status": "Completed",
+                # Two processes share each imported time
+                "imported_time": imported_time + datetime.timedelta(days=index // 2),
+            }
+            for index in range(5)
+        ]
+    )
+    mongo_client["db"]["Migrations"].insert_one(
+        {
+            "_id": "process_status_backfill:ProcessStatus",
+            "completed_time": datetime.datetime(2025, 1, 1),
+        }
+    )
+    config = app.dependency_overrides.get(get_app_config, get_app_config)()
+    config = config.model_copy(
+        update={
+            "app_cosmos_connstr": "mongodb://localhost",
+            "app_cosmos_database": "db",
+            "app_cosmos_container_process_status": "ProcessStatus",
+        }
+    )
+    app.dependency_overrides[get_app_config] = lambda: config
+    try:
+        process_ids = []
+        request = {"page_number": 1, "page_size": 2}
+        while True:
+            response = client.post("/contentprocessor/processed", json=request)
+            assert response.status_code == 200
+            page = response.json()
+            assert page["total_count"] == 5
+            process_ids += [item["process_id"] for item in page["items"]]
+            if not page["continuation_token"]:
+                break
+            request = {
+                "page_number": request["page_number"] + 1,
+                "page_size": 2,
+                "continuation_token": page["continuation_token"],
+            }
+    finally:
+        app.dependency_overrides.pop(get_app_config, None)
+
+    assert sorted(process_ids) == [str(index) for index in range(5)]
+    assert process_ids[:1] == ["4"]
+
+
+@patch("app.routers.models.contentprocessor.content_process.StorageBlobHelper")
+def test_archived_process_round_trip(mock_blob_helper, mongo_client):
+    target_schema = {
+        "Id": "schema",
+        "ClassName": "Invoice",
+        "Description": "Invoice",
+        "FileName": "invoice.py",
+        "ContentType": "application/json",
+    }
+    document = {
+        "_id": ObjectId(),
+        "process_id": "123",
+        "status": "save",
+        "imported_time": datetime.datetime(2025, 1, 1),
+        "last_modified_time": datetime.datetime(2025, 1, 1),
+        "target_schema": target_schema,
+        "result": {"total": 1},
+    }
+    # The stub and the blob written by the Save step archival
+    mock_blob_helper.return_value.download_blob.return_value = gzip.compress(
+        json_util.dumps(document).encode("utf-8")
+    )
+    collection = mongo_client["db"]["processes"]
+    collection.insert_one(
+        {
+            "_id": document["_id"],
+            "process_id": "123",
+            "status": "Completed",
+            "imported_time": document["imported_time"],
+            "last_modified_time": datetime.datetime(2025, 1, 2),
+            # Only the status fields of the stub are read over the archived document
+            "target_schema": {"Id": "schema", "ClassName": "Invoice"},
+            "archive": {
+                "container_name": "processes/123",
+                "blob_name": "content_process.json.gz",
+                "archived_time": datetime.datetime(2025, 6, 1),
+            },
+        }
+    )
+    config = app.dependency_overrides.get(get_app_config, get_app_config)()
+    config = config.model_copy(
+        update={
+            "app_cosmos_connstr": "mongodb://localhost",
+            "app_cosmos_database": "db",
+            "app_cosmos_container_process": "processes",
+            "app_cosmos_container_process_status": "ProcessStatus",
+        }
+    )
+    app.dependency_overrides[get_app_config] = lambda: config
+    try:
+        response = client.get("/contentprocessor/processed/123")
+        assert response.status_code == 200
+        assert response.json()["result"] == {"total": 1}
+        assert response.json()["status"] == "Completed"
+        assert response.json()["target_schema"]["Description"] == "Invoice"
+
+        response = client.put(
+            "/contentprocessor/processed/123",
+            json={"process_id": "123", "comment": "checked"},
+        )
+        assert response.status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_app_config, None)
+
+    # The whole document is back in Cosmos DB, with the comment
+    restored = collection.find_one({"process_id": "123"})
+    assert "archive" not in restored
+    assert restored["comment"] == "checked"
+    assert restored["result"] == {"total": 1}
+    assert restored["status"] == "Completed"
+    assert restored["target_schema"] == target_schema
+
+
+def _backfill(batch_size=100):
+    backfill_status_collection(
+        connection_string="mongodb://localhost",
+        database_name="db",
+        status_collection_name="status",
+        process_collection_name="processes",
+        batch_size=batch_size,
+        pause_seconds=0,
+    )
+
+
+def test_backfill_status_collection_copies_missing_statuses(mongo_client):
+    mongo_client["db"]["processes"].insert_many(
+        [
+            {"process_id": str(index), "status": "Completed", "result": {}}
+            for index in range(3)
+        ]
+    )
+    mongo_client["db"]["status"].insert_one({"process_id": "0", "status": "save"})
+
+    _backfill(batch_size=2)
+
+    statuses = {
+        document["process_id"]: document
+        for document in mongo_client["db"]["status"].find()
+    }
+    assert sorted(statuses) == ["0", "1", "2"]
+    # Existing status documents are newer
+    assert statuses["0"]["status"] == "save"
+    assert statuses["1"]["status"] == "Completed"
+    assert "result" not in statuses["1"]
+    assert is_status_collection_backfilled("mongodb://localhost", "db", "status")
+
+    # It runs once
+    mongo_client["db"]["status"].delete_many({})
+    _backfill()
+    assert mongo_client["db"]["status"].count_documents({}) == 0
+
+
+def test_backfill_status_collection_leased_to_another_worker(mongo_client):
+    mongo_client["db"]["processes"].insert_one({"process_id": "1"})
+    mongo_client["db"]["Migrations"].insert_one(
+        {
+            "_id": "process_status_backfill:status",
+            "completed_time": None,
+            "owner": "another worker",
+            "lease_until": datetime.datetime.now(datetime.UTC)
+            + datetime.timedelta(minutes=5),
+        }
+    )
+
+    _backfill()
+
+    assert mongo_client["db"]["status"].count_documents({}) == 0
+    assert not is_status_collection_backfilled("mongodb://localhost", "db", "status")
+
+
+def test_backfill_status_collection_resumes_after_the_last_copied_process(
+    mongo_client,
+):
+    processes = mongo_client["db"]["processes"]
+    processes.insert_many([{"process_id": str(index)} for index in range(3)])
+    first_id = processes.find_one({"process_id": "0"})["_id"]
+    # A backfill stopped after the first process, with an expired lease
+    mongo_client["db"]["Migrations"].insert_one(
+        {
+            "_id": "process_status_backfill:status",
+            "completed_time": None,
+            "owner": "stopped worker",
+            "lease_until": datetime.datetime(2025, 1, 1),
+            "last_id": first_id,
+        }
+    )
+
+    _backfill()
+
+    assert sorted(
+        document["process_id"] for document in mongo_client["db"]["status"].find()
+    ) == ["1", "2"]
+
+
+def test_get_all_processes_reads_process_collection_until_backfilled(mongo_client):
+    mongo_client["db"]["processes"].insert_one(
+        {
+            "process_id": "1",
+            "status": "Completed",
+            "imported_time": datetime.datetime(2025, 1, 1),
+        }
+    )
+
+    def list_processes():
+        return CosmosContentProcess.get_all_processes_from_cosmos(
+            connection_string="mongodb://localhost",
+            database_name="db",
+            collection_name="status",
+            page_size=10,
+            page_number=1,
+            process_collection_name="processes",
+        )
+
+    assert [item.process_id for item in list_processes().items] == ["1"]
+
+    _backfill()
+    mongo_client["db"]["status"].update_one(
+        {"process_id": "1"}, {"$set": {"status": "from status"}}
+    )
+    assert [item.status for item in list_processes().items] == ["from status"]